@@ -1,6 +1,7 @@
 
 import shutil
 import asyncio
+import uuid
 from pathlib import Path
 from fastapi import FastAPI, UploadFile, File, BackgroundTasks
 from fastapi.responses import FileResponse, JSONResponse
@@ -8,6 +9,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from commentator import Commentator
+from config import PRESETS, DEFAULT_PRESET
 # Import tools from other modules
 from cricket_server import get_match_context_at_time
 from llm import call_llm
@@ -31,49 +33,87 @@ BASE_DIR = Path(".").resolve()
 UPLOAD_DIR = BASE_DIR / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# Global State (Single user simplified)
-processing_state = {
-    "status": "idle", # idle, processing, completed, error
-    "message": "Ready to start",
-    "step": 0,
-    "total_steps": 7,
-    "result_path": None,
-    "logs": []
-}
+def new_job_state(message: str = "Ready to start") -> dict:
+    """State of one job; every upload / process call gets a fresh one with its own job_id."""
+    return {
+        "job_id": uuid.uuid4().hex,
+        "status": "idle", # idle, processing, completed, error
+        "message": message,
+        "step": 0,
+        "total_steps": 7,
+        "result_path": None,
+        "logs": [],
+        "result_stage": None,   # "preview" | "final" | "refined"
+        "refinement": {"status": "disabled", "message": "", "result_path": None},
+    }
+
+# Global State (Single user simplified): the current job
+processing_state = new_job_state()
 
 commentator = Commentator(BASE_DIR)
 
-def update_progress(msg):
-    global processing_state
-    processing_state["message"] = msg
-    processing_state["logs"].append(msg)
+def busy_reason():
+    """Why a new job cannot start yet (None if it can): jobs share the frames / output files."""
+    if processing_state["status"] == "processing":
+        return "A video is still being processed."
+    if commentator.refinement_in_flight:
+        return "The previous video is still being refined. Try again when it is done."
+    return None
+
+def update_progress(job: dict, msg):
+    job["message"] = msg
+    job["logs"].append(msg)
     # Simple step increment heuristic
-    if processing_state["step"] < processing_state["total_steps"]:
-        processing_state["step"] += 1
+    if job["step"] < job["total_steps"]:
+        job["step"] += 1
 
-def run_pipeline_task(video_path: Path):
-    global processing_state
-    processing_state["status"] = "processing"
-    processing_state["step"] = 0
-    processing_state["logs"] = []
+def update_refinement(job: dict, status, msg, result_path=None):
+    """Progress of the background refinement pass (progressive mode) of `job`."""
+    if processing_state["job_id"] != job["job_id"]:
+        print(f"[REFINE] Job {job['job_id']} is no longer current; dropped: {msg}")
+        return
+    refinement = job["refinement"]
+    refinement["status"] = status
+    refinement["message"] = msg
+    job["logs"].append(f"[refine] {msg}")
+    if status == "completed" and result_path:
+        refinement["result_path"] = result_path
+        job["result_path"] = result_path
+        job["result_stage"] = "refined"
+
+def run_pipeline_task(video_path: Path, job: dict):
+    progressive = job.get("progressive", False)
+    job["status"] = "processing"
+    job["step"] = 0
+    job["logs"] = []
+    job["result_stage"] = None
+    job["refinement"] = {
+        "status": "pending" if progressive else "disabled", "message": "", "result_path": None
+    }
     
     try:
         final_path = commentator.process_video(
             video_path, 
-            has_scorecard=processing_state.get("has_scorecard", True),
-            update_callback=update_progress
+            has_scorecard=job.get("has_scorecard", True),
+            update_callback=lambda msg: update_progress(job, msg),
+            preset=job.get("preset", DEFAULT_PRESET),
+            progressive=progressive,
+            refine_callback=lambda status, msg, result_path=None: update_refinement(job, status, msg, result_path)
         )
         if final_path:
-            processing_state["status"] = "completed"
-            processing_state["result_path"] = final_path
-            processing_state["message"] = "Processing Complete!"
-            processing_state["step"] = processing_state["total_steps"]
+            job["status"] = "completed"
+            job["result_path"] = final_path
+            job["message"] = "Preview ready, refining..." if progressive else "Processing Complete!"
+            job["step"] = job["total_steps"]
+            # The refinement thread may already have finished
+            if job["result_stage"] is None:
+                job["result_stage"] = "preview" if progressive else "final"
         else:
-            processing_state["status"] = "error"
-            processing_state["message"] = "Pipeline failed at TTS stage."
+            job["status"] = "error"
+            job["message"] = "Pipeline failed at TTS stage."
     except Exception as e:
-        processing_state["status"] = "error"
-        processing_state["message"] = f"Error: {str(e)}"
+        job["status"] = "error"
+        job["message"] = f"Error: {str(e)}"
         print(f"Pipeline Error: {e}")
 
 @app.post("/upload")
@@ -82,16 +122,12 @@ async def upload_video(file: UploadFile = File(...)):
     
     # We will get 'has_scorecard' from a separate call or wait, the user uploads first then processes.
     # The /process call should set the flags.
+    busy = busy_reason()
+    if busy:
+        return JSONResponse(status_code=409, content={"message": busy})
     
     # Reset state
-    processing_state = {
-        "status": "idle", 
-        "message": "File uploaded", 
-        "step": 0, 
-        "total_steps": 7,
-        "result_path": None, 
-        "logs": []
-    }
+    processing_state = new_job_state("File uploaded")
     
     file_path = UPLOAD_DIR / file.filename
     with open(file_path, "wb") as buffer:
@@ -100,15 +136,28 @@ async def upload_video(file: UploadFile = File(...)):
     return {"filename": file.filename, "path": str(file_path)}
 
 @app.post("/process")
-async def process_video(filename: str, background_tasks: BackgroundTasks, has_scorecard: bool = True):
+async def process_video(filename: str, background_tasks: BackgroundTasks, has_scorecard: bool = True,
+                        preset: str = DEFAULT_PRESET, progressive: bool = False):
+    global processing_state
     video_path = UPLOAD_DIR / filename
     if not video_path.exists():
         return JSONResponse(status_code=404, content={"message": "File not found"})
+    if preset not in PRESETS:
+        return JSONResponse(status_code=400, content={"message": f"Unknown preset '{preset}'. Choose one of: {', '.join(PRESETS)}"})
+    
+    busy = busy_reason()
+    if busy:
+        return JSONResponse(status_code=409, content={"message": busy})
     
-    # Store options in state for the worker to pick up
-    processing_state["has_scorecard"] = has_scorecard
+    # A new job: its own state object, handed to the worker (and its refinement callback)
+    job = new_job_state("Processing started")
+    job["status"] = "processing"
+    job["has_scorecard"] = has_scorecard
+    job["preset"] = preset
+    job["progressive"] = progressive
+    processing_state = job
     
-    background_tasks.add_task(run_pipeline_task, video_path)
+    background_tasks.add_task(run_pipeline_task, video_path, job)
     return {"message": "Processing started"}
 
 @app.get("/status")
@@ -0,0 +1,123 @@
+import shutil
+import subprocess
+import numpy as np
+from pathlib import Path
+
+from config import (
+    AUDIO_SAMPLE_RATE, AUDIO_HOP_SEC, AUDIO_SMOOTH_SEC, AUDIO_PEAK_Z, AUDIO_PEAK_MIN_GAP_SEC,
+    AUDIO_PRE_ROLL_SEC, AUDIO_POST_ROLL_SEC
+)
+
+READ_SAMPLES = 1 << 16   # samples per read from the decoder pipe
+
+
+# ================= DECODING =================
+
+def pcm_chunks(video_path: Path, sample_rate: int = AUDIO_SAMPLE_RATE):
+    """
+    Mono 16-bit PCM of the video's audio track, streamed from an ffmpeg pipe in
+    chunks of READ_SAMPLES (float32 in [-1, 1]). Yields nothing without ffmpeg or audio.
+    """
+    if shutil.which("ffmpeg") is None:
+        print("[AUDIO] ffmpeg not found in PATH; no audio prior.")
+        return
+    cmd = ["ffmpeg", "-v", "error", "-i", str(video_path), "-vn", "-ac", "1",
+           "-ar", str(sample_rate), "-f", "s16le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            raw = proc.stdout.read(READ_SAMPLES * 2)
+            if not raw:
+                break
+            yield np.frombuffer(raw[:len(raw) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+# ================= CURVES =================
+
+def audio_curves(chunks, sample_rate: int = AUDIO_SAMPLE_RATE, hop_sec: float = AUDIO_HOP_SEC) -> dict:
+    """
+    Short-time loudness (dBFS) and spectral flux, one value per hop, in a single pass
+    over PCM chunks (only one hop of samples is held back between chunks).
+    Returns {"times", "loudness", "flux"} as arrays.
+    """
+    hop = max(1, int(round(sample_rate * hop_sec)))
+    window = np.hanning(hop).astype(np.float32)
+    loudness, flux = [], []
+    prev_mag = None
+    rest = np.zeros(0, dtype=np.float32)
+    for chunk in chunks:
+        buf = np.concatenate([rest, chunk])
+        n = len(buf) // hop
+        rest = buf[n * hop:]
+        if n == 0:
+            continue
+        frames = buf[:n * hop].reshape(n, hop)
+        rms = np.sqrt((frames ** 2).mean(axis=1))
+        loudness.append(20 * np.log10(np.maximum(rms, 1e-5)))
+        mag = np.log1p(np.abs(np.fft.rfft(frames * window, axis=1)))
+        prev = np.vstack([mag[:1] if prev_mag is None else prev_mag[None], mag[:-1]])
+        flux.append(np.maximum(mag - prev, 0).mean(axis=1))
+        prev_mag = mag[-1]
+    loudness = np.concatenate(loudness) if loudness else np.zeros(0, dtype=np.float32)
+    flux = np.concatenate(flux) if flux else np.zeros(0, dtype=np.float32)
+    return {"times": np.arange(len(loudness)) * hop / float(sample_rate), "loudness": loudness, "flux": flux}
+
+
+def _robust_z(x: np.ndarray) -> np.ndarray:
+    med = np.median(x)
+    mad = 1.4826 * np.median(np.abs(x - med))
+    return (x - med) / max(float(mad), 1e-6)
+
+
+def excitement(curves, hop_sec: float = AUDIO_HOP_SEC, smooth_sec: float = AUDIO_SMOOTH_SEC) -> np.ndarray:
+    """Mean of the robust z-scores of smoothed loudness and flux (crowd roar is loud and broadband)."""
+    if len(curves["times"]) == 0:
+        return np.zeros(0, dtype=np.float32)
+    k = max(1, int(round(smooth_sec / hop_sec)))
+    kernel = np.ones(k, dtype=np.float32) / k
+    loud = np.convolve(curves["loudness"], kernel, mode="same")
+    flux = np.convolve(curves["flux"], kernel, mode="same")
+    return (_robust_z(loud) + _robust_z(flux)) / 2
+
+
+# ================= PEAKS =================
+
+def find_peaks(curves, min_z: float = AUDIO_PEAK_Z, min_gap_sec: float = AUDIO_PEAK_MIN_GAP_SEC) -> list:
+    """Exciting moments: [{"time", "score"}], strongest first within min_gap_sec, in time order."""
+    score = excitement(curves)
+    times = curves["times"]
+    peaks = []
+    for i in np.argsort(score)[::-1]:
+        if score[i] < min_z:
+            break
+        if all(abs(times[i] - p["time"]) >= min_gap_sec for p in peaks):
+            peaks.append({"time": round(float(times[i]), 2), "score": round(float(score[i]), 2)})
+    return sorted(peaks, key=lambda p: p["time"])
+
+
+def peak_windows(peaks, pre_sec: float = AUDIO_PRE_ROLL_SEC, post_sec: float = AUDIO_POST_ROLL_SEC) -> list:
+    """Dense-sampling windows around the peaks, in the delivery-window format."""
+    windows = []
+    for p in peaks:
+        w = {"start": max(0.0, p["time"] - pre_sec), "end": p["time"] + post_sec,
+             "signals": {"start": "audio_peak", "score": p["score"]}}
+        if windows and w["start"] <= windows[-1]["end"]:
+            windows[-1]["end"] = max(windows[-1]["end"], w["end"])
+        else:
+            windows.append(w)
+    return windows
+
+
+def analyze_audio(video_path: Path) -> dict:
+    """{"peaks", "windows"} from the broadcast sound; empty when there is no audio track."""
+    curves = audio_curves(pcm_chunks(video_path))
+    if len(curves["times"]) == 0:
+        return {"peaks": [], "windows": []}
+    peaks = find_peaks(curves)
+    windows = peak_windows(peaks)
+    print(f"[AUDIO] {len(curves['times']) * AUDIO_HOP_SEC:.0f}s of audio; {len(peaks)} excitement peaks "
+          f"-> {len(windows)} dense windows.")
+    return {"peaks": peaks, "windows": windows}
@@ -0,0 +1,165 @@
+"""
+Benchmark the speed/quality presets on a reference clip.
+
+    python benchmark_presets.py [video.mp4] [--ocr] [--llm]
+
+For every preset it records the wall time of each stage and how closely the
+outputs agree with the "accurate" preset (same frames compared by name).
+OCR and LLM are skipped unless requested because they spend API quota.
+Results are printed as a table and saved to preset_benchmark.json.
+"""
+import sys
+import json
+import time
+import os
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+from pathlib import Path
+
+from config import (
+    BASE_DIR, VIDEO_PATH, FRAMES_DIR, CLIPS_DIR, PRESETS, get_preset,
+    YOLO_WEIGHTS, SHOT_WEIGHTS, UMPIRE_WEIGHTS, RUNOUT_WEIGHTS, R2P1D_WEIGHTS,
+    SHOT_META_JSON, UMPIRE_META_JSON, RUNOUT_META_JSON, R2P1D_META_JSON
+)
+from video_processing import run_ffmpeg_split
+from ocr import process_score_frames
+from models import (
+    load_yolo_model, load_efficientnet_classifier, load_umpire_model, load_r2plus1d_model
+)
+from inference import run_on_frames, run_on_clips
+from timeline import build_timeline
+from llm import build_commentary_prompt_from_timeline, call_llm
+
+REFERENCE_PRESET = "accurate"
+BENCHMARK_JSON = BASE_DIR / "preset_benchmark.json"
+
+
+def run_preset(name, video_path, models, with_ocr=False, with_llm=False):
+    p = get_preset(name)
+    yolo_model, shot_model, umpire_model, runout_model, video_model, classes = models
+    times = {}
+
+    t0 = time.time()
+    run_ffmpeg_split(video_path, FRAMES_DIR, CLIPS_DIR, p["frame_rate"], p["clip_length"])
+    times["ffmpeg_split"] = time.time() - t0
+
+    score_results = []
+    if with_ocr:
+        t0 = time.time()
+        score_results = process_score_frames(
+            FRAMES_DIR, BASE_DIR / f"bench_score_{name}.json", BASE_DIR / f"bench_score_{name}.csv",
+            subsample=p["frame_subsample"], frame_rate=p["frame_rate"], request_interval=p["ocr_interval"]
+        )
+        times["scorecard_ocr"] = time.time() - t0
+
+    t0 = time.time()
+    frame_results = run_on_frames(
+        FRAMES_DIR, yolo_model, shot_model, umpire_model, runout_model,
+        classes["shot"], classes["umpire"], classes["runout"],
+        subsample=p["frame_subsample"], frame_rate=p["frame_rate"],
+        yolo_conf=p["yolo_conf"], yolo_imgsz=p["yolo_imgsz"], run_heads=p["run_heads"]
+    )
+    times["frame_inference"] = time.time() - t0
+
+    t0 = time.time()
+    clip_results = []
+    if p["run_clips"]:
+        clip_results = run_on_clips(CLIPS_DIR, video_model, classes["video"], clip_length=p["clip_length"])
+    times["clip_inference"] = time.time() - t0
+
+    t0 = time.time()
+    score_by_frame = {e["frame"]: e for e in score_results if e.get("frame")}
+    timeline = build_timeline(frame_results, clip_results, score_by_frame=score_by_frame)
+    prompt = build_commentary_prompt_from_timeline(timeline)
+    times["timeline_prompt"] = time.time() - t0
+
+    if with_llm:
+        t0 = time.time()
+        call_llm(prompt, max_tokens=p["llm_max_tokens"])
+        times["llm_commentary"] = time.time() - t0
+
+    return {
+        "times": times,
+        "total_seconds": sum(times.values()),
+        "frames": {Path(f["frame_path"]).name: f for f in frame_results},
+        "clips": {c["clip_index"]: c for c in clip_results},
+        "scores": score_by_frame,
+    }
+
+
+def _score_key(entry):
+    parsed = (entry or {}).get("parsed") or {}
+    s = parsed.get("team1_score") or {}
+    return (s.get("runs"), s.get("wickets"), s.get("overs"))
+
+
+def agreement(run, ref):
+    """Share of outputs that match the reference run, on the items both runs produced."""
+    out = {}
+
+    common = sorted(set(run["frames"]) & set(ref["frames"]))
+    for head in ("shot", "umpire", "runout"):
+        same = sum(run["frames"][k][head]["label"] == ref["frames"][k][head]["label"] for k in common)
+        out[f"{head}_label"] = same / len(common) if common else None
+
+    jaccard = []
+    for k in common:
+        a = {d["class_name"] for d in run["frames"][k]["yolo_detections"]}
+        b = {d["class_name"] for d in ref["frames"][k]["yolo_detections"]}
+        jaccard.append(len(a & b) / len(a | b) if (a | b) else 1.0)
+    out["yolo_class_jaccard"] = sum(jaccard) / len(jaccard) if jaccard else None
+
+    common_clips = set(run["clips"]) & set(ref["clips"])
+    same = sum(run["clips"][k]["video_class"]["label"] == ref["clips"][k]["video_class"]["label"] for k in common_clips)
+    out["clip_label"] = same / len(common_clips) if common_clips else None
+
+    common_scores = set(run["scores"]) & set(ref["scores"])
+    same = sum(_score_key(run["scores"][k]) == _score_key(ref["scores"][k]) for k in common_scores)
+    out["score"] = same / len(common_scores) if common_scores else None
+
+    out["frames_compared"] = len(common)
+    return out
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    video_path = Path(args[0]) if args else VIDEO_PATH
+    with_ocr = "--ocr" in sys.argv
+    with_llm = "--llm" in sys.argv
+
+    yolo_model = load_yolo_model(YOLO_WEIGHTS)
+    shot_model, shot_classes = load_efficientnet_classifier(SHOT_WEIGHTS, SHOT_META_JSON)
+    umpire_model, umpire_classes = load_umpire_model(UMPIRE_WEIGHTS, UMPIRE_META_JSON)
+    runout_model, runout_classes = load_efficientnet_classifier(RUNOUT_WEIGHTS, RUNOUT_META_JSON)
+    video_model, video_classes = load_r2plus1d_model(R2P1D_WEIGHTS, R2P1D_META_JSON)
+    models = (yolo_model, shot_model, umpire_model, runout_model, video_model, {
+        "shot": shot_classes, "umpire": umpire_classes, "runout": runout_classes, "video": video_classes,
+    })
+
+    runs = {name: run_preset(name, video_path, models, with_ocr, with_llm) for name in PRESETS}
+    ref = runs[REFERENCE_PRESET]
+
+    report = {"video": str(video_path), "reference": REFERENCE_PRESET, "presets": {}}
+    for name, run in runs.items():
+        report["presets"][name] = {
+            "settings": get_preset(name),
+            "stage_seconds": run["times"],
+            "total_seconds": run["total_seconds"],
+            "agreement_vs_reference": agreement(run, ref),
+        }
+
+    print(f"\n===== PRESET BENCHMARK ({video_path.name}, reference={REFERENCE_PRESET}) =====")
+    print(f"{'preset':10s} {'wall (s)':>9s} {'shot':>6s} {'umpire':>7s} {'runout':>7s} {'yolo':>6s} {'clip':>6s} {'score':>6s}")
+    for name, r in report["presets"].items():
+        a = r["agreement_vs_reference"]
+        cells = [f"{a[k]:.0%}" if a[k] is not None else "-" for k in
+                 ("shot_label", "umpire_label", "runout_label", "yolo_class_jaccard", "clip_label", "score")]
+        print(f"{name:10s} {r['total_seconds']:9.1f} {cells[0]:>6s} {cells[1]:>7s} {cells[2]:>7s} "
+              f"{cells[3]:>6s} {cells[4]:>6s} {cells[5]:>6s}")
+
+    with open(BENCHMARK_JSON, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark to {BENCHMARK_JSON}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,40 @@
 from pathlib import Path
+import os
 import subprocess
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Import new modules
 from config import (
-    FRAME_RATE, CLIP_LENGTH, FRAME_SUBSAMPLE, 
+    DEFAULT_PRESET, PROGRESSIVE_PREVIEW_PRESET, get_preset,
     YOLO_WEIGHTS, SHOT_WEIGHTS, UMPIRE_WEIGHTS, RUNOUT_WEIGHTS, R2P1D_WEIGHTS,
     SHOT_META_JSON, UMPIRE_META_JSON, RUNOUT_META_JSON, R2P1D_META_JSON,
-    SCORE_JSON, SCORE_CSV, FRAMES_DIR, CLIPS_DIR
+    SCORE_JSON, SCORE_CSV, FRAMES_DIR, CLIPS_DIR, RESULTS_DIR, USE_INFERENCE_SERVER,
+    USE_CASCADE, CASCADE_HEADS, CASCADE_REPORT_JSON, USE_FEATURE_STORE, USE_RESULT_STORE,
+    DELIVERY_SEGMENTATION, ADAPTIVE_SAMPLING, AUDIO_PRIOR, AUDIO_CLIP_FOCUS, LLM_STREAMING, TTS_MAX_CHARS
 )
 from video_processing import run_ffmpeg_split
 from ocr import process_score_frames
 from models import (
-    load_yolo_model, load_efficientnet_classifier, load_umpire_model, load_r2plus1d_model
+    load_yolo_model, load_efficientnet_classifier, load_umpire_model, load_r2plus1d_model,
+    load_cascade_heads
 )
-from inference import run_on_frames, run_on_clips
+from inference import run_on_frames, run_on_clips, CascadeStats
+from inference_server import start_inference_server
+from feature_store import FeatureStore
+from result_store import ResultStore
 from timeline import build_timeline
-from llm import build_commentary_prompt_from_timeline, call_llm, summarize_text
-from tts import synthesize_commentary_audio
+from delivery import plan_frames, save_ball_events
+from audio_prior import analyze_audio
+from llm import generate_commentary, fit_to_limit
+from tts import synthesize_commentary_audio, StreamingTTS
+
+
+class JobCancelled(Exception):
+    """A newer job started; the background pass of the old one stops at its next step."""
+
 
 class Commentator:
     def __init__(self, base_dir: Path):
@@ -36,6 +52,9 @@ class Commentator:
         self.umpire_model = None
         self.runout_model = None
         self.video_model = None
+
+        # Optional tiny first-stage models {head: model}
+        self.tiny_models = {}
         
         # Classes
         self.shot_classes = []
@@ -44,19 +63,63 @@ class Commentator:
         self.video_classes = []
         
         self.models_loaded = False
+        self._models_lock = threading.Lock()
+
+        # Shared dynamic-batching server (one per process, used by every job)
+        self.server = None
+
+        # IO-bound stages (scorecard OCR) run here, overlapping model loading and inference
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="io-stage")
+
+        # Every process_video call is a new job; it invalidates the refinement of the previous one
+        self._job_lock = threading.Lock()
+        self._job_id = 0
+        self._refining = None   # job id of the refinement pass in flight
+
+    @property
+    def refinement_in_flight(self) -> bool:
+        return self._refining is not None
+
+    def output_paths(self, work_dir: Path | None = None) -> dict:
+        """Files a pass writes: the published locations, or the same names inside work_dir."""
+        paths = {
+            "score_json": SCORE_JSON, "score_csv": SCORE_CSV, "results": RESULTS_DIR,
+            "timeline": self.base_dir / "timeline_for_llm.json",
+            "ball_events": self.base_dir / "ball_events.json",
+            "commentary_raw": self.base_dir / "commentary_raw.txt",
+            "commentary_final": self.base_dir / "commentary_final.txt",
+            "audio": self.base_dir / "commentary_output.mp3",
+            "video": self.base_dir / "final_output.mp4",
+        }
+        if work_dir is not None:
+            paths = {k: Path(work_dir) / p.name for k, p in paths.items()}
+        return paths
 
     def load_models_lazy(self):
-        if self.models_loaded:
-            return
-
-        print("Loading models...")
-        self.yolo_model = load_yolo_model(YOLO_WEIGHTS)
-        self.shot_model, self.shot_classes = load_efficientnet_classifier(SHOT_WEIGHTS, SHOT_META_JSON)
-        self.umpire_model, self.umpire_classes = load_umpire_model(UMPIRE_WEIGHTS, UMPIRE_META_JSON)
-        self.runout_model, self.runout_classes = load_efficientnet_classifier(RUNOUT_WEIGHTS, RUNOUT_META_JSON)
-        self.video_model, self.video_classes = load_r2plus1d_model(R2P1D_WEIGHTS, R2P1D_META_JSON)
-        
-        self.models_loaded = True
+        with self._models_lock:
+            if self.models_loaded:
+                return
+
+            print("Loading models...")
+            self.yolo_model = load_yolo_model(YOLO_WEIGHTS)
+            self.shot_model, self.shot_classes = load_efficientnet_classifier(SHOT_WEIGHTS, SHOT_META_JSON)
+            self.umpire_model, self.umpire_classes = load_umpire_model(UMPIRE_WEIGHTS, UMPIRE_META_JSON)
+            self.runout_model, self.runout_classes = load_efficientnet_classifier(RUNOUT_WEIGHTS, RUNOUT_META_JSON)
+            self.video_model, self.video_classes = load_r2plus1d_model(R2P1D_WEIGHTS, R2P1D_META_JSON)
+
+            if USE_CASCADE:
+                self.tiny_models = load_cascade_heads(CASCADE_HEADS, {
+                    "shot": self.shot_classes, "umpire": self.umpire_classes, "runout": self.runout_classes,
+                })
+
+            if USE_INFERENCE_SERVER:
+                self.server = start_inference_server(
+                    self.yolo_model, self.shot_model, self.umpire_model, self.runout_model, self.video_model,
+                    self.shot_classes, self.umpire_classes, self.runout_classes, self.video_classes,
+                    tiny_models=self.tiny_models
+                )
+
+            self.models_loaded = True
 
     def merge_audio_video(self, video_path: Path, audio_path: Path, output_path: Path):
         """
@@ -113,24 +176,160 @@ class Commentator:
                 print(f"Fallback merge failed: {e2}")
                 return False
 
-    def process_video(self, video_path: Path, has_scorecard: bool = True, update_callback=None):
+    def process_video(self, video_path: Path, has_scorecard: bool = True, update_callback=None,
+                      preset: str = DEFAULT_PRESET, progressive: bool = False, refine_callback=None):
+        """
+        Run the pipeline and return the path of final_output.mp4 (None on failure).
+
+        progressive=True: a fast PROGRESSIVE_PREVIEW_PRESET pass produces final_output.mp4
+        first and is returned immediately. A background pass with `preset` then reuses the
+        preview's frames, clips and OCR reads, works in its own directory and publishes the
+        refined video (and timeline / scores) when done, unless a newer job has started.
+        refine_callback(status, message, result_path) reports the background pass.
+        """
+        with self._job_lock:
+            self._job_id += 1
+            job_id = self._job_id
+
         def notify(msg):
             print(f"[PIPELINE] {msg}")
             if update_callback: update_callback(msg)
 
+        if not progressive:
+            final_path, _ = self._run_pass(video_path, has_scorecard, notify, preset)
+            return final_path
+
+        notify(f"Preview pass ('{PROGRESSIVE_PREVIEW_PRESET}' preset)...")
+        preview_path, artifacts = self._run_pass(video_path, has_scorecard, notify, PROGRESSIVE_PREVIEW_PRESET)
+        if preview_path is None:
+            return None
+
+        with self._job_lock:
+            if self._job_id != job_id:
+                return preview_path
+            self._refining = job_id
+        work_dir = self.base_dir / "refine" / f"job_{job_id}"
+        refiner = threading.Thread(
+            target=self._refine_in_background,
+            args=(job_id, video_path, has_scorecard, preset, artifacts, work_dir, refine_callback),
+            name="refine-pass", daemon=True
+        )
+        refiner.start()
+        return preview_path
+
+    def _refine_in_background(self, job_id: int, video_path: Path, has_scorecard: bool, preset: str,
+                              artifacts: dict, work_dir: Path, refine_callback=None):
+        def report(status, msg, result_path=None):
+            print(f"[REFINE] {msg}")
+            if refine_callback: refine_callback(status, msg, result_path)
+
+        def progress(msg):
+            if self._job_id != job_id:
+                raise JobCancelled(f"job {job_id} was superseded by job {self._job_id}")
+            report("processing", msg)
+
         try:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            work_dir.mkdir(parents=True)
+            report("processing", f"Refining with '{preset}' preset...")
+            result, _ = self._run_pass(video_path, has_scorecard, progress, preset,
+                                       reuse=artifacts, work_dir=work_dir)
+            if result is None:
+                report("error", "Refinement failed. Keeping the preview result.")
+                return
+            with self._job_lock:
+                if self._job_id != job_id:
+                    raise JobCancelled(f"job {job_id} was superseded by job {self._job_id}")
+                published = self._publish(work_dir)
+            report("completed", "Refined result ready.", published)
+        except JobCancelled as e:
+            print(f"[REFINE] Dropped: {e}.")
+        finally:
+            with self._job_lock:
+                if self._refining == job_id:
+                    self._refining = None
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _publish(self, work_dir: Path) -> str:
+        """
+        Move a refinement pass's outputs over the published ones. Files are swapped with
+        os.replace, so /result and the chat never see a half-written file.
+        """
+        published = self.output_paths()
+        for key, src in self.output_paths(work_dir).items():
+            dst = published[key]
+            if not src.exists():
+                continue
+            if src.is_dir():
+                old = dst.with_name(dst.name + ".old")
+                shutil.rmtree(old, ignore_errors=True)
+                if dst.exists():
+                    os.replace(dst, old)
+                os.replace(src, dst)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                os.replace(src, dst)
+        return str(published["video"].resolve())
+
+    def _run_pass(self, video_path: Path, has_scorecard: bool, notify, preset: str,
+                  reuse: dict | None = None, work_dir: Path | None = None):
+        """
+        One full pipeline pass. Returns (final_video_path or None, artifacts).
+        reuse: artifacts of an earlier pass on the same video; frames/clips, OCR reads,
+        frame results and clip labels are reused wherever the settings allow.
+        work_dir: write every output (and newly extracted frames / clips) there instead
+        of the published locations (see output_paths).
+        """
+        artifacts = {}
+        out = self.output_paths(work_dir)
+        tts_stream = None
+        try:
+            p = get_preset(preset)
+            print(f"[PIPELINE] Using preset '{p['name']}': {p}")
+            artifacts["preset"] = p
+
+            prev = reuse or {}
+            prev_p = prev.get("preset") or {}
+            same_split = (prev_p.get("frame_rate") == p["frame_rate"]
+                          and prev_p.get("clip_length") == p["clip_length"])
+            same_yolo = (same_split and prev_p.get("run_heads") == p["run_heads"]
+                         and prev_p.get("yolo_conf") == p["yolo_conf"]
+                         and prev_p.get("yolo_imgsz") == p["yolo_imgsz"])
+
             # 1. Split
-            notify("Step 1/7: Analyzing video structure...")
-            # We must use specific frames/clips dir if we want isolation, 
-            # but for now we follow global config
-            run_ffmpeg_split(video_path, self.frames_dir, self.clips_dir, FRAME_RATE, CLIP_LENGTH)
+            if same_split:
+                notify("Step 1/7: Reusing extracted frames and clips...")
+                frames_dir, clips_dir = prev.get("frames_dir", self.frames_dir), prev.get("clips_dir", self.clips_dir)
+            else:
+                notify("Step 1/7: Analyzing video structure...")
+                frames_dir = work_dir / "frames" if work_dir is not None else self.frames_dir
+                clips_dir = work_dir / "clips" if work_dir is not None else self.clips_dir
+                run_ffmpeg_split(video_path, frames_dir, clips_dir, p["frame_rate"], p["clip_length"])
+            artifacts["frames_dir"], artifacts["clips_dir"] = frames_dir, clips_dir
+
+            # Delivery windows and motion-driven schedule from cheap signals (+ broadcast audio peaks)
+            ocr_frames, windows, signals, segments, audio_windows = None, [], None, [], []
+            if DELIVERY_SEGMENTATION or ADAPTIVE_SAMPLING:
+                if AUDIO_PRIOR:
+                    audio = prev.get("audio") or analyze_audio(video_path)
+                    artifacts["audio"] = audio
+                    audio_windows = audio["windows"]
+                ocr_frames, windows, signals = plan_frames(frames_dir, p["frame_rate"], p["frame_subsample"],
+                                                           audio_windows=audio_windows)
+                segments = signals["segments"]
             
-            # 2. OCR (Optional)
-            score_by_frame = {}
+            # 2. OCR (Optional) - runs in the background until the timeline step
+            ocr_future = None
             if has_scorecard:
-                notify("Step 2/7: Reading scoreboard data...")
-                score_results = process_score_frames(self.frames_dir, SCORE_JSON, SCORE_CSV)
-                score_by_frame = {e["frame"]: e for e in score_results if e.get("frame")}
+                notify("Step 2/7: Reading scoreboard data (in background)...")
+                ocr_future = self.io_executor.submit(
+                    process_score_frames,
+                    frames_dir, out["score_json"], out["score_csv"],
+                    subsample=p["frame_subsample"], frame_rate=p["frame_rate"],
+                    request_interval=p["ocr_interval"],
+                    reuse=prev.get("score_by_frame") if same_split else None,
+                    frame_paths=ocr_frames
+                )
             else:
                 notify("Step 2/7: OCR Skipped (No Scorecard selected)...")
             
@@ -140,90 +339,139 @@ class Commentator:
             
             # 4. Inference
             notify("Step 4/7: Detecting events (Visual AI)...")
+            # Clips first: their "bowling" labels refine the delivery windows for the frames
+            result_store = ResultStore(out["results"], reset=True) if USE_RESULT_STORE else None
+            if same_split and prev.get("clip_results"):
+                clip_results = prev["clip_results"]
+                if result_store is not None:
+                    for c in clip_results:
+                        result_store.append_clip(c)
+            elif p["run_clips"]:
+                clip_results = run_on_clips(clips_dir, self.video_model, self.video_classes,
+                                            server=self.server, clip_length=p["clip_length"],
+                                            result_store=result_store, skip=segments,
+                                            focus=windows + audio_windows if AUDIO_CLIP_FOCUS and audio_windows else None)
+            else:
+                clip_results = []
+            artifacts["clip_results"] = clip_results
+
+            frame_paths = None
+            if DELIVERY_SEGMENTATION or ADAPTIVE_SAMPLING:
+                frame_paths, windows, _ = plan_frames(frames_dir, p["frame_rate"], p["frame_subsample"],
+                                                      clip_results=clip_results, signals=signals)
+            cascade_stats = CascadeStats()
+            feature_store = None
+            if USE_FEATURE_STORE:
+                feature_store = FeatureStore.for_video(video_path, frames_dir, frame_rate=p["frame_rate"])
             frame_results = run_on_frames(
-                self.frames_dir, self.yolo_model, self.shot_model, self.umpire_model, self.runout_model,
-                self.shot_classes, self.umpire_classes, self.runout_classes
+                frames_dir, self.yolo_model, self.shot_model, self.umpire_model, self.runout_model,
+                self.shot_classes, self.umpire_classes, self.runout_classes,
+                server=self.server, cascades=self.tiny_models, cascade_stats=cascade_stats,
+                feature_store=feature_store, result_store=result_store, frame_paths=frame_paths,
+                subsample=p["frame_subsample"], frame_rate=p["frame_rate"],
+                yolo_conf=p["yolo_conf"], yolo_imgsz=p["yolo_imgsz"],
+                run_heads=p["run_heads"],
+                reuse=prev.get("frame_results") if same_yolo else None
             )
-            clip_results = run_on_clips(self.clips_dir, self.video_model, self.video_classes)
+            artifacts["frame_results"] = frame_results
+            if self.tiny_models:
+                cascade_stats.print_report()
+                import json
+                with open(CASCADE_REPORT_JSON, "w") as f:
+                    json.dump(cascade_stats.summary(), f, indent=2)
             
+            # Join the OCR stage
+            score_by_frame = {}
+            if ocr_future is not None:
+                if not ocr_future.done():
+                    notify("Waiting for scoreboard data...")
+                score_results = ocr_future.result()
+                score_by_frame = {e["frame"]: e for e in score_results if e.get("frame")}
+                if result_store is not None:
+                    result_store.append_scores(score_results)
+            artifacts["score_by_frame"] = score_by_frame
+            if result_store is not None:
+                result_store.close()
+
             # 5. Timeline & Prompt
             notify("Step 5/7: Generating Commentary Script...")
-            timeline = build_timeline(frame_results, clip_results, score_by_frame)
+            timeline = build_timeline(frame_results, clip_results, score_by_frame, segments)
             
             # Save Timeline for Match Analyst (Chat)
             import json
-            with open(self.base_dir / "timeline_for_llm.json", "w") as f:
-                json.dump(timeline, f, indent=2)
+            with open(out["timeline"], "w") as f:
+                json.dump(timeline, f)
+            if DELIVERY_SEGMENTATION:
+                save_ball_events(windows, timeline, clip_results, out["ball_events"])
 
-            prompt = build_commentary_prompt_from_timeline(timeline)
-            commentary = call_llm(prompt)
+            audio_out = out["audio"]
+            # Long timelines run as parallel windows (each builds its own prompt); with
+            # streaming, sentences are voiced while the rest is still being generated
+            tts_stream = StreamingTTS(audio_out, prefer_elevenlabs=not p["fast_tts"]) if LLM_STREAMING else None
+            llm_report = {}
+            commentary = generate_commentary(timeline, max_tokens=p["llm_max_tokens"],
+                                             on_sentence=tts_stream.submit if tts_stream else None,
+                                             report=llm_report)
+            if llm_report.get("failed_windows"):
+                artifacts["failed_windows"] = llm_report["failed_windows"]
+                notify(f"Commentary for {len(llm_report['failed_windows'])}/{llm_report['windows']} parts "
+                       f"could not be generated; bridged with a neutral line.")
             
             # Save raw commentary to file as requested
             try:
-                (self.base_dir / "commentary_raw.txt").write_text(commentary, encoding="utf-8")
+                out["commentary_raw"].write_text(commentary, encoding="utf-8")
             except Exception as e:
                 print(f"Could not save commentary file: {e}")
             
             if "[LLM ERROR]" in commentary:
+                if tts_stream is not None:
+                    tts_stream.cancel()
                 notify("Commentary generation failed.")
-                return None
+                return None, artifacts
             
-            # Length Check & Summarization Loop
-            # Keep summarizing until under 9500 chars to ensure safety for edge-tts and file limits
-            current_commentary = commentary
-            iteration = 0
-            max_iterations = 3
-            
-            while len(current_commentary) > 9500 and iteration < max_iterations:
-                notify(f"Commentary long ({len(current_commentary)} chars). Summarizing (Attempt {iteration+1})...")
-                new_summary = summarize_text(current_commentary, max_chars=9000) # Aim lower to be safe
-                
-                # If summarization failed or returned empty/error, break to avoid infinite loop of nothingness
-                if not new_summary or len(new_summary) >= len(current_commentary) or "[LLM ERROR]" in new_summary:
-                    notify("Summarization didn't reduce length sufficiently. Moving to hard truncation.")
-                    break
-                    
-                current_commentary = new_summary
-                iteration += 1
-            
-            # Final Safety Hard Truncation if MULTIPLE summarizations failed
-            if len(current_commentary) > 9800:
-                notify("Still too long. Forcing hard truncation to 9500 chars.")
-                current_commentary = current_commentary[:9500]
-                # Try to cut at last sentence
-                last_dot = current_commentary.rfind('.')
-                if last_dot > 0:
-                    current_commentary = current_commentary[:last_dot+1]
-            
-            commentary = current_commentary
+            # The prompt's word budget (llm.plan_budget) sizes one call to the TTS limit,
+            # so no summarisation pass is needed; cutting at a sentence end is the safety net
+            if tts_stream is not None:
+                # TTS was fed up to TTS_MAX_CHARS, ending on a sentence boundary
+                commentary = tts_stream.text
+            elif len(commentary) > TTS_MAX_CHARS:
+                notify(f"Commentary over budget ({len(commentary)} chars). Cutting at the last sentence.")
+                commentary = fit_to_limit(commentary)
             
             # Save final processed commentary
             try:
-                (self.base_dir / "commentary_final.txt").write_text(commentary, encoding="utf-8")
+                out["commentary_final"].write_text(commentary, encoding="utf-8")
             except:
                 pass
             
             # 6. TTS
             notify("Step 6/7: Synthesizing Audio Voice...")
-            audio_out = self.base_dir / "commentary_output.mp3"
-            success = synthesize_commentary_audio(commentary, audio_out)
+            if tts_stream is not None:
+                success = tts_stream.finish()
+                artifacts["time_to_first_audio"] = tts_stream.first_audio_sec
+            else:
+                success = synthesize_commentary_audio(commentary, audio_out, prefer_elevenlabs=not p["fast_tts"])
             
             if not success:
                 notify("TTS generation failed. Check API keys.")
-                return None
+                return None, artifacts
                 
             # 7. Merge
             notify("Step 7/7: Finalizing production...")
-            final_vid = self.base_dir / "final_output.mp4"
+            final_vid = out["video"]
             if self.merge_audio_video(video_path, audio_out, final_vid):
                 notify("Displaying result now!")
-                return str(final_vid.resolve())
+                return str(final_vid.resolve()), artifacts
             else:
                 notify("Merge failed.")
-                return None
+                return None, artifacts
                 
+        except JobCancelled:
+            if tts_stream is not None:
+                tts_stream.cancel()
+            raise
         except Exception as e:
             notify(f"Processing Error: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            return None, artifacts
@@ -33,6 +33,29 @@ UMPIRE_META_JSON = BASE_DIR / "models" / "best_umpire.json"
 RUNOUT_META_JSON = BASE_DIR / "models" / "best_runout_3class.json"
 R2P1D_META_JSON  = BASE_DIR / "models" / "R(2+1)best.json"
 
+# 🔹 Optional cascade: tiny first-stage classifiers per head (any timm model,
+#    e.g. mobilenetv3_small_100, named in the JSON/checkpoint "model_name").
+#    The full EfficientNet head only runs when the tiny model is unsure.
+USE_CASCADE = False
+CASCADE_HEADS = {
+    "shot":   (BASE_DIR / "models" / "tiny_shot.pth",   BASE_DIR / "models" / "tiny_shot.json"),
+    "umpire": (BASE_DIR / "models" / "tiny_umpire.pth", BASE_DIR / "models" / "tiny_umpire.json"),
+    "runout": (BASE_DIR / "models" / "tiny_runout.pth", BASE_DIR / "models" / "tiny_runout.json"),
+}
+CASCADE_THRESHOLD  = 0.85  # escalate when tiny top-1 confidence is below this
+CASCADE_INPUT_SIZE = 128   # tiny models see a downscaled copy of the 224px input
+CASCADE_AUDIT_EVERY = 20   # also run the full head on every Nth confident answer (agreement check)
+CASCADE_REPORT_JSON = BASE_DIR / "cascade_report.json"
+
+# 🔹 Optional per-frame feature store (pooled backbone embeddings + YOLO raw outputs)
+USE_FEATURE_STORE = False
+FEATURES_DIR      = BASE_DIR / "features"
+FEATURE_MAX_DET   = 64   # YOLO boxes kept per frame
+
+# 🔹 Columnar append-only store of frame/clip/OCR results (JSON files are exported from it)
+USE_RESULT_STORE = True
+RESULTS_DIR       = BASE_DIR / "results"
+
 # Output files
 RAW_RESULTS_JSON = BASE_DIR / "model_outputs.json"
 TIMELINE_JSON    = BASE_DIR / "timeline_for_llm.json"
@@ -53,6 +76,80 @@ CLIP_LENGTH = 6   # 6-second clips
 # 🔹 New: subsample heavy processing
 FRAME_SUBSAMPLE = 4  # Check every 3 seconds
 
+# 🔹 Speed / quality presets (selectable per job). "balanced" == the defaults above.
+PRESETS = {
+    "preview": {
+        "frame_rate": FRAME_RATE, "frame_subsample": 8, "clip_length": CLIP_LENGTH,
+        "yolo_conf": 0.45, "yolo_imgsz": 640,
+        "ocr_interval": 1.0, "llm_max_tokens": 1500,
+        "run_heads": False, "run_clips": False, "fast_tts": True,
+    },
+    "balanced": {
+        "frame_rate": FRAME_RATE, "frame_subsample": FRAME_SUBSAMPLE, "clip_length": CLIP_LENGTH,
+        "yolo_conf": 0.45, "yolo_imgsz": 1280,
+        "ocr_interval": 1.5, "llm_max_tokens": 4000,
+        "run_heads": True, "run_clips": True, "fast_tts": False,
+    },
+    "accurate": {
+        "frame_rate": FRAME_RATE, "frame_subsample": 2, "clip_length": CLIP_LENGTH,
+        "yolo_conf": 0.35, "yolo_imgsz": 1280,
+        "ocr_interval": 1.5, "llm_max_tokens": 4000,
+        "run_heads": True, "run_clips": True, "fast_tts": False,
+    },
+}
+DEFAULT_PRESET = "balanced"
+PROGRESSIVE_PREVIEW_PRESET = "preview"  # first pass of progressive mode
+
+# 🔹 Delivery segmentation: heavy stages run densely inside bowling-to-dead-ball windows
+DELIVERY_SEGMENTATION  = True
+DELIVERY_DENSE_DIVISOR = 2       # inside a delivery: every (frame_subsample // 2)-th frame
+DELIVERY_SPARSE_FACTOR = 2       # outside: every (frame_subsample * 2)-th frame
+DELIVERY_PRE_ROLL_SEC  = 2.0     # window starts this long before the run-up shot
+DELIVERY_POST_ROLL_SEC = 4.0     # ... and ends this long after the score strip changes
+DELIVERY_MAX_SEC       = 25.0    # longest delivery window without a score change
+SCENE_CUT_THRESHOLD    = 28.0    # mean abs thumbnail difference (0-255) that counts as a cut
+BOWLER_VIEW_MATCH      = 0.70    # thumbnail correlation with the bowler's-end view
+BALL_EVENTS_JSON       = BASE_DIR / "ball_events.json"
+
+# 🔹 Adaptive sampling: the frame stride follows motion energy (thumbnail differences)
+ADAPTIVE_SAMPLING  = True
+MOTION_NOISE_FLOOR = 2.0     # mean abs thumbnail difference (0-255) below which a frame counts as static
+MOTION_MAX_GAP_SEC = 8.0     # minimum rate: at least one frame this often, however static the shot
+
+# 🔹 Audio prior: loudness / spectral-flux peaks of the broadcast sound (crowd roar, commentator)
+AUDIO_PRIOR            = True
+AUDIO_SAMPLE_RATE      = 16000
+AUDIO_HOP_SEC          = 0.1     # one loudness / flux value per 100 ms
+AUDIO_SMOOTH_SEC       = 1.0
+AUDIO_PEAK_Z           = 3.0     # robust z-score (median / MAD) of the excitement curve for a peak
+AUDIO_PEAK_MIN_GAP_SEC = 10.0
+AUDIO_PRE_ROLL_SEC     = 8.0     # the roar follows the event: the dense window starts this long before the peak
+AUDIO_POST_ROLL_SEC    = 4.0
+AUDIO_QUIET_FACTOR     = 2       # stretches outside every delivery / audio window are sampled this much sparser
+AUDIO_CLIP_FOCUS       = True    # R(2+1)D only runs on clips overlapping a delivery or audio window
+
+# 🔹 Replay / advertisement detection (flagged footage is skipped by the heavy stages)
+REPLAY_DETECTION     = True
+REPLAY_LOGO_TEMPLATE = BASE_DIR / "models" / "replay_logo.png"   # optional; learned from the video if missing
+REPLAY_MATCH         = 0.90   # thumbnail correlation for a logo / near-duplicate match
+REPLAY_MIN_LAG_SEC   = 8.0    # a near-duplicate must repeat footage at least this much older
+REPLAY_SEARCH_SEC    = 300.0  # ... and at most this much older
+REPLAY_MAX_SEC       = 40.0   # longest replay between two logo transitions
+AD_MIN_SEC           = 10.0   # score strip absent at least this long = ad break
+STRIP_PRESENT_MIN    = 0.60   # strip correlation with its usual appearance to count as present
+
+
+def get_preset(name: str | None = None) -> dict:
+    """Return a copy of the named preset (None -> DEFAULT_PRESET)."""
+    name = name or DEFAULT_PRESET
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}'. Choose one of: {', '.join(PRESETS)}")
+    return dict(PRESETS[name], name=name)
+
+# 🔹 Shared inference server (dynamic batching across concurrent jobs)
+USE_INFERENCE_SERVER = True
+INFER_MAX_BATCH_SIZE = 16      # frames/clips per model call
+INFER_MAX_QUEUE_DELAY = 0.010  # seconds to wait for a batch to fill
 
 
 # Load .env file
@@ -64,6 +161,31 @@ JINA_MODEL_ID = "jina-deepsearch-v1"
 JINA_BASE_URL = "https://deepsearch.jina.ai/v1"
 JINA_API_KEY = os.getenv("JINA_API_KEY")
 
+# Prompt: consecutive events with the same score / visuals / clip label become one span
+PROMPT_COMPACT_TIMELINE = True
+VISUAL_CONF_MIN = 0.8          # YOLO detections above this are described to the LLM
+COMPACT_MIN_SPAN_SEC = 12.0    # a visual-only change does not split a span shorter than this
+
+# Streaming: commentary is synthesised sentence by sentence while the LLM is still generating
+LLM_STREAMING = True
+STREAM_MIN_SENTENCE_CHARS = 80   # short sentences are joined so each TTS request carries a phrase
+TTS_STREAM_WORKERS = 3
+TTS_PART_RETRIES = 2             # extra attempts for a streamed sentence, same engine; then the stream fails
+TTS_MAX_CHARS = 9500             # edge-tts / file limit; streaming stops feeding TTS past it
+
+# Windowed commentary: long timelines are split into windows generated in parallel
+COMMENTARY_WINDOWED = True
+COMMENTARY_WINDOW_SEC = 120.0    # target window length; a window does not end inside a delivery
+COMMENTARY_WORKERS = 4
+COMMENTARY_RETRIES = 2           # extra attempts for a window whose request failed
+COMMENTARY_CARRY_SPANS = 3       # spans of the previous window repeated as context
+
+# Output budget: word hints are scaled up front so one call fits TTS_MAX_CHARS (no summarisation pass)
+CHARS_PER_WORD = 6.0             # English commentary incl. spaces / punctuation
+CHARS_PER_TOKEN = 4.0
+BUDGET_SAFETY = 0.9              # plan for this share of TTS_MAX_CHARS
+TOKEN_HEADROOM = 1.3             # max_tokens = planned tokens * this (the model never stops mid-plan)
+
 # ===== OCR.Space API Key =====
 OCRSPACE_API_KEY = os.getenv("OCRSPACE_API_KEY", "YOUR_OCRSPACE_API_KEY") # Primary
 OCRSPACE_API_KEY_2 = os.getenv("OCRSPACE_API_KEY_2", "")                 # Secondary
@@ -74,8 +196,6 @@ if OCRSPACE_API_KEY and len(OCRSPACE_API_KEY) > 10:
     OCR_KEYS.append(OCRSPACE_API_KEY)
 if OCRSPACE_API_KEY_2 and len(OCRSPACE_API_KEY_2) > 10: 
     OCR_KEYS.append(OCRSPACE_API_KEY_2)
-if OCRSPACE_API_KEY_2 and len(OCRSPACE_API_KEY_2) > 10: 
-    OCR_KEYS.append(OCRSPACE_API_KEY_2)
 
 # Fallback if none found
 if not OCR_KEYS:
@@ -90,8 +210,57 @@ ELEVENLABS_MODEL_ID = "eleven_multilingual_v2"
 ROI_FRACTION_TOP = 0.70 # Relaxed to bottom 30% to ensure scorecard is not cut off
 ROI_FRACTION_BOTTOM = 1.0
 
-# OCR.Space endpoint
-VISION_URL = "https://api.ocr.space/parse/image"
+# Local scoreboard recognizer (glyph templates learned from OCR.Space reads).
+# The API is called until every digit has exemplars, and after that whenever the local read
+# is below LOCAL_OCR_MIN_CONF or does not parse.
+LOCAL_OCR_ENABLED  = True
+LOCAL_OCR_LEARN    = True    # add glyphs from successful API reads
+LOCAL_OCR_MIN_CONF = 0.80    # margin over the runner-up character (1.0 = unambiguous)
+SCORE_GLYPHS_PATH  = BASE_DIR / "models" / "score_glyphs.npz"
+
+# Skip OCR when the score strip has not changed since the last read
+SCORE_CHANGE_DETECTION = True
+SCORE_CHANGE_THRESHOLD = 20.0   # max per-tile mean abs pixel difference (0-255) still "unchanged"
+
+# OCR schedule: "stride" reads every subsampled frame, "bisect" reads every
+# OCR_COARSE_INTERVAL_SEC and bisects intervals whose score (or strip) changed
+OCR_SCHEDULE = "stride"
+OCR_COARSE_INTERVAL_SEC = 30.0
+
+# OCR.Space endpoint (override to point at a local stand-in, see ocr_client.StandInOCRServer)
+VISION_URL = os.getenv("OCR_VISION_URL", "https://api.ocr.space/parse/image")
+
+# Concurrent OCR client: requests per key follow the preset's ocr_interval
+OCR_MAX_WORKERS  = 4
+OCR_KEY_BURST    = 2       # requests a key may send back to back
+OCR_KEY_COOLDOWN = 60.0    # seconds a key is skipped after a 403
+OCR_BATCH_SIZE   = 16      # frames prepared before their API calls are awaited
+OCR_MOSAIC_SIZE  = 6       # ticker strips stacked into one request (1 = one strip per request)
+OCR_MOSAIC_GAP   = 24      # separator rows between stacked strips (px)
+OCR_UPLOAD_FORMAT = "png1"  # "png1": binarised PNG via multipart, "jpeg": base64 JPEG
+
+# Score overlay localisation: found once per video (or matched to a stored broadcaster
+# profile) and used instead of the fixed Sony LIV crop
+SCORE_ROI_AUTO          = True
+SCORE_ROI_PROFILES_JSON = BASE_DIR / "models" / "score_roi_profiles.json"
+SCORE_ROI_SAMPLE_FRAMES = 40
+SCORE_ROI_MATCH_MIN     = 0.80    # template correlation needed to reuse a stored profile
+BROADCAST_PROFILE       = os.getenv("BROADCAST_PROFILE")   # force a named profile
+
+# Score tracking: reconcile OCR reads with cricket invariants (score_tracker.py)
+SCORE_TRACKING     = True
+TRACK_MISREAD_COST = 4.0   # per field a read disagrees with the tracked state
+TRACK_CHANGE_COST  = 3.0   # any score change
+TRACK_JUMP_COST    = 2.0   # per extra ball / wicket / implausible run jump in one step
+TRACK_MAX_JUMP_COST = 10.0 # cap on the jump part, so a real jump (after an ad break) wins after ~2 reads
+TRACK_ENTRY_COST   = 16.0  # a proposed state no legal change reaches (e.g. after a misread first frame)
+TRACK_BEAM         = 32    # states kept per step
+TRACK_TEAM_SWITCH_READS = 2   # consecutive reads of a new batting team that start a new innings
+
+# Persistent OCR result cache (strip hash -> text/parsed), shared by jobs and processes
+OCR_CACHE_ENABLED   = True
+OCR_CACHE_PATH      = BASE_DIR / "cache" / "ocr_cache.sqlite"
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024   # stored text + strip signatures; least recently used rows go first
 
 # Retry settings
 MAX_RETRIES = 5
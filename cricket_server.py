@@ -9,6 +9,7 @@ BASE_DIR = Path(__file__).parent.resolve()
 
 # File Paths
 TIMELINE_FILE = BASE_DIR / "timeline_for_llm.json"
+RESULTS_DIR = BASE_DIR / "results"    # columnar result store (see result_store.py)
 SCORE_FILE = BASE_DIR / "score_data.json"
 LOG_FILE = BASE_DIR / "error_trace.log"
 
@@ -42,6 +43,16 @@ def get_match_context_at_time(seconds: float) -> str:
     Use this when a user asks a question about 'what is happening now' or 'at X:XX time'.
     """
     import json
+    # Columnar store: binary search on the time column, no full-file parse
+    if (RESULTS_DIR / "meta.json").exists():
+        try:
+            from result_store import ResultStore
+            event = ResultStore(RESULTS_DIR, readonly=True).event_at(seconds)
+            if event is not None:
+                return json.dumps(event, indent=2)
+        except Exception:
+            pass    # fall back to the JSON export
+
     if not TIMELINE_FILE.exists():
         return "Error: No match data found."
     
@@ -49,6 +60,8 @@ def get_match_context_at_time(seconds: float) -> str:
         data = json.loads(TIMELINE_FILE.read_text(encoding="utf-8"))
     except Exception:
         return "Error: Could not parse match data."
+    if isinstance(data, dict):
+        data = data.get("events", [])   # main.py writes {"events": [...]}
 
     # Find the event closest to the given time (or the most recent one)
     # We assume 'data' is a list of events sorted by 'time_sec'
@@ -0,0 +1,318 @@
+import json
+import cv2
+import numpy as np
+from pathlib import Path
+
+from config import (
+    FRAME_RATE, FRAME_SUBSAMPLE, SCORE_CHANGE_THRESHOLD, SCORE_ROI_AUTO,
+    DELIVERY_DENSE_DIVISOR, DELIVERY_SPARSE_FACTOR, DELIVERY_PRE_ROLL_SEC, DELIVERY_POST_ROLL_SEC,
+    DELIVERY_MAX_SEC, SCENE_CUT_THRESHOLD, BOWLER_VIEW_MATCH, BALL_EVENTS_JSON, REPLAY_DETECTION,
+    DELIVERY_SEGMENTATION, ADAPTIVE_SAMPLING, MOTION_NOISE_FLOOR, MOTION_MAX_GAP_SEC, AUDIO_QUIET_FACTOR
+)
+from video_processing import get_sampled_frame_paths, frame_index_from_name
+from ocr import CROP_TOP_RATIO, CROP_BOTTOM_RATIO, SIGNATURE_HEIGHT, SIGNATURE_TILE, strip_columns, select_columns
+from score_roi import resolve_score_profile
+from footage import detect_footage, in_segments
+
+THUMB_SIZE = (64, 36)     # (w, h) of the scene thumbnails
+BOWLING_LABEL = "bowling"  # R(2+1)D class that marks a run-up / delivery
+
+
+# ================= FRAME SIGNALS =================
+
+def frame_signals(frame_paths, frame_rate: float = FRAME_RATE, roi=None, digit_regions=None) -> dict:
+    """
+    One cheap pass over the extracted frames (JPEG decoded at 1/4 scale, grayscale):
+    a scene thumbnail and a score strip signature per frame. Returns
+    {"paths", "times", "thumbs": (n, 36, 64) uint8, "strips": (n, 32, w) uint8,
+     "cut": (n,) bool, "strip_change": (n,) bool, "motion": (n,) float32}
+    cut[i] / strip_change[i] / motion[i] compare frame i with frame i - 1; motion is the
+    mean abs thumbnail difference. With digit_regions (score profile) strip_change only
+    looks at those columns of the strip, like StripChangeDetector.
+    """
+    paths = list(frame_paths)
+    times = np.array([frame_index_from_name(p) / float(frame_rate) for p in paths], dtype=np.float64)
+    thumbs, strips = [], []
+    strip_size = None
+    for p in paths:
+        gray = cv2.imread(str(p), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if gray is None:
+            thumbs.append(thumbs[-1] if thumbs else np.zeros(THUMB_SIZE[::-1], np.uint8))
+            strips.append(strips[-1] if strips else None)
+            continue
+        thumbs.append(cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA))
+
+        h, w = gray.shape
+        if roi is not None:
+            band = gray[int(h * roi["top"]):int(h * roi["bottom"]), int(w * roi["left"]):int(w * roi["right"])]
+        else:
+            band = gray[int(h * CROP_TOP_RATIO):int(h * CROP_BOTTOM_RATIO)]
+        if strip_size is None:
+            bh, bw = band.shape
+            strip_size = (max(SIGNATURE_HEIGHT, round(bw * SIGNATURE_HEIGHT / max(bh, 1))), SIGNATURE_HEIGHT)
+        strips.append(cv2.resize(band, strip_size, interpolation=cv2.INTER_AREA))
+
+    n = len(paths)
+    if strip_size is None:
+        strip_size = (SIGNATURE_HEIGHT, SIGNATURE_HEIGHT)
+    blank = np.zeros(strip_size[::-1], np.uint8)
+    thumbs = np.stack(thumbs) if n else np.zeros((0,) + THUMB_SIZE[::-1], np.uint8)
+    strips = np.stack([s if s is not None else blank for s in strips]) if n else np.zeros((0,) + blank.shape, np.uint8)
+
+    cut = np.zeros(n, dtype=bool)
+    strip_change = np.zeros(n, dtype=bool)
+    motion = np.zeros(n, dtype=np.float32)
+    if n > 1:
+        motion[1:] = np.abs(thumbs[1:].astype(np.int16) - thumbs[:-1].astype(np.int16)).mean(axis=(1, 2))
+        cut[1:] = motion[1:] > SCENE_CUT_THRESHOLD
+        digits = select_columns(strips, strip_columns(roi, digit_regions))
+        strip_change[1:] = _tile_diff(digits[1:], digits[:-1]) > SCORE_CHANGE_THRESHOLD
+
+    return {"paths": paths, "times": times, "thumbs": thumbs, "strips": strips,
+            "cut": cut, "strip_change": strip_change, "motion": motion}
+
+
+def _tile_diff(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Largest per-tile mean abs difference between stacks of strip signatures (same test as StripChangeDetector)."""
+    n, h, w = a.shape
+    h, w = h // SIGNATURE_TILE * SIGNATURE_TILE, w // SIGNATURE_TILE * SIGNATURE_TILE
+    d = np.abs(a[:, :h, :w].astype(np.float32) - b[:, :h, :w].astype(np.float32))
+    d = d.reshape(n, h // SIGNATURE_TILE, SIGNATURE_TILE, w // SIGNATURE_TILE, SIGNATURE_TILE).mean(axis=(2, 4))
+    return d.reshape(n, -1).max(axis=1)
+
+
+def _normalized(thumbs: np.ndarray) -> np.ndarray:
+    v = thumbs.reshape(len(thumbs), -1).astype(np.float32)
+    v -= v.mean(axis=1, keepdims=True)
+    return v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-6)
+
+
+# ================= SEGMENTATION =================
+
+def _bowling_intervals(clip_results):
+    return [(c["start_time"], c["end_time"]) for c in (clip_results or [])
+            if (c.get("video_class") or {}).get("label") == BOWLING_LABEL
+            and c.get("start_time") is not None and c.get("end_time") is not None]
+
+
+def _bowler_view_template(signals, shot_starts, bowling):
+    """
+    Mean normalised thumbnail of the bowler's-end camera view. With clip labels it is
+    learned from shot starts inside bowling clips; without, it is the shot-start view
+    that recurs most often (the broadcast returns to it for every ball).
+    """
+    vecs = _normalized(signals["thumbs"][shot_starts]) if len(shot_starts) else np.zeros((0, 1))
+    times = signals["times"][shot_starts] if len(shot_starts) else np.zeros(0)
+    if bowling:
+        inside = [i for i, t in enumerate(times) if any(st <= t < et for st, et in bowling)]
+        if inside:
+            return vecs[inside].mean(axis=0)
+    if len(vecs) < 3:
+        return None
+    sims = vecs @ vecs.T
+    neighbours = (sims >= BOWLER_VIEW_MATCH).sum(axis=1) - 1
+    best = int(neighbours.argmax())
+    if neighbours[best] < 2:
+        return None
+    return vecs[sims[best] >= BOWLER_VIEW_MATCH].mean(axis=0)
+
+
+def segment_deliveries(signals: dict, clip_results=None) -> list:
+    """
+    Bowling-to-dead-ball windows from cheap signals:
+    - a scene cut back to the bowler's-end view (or the start of an R(2+1)D "bowling" clip)
+      starts a delivery, DELIVERY_PRE_ROLL_SEC earlier;
+    - the next score strip change (plus DELIVERY_POST_ROLL_SEC) ends it, at the latest
+      after DELIVERY_MAX_SEC or at the next delivery.
+    Starts inside replay / ad segments (signals["segments"]) are not new deliveries.
+    Overlapping windows are merged. Returns [{"start", "end", "signals"}] in seconds.
+    """
+    times = signals["times"]
+    if len(times) == 0:
+        return []
+    shot_starts = np.concatenate([[0], np.nonzero(signals["cut"])[0]]).astype(int)
+    bowling = _bowling_intervals(clip_results)
+
+    starts = {}
+    template = _bowler_view_template(signals, shot_starts, bowling)
+    if template is not None:
+        match = _normalized(signals["thumbs"][shot_starts]) @ template
+        match = match / max(float(np.linalg.norm(template)), 1e-6)
+        for i, m in zip(shot_starts, match):
+            if m >= BOWLER_VIEW_MATCH:
+                starts[float(times[i])] = "bowler_view_cut"
+    for st, _ in bowling:
+        if not any(abs(st - t) <= DELIVERY_PRE_ROLL_SEC for t in starts):
+            starts[float(st)] = "bowling_clip"
+    segments = signals.get("segments") or []
+    starts = {t: why for t, why in starts.items() if in_segments(t, segments) is None}
+
+    change_times = times[signals["strip_change"]]
+    order = sorted(starts)
+    windows = []
+    for k, t in enumerate(order):
+        limit = t + DELIVERY_MAX_SEC
+        if k + 1 < len(order):
+            limit = min(limit, order[k + 1])
+        later = change_times[(change_times > t) & (change_times <= limit)]
+        end = min(float(later[0]) + DELIVERY_POST_ROLL_SEC, limit) if len(later) else limit
+        windows.append({"start": max(float(times[0]), t - DELIVERY_PRE_ROLL_SEC), "end": end,
+                        "signals": {"start": starts[t],
+                                    "strip_change": float(later[0]) if len(later) else None}})
+
+    merged = []
+    for w in windows:
+        if merged and w["start"] <= merged[-1]["end"]:
+            merged[-1]["end"] = max(merged[-1]["end"], w["end"])
+        else:
+            merged.append(w)
+    return merged
+
+
+def in_windows(t: float, windows) -> bool:
+    return any(w["start"] <= t < w["end"] for w in windows)
+
+
+# ================= SCHEDULING =================
+
+def motion_schedule(signals, windows=(), subsample: int = FRAME_SUBSAMPLE,
+                    max_gap_sec: float = MOTION_MAX_GAP_SEC, sparse_factor: float = DELIVERY_SPARSE_FACTOR) -> list:
+    """
+    Indices of the frames to sample, spaced by motion energy instead of a fixed stride.
+
+    Motion above MOTION_NOISE_FLOOR accumulates frame by frame; a frame is taken once
+    the sum reaches a budget of `subsample` frames of average motion, so busy play is
+    sampled densely and static shots sparsely while the average rate stays near
+    1 / subsample. Inside delivery windows the budget is divided by
+    DELIVERY_DENSE_DIVISOR, outside it is multiplied by sparse_factor.
+    Scene cuts and score strip changes are always taken; frames are at least
+    subsample // DELIVERY_DENSE_DIVISOR apart and at most max_gap_sec apart.
+    """
+    times = signals["times"]
+    n = len(times)
+    if n == 0:
+        return []
+    forced = signals["cut"] | signals["strip_change"]
+    energy = np.where(signals["cut"], 0.0, np.maximum(signals["motion"] - MOTION_NOISE_FLOOR, 0.0))
+    mean = float(energy[1:].mean()) if n > 1 else 0.0
+    if mean <= 0:
+        return list(range(0, n, max(subsample, 1)))
+    budget = mean * max(subsample, 1)
+    min_gap = max(1, subsample // DELIVERY_DENSE_DIVISOR)
+
+    picked, acc, last = [0], 0.0, 0
+    for i in range(1, n):
+        acc += energy[i]
+        scale = 1.0
+        if windows:
+            scale = 1.0 / DELIVERY_DENSE_DIVISOR if in_windows(times[i], windows) else float(sparse_factor)
+        if times[i] - times[last] >= max_gap_sec or \
+                (i - last >= min_gap and (forced[i] or acc >= budget * scale)):
+            picked.append(i)
+            acc, last = 0.0, i
+    return picked
+
+
+def schedule_frames(frame_paths, windows, frame_rate: float = FRAME_RATE, subsample: int = FRAME_SUBSAMPLE,
+                    skip=None, signals=None, audio_windows=None):
+    """
+    Frames for the heavy stages: every (subsample // DELIVERY_DENSE_DIVISOR)-th frame
+    inside a delivery window, every (subsample * DELIVERY_SPARSE_FACTOR)-th outside.
+    Without windows the plain uniform stride is kept. With ADAPTIVE_SAMPLING and the
+    frame signals the stride follows motion energy (motion_schedule). audio_windows
+    (peaks of the broadcast sound) are sampled as densely as deliveries, and with them
+    the rest of the video AUDIO_QUIET_FACTOR times sparser. Frames inside `skip`
+    segments (replays, ads) are left out.
+    """
+    frame_paths = list(frame_paths)
+    skip = skip or []
+    audio_windows = audio_windows or []
+    windows = list(windows) + list(audio_windows)
+    sparse_factor = DELIVERY_SPARSE_FACTOR * (AUDIO_QUIET_FACTOR if audio_windows else 1)
+    if ADAPTIVE_SAMPLING and signals is not None and len(signals["paths"]) == len(frame_paths):
+        out = [frame_paths[i] for i in motion_schedule(signals, windows, subsample, sparse_factor=sparse_factor)]
+    elif not windows:
+        out = frame_paths[::max(subsample, 1)]
+    else:
+        dense = max(1, subsample // DELIVERY_DENSE_DIVISOR)
+        sparse = max(1, subsample * sparse_factor)
+        out = []
+        for i, p in enumerate(frame_paths):
+            t = frame_index_from_name(p) / float(frame_rate)
+            if i % (dense if in_windows(t, windows) else sparse) == 0:
+                out.append(p)
+    if skip:
+        out = [p for p in out if in_segments(frame_index_from_name(p) / float(frame_rate), skip) is None]
+    return out
+
+
+def plan_frames(frames_dir: Path, frame_rate: float = FRAME_RATE, subsample: int = FRAME_SUBSAMPLE,
+                clip_results=None, signals=None, audio_windows=None):
+    """
+    (frame_paths, windows, signals) for one pass. signals can be passed back in to
+    re-plan with clip labels without decoding the frames again. With REPLAY_DETECTION,
+    signals["segments"] holds the replay / ad segments and their frames are not scheduled.
+    audio_windows (audio_prior.analyze_audio) are kept in signals["audio_windows"].
+    """
+    all_frames = get_sampled_frame_paths(frames_dir, 1)
+    if signals is None:
+        profile = resolve_score_profile(all_frames) if SCORE_ROI_AUTO else None
+        signals = frame_signals(all_frames, frame_rate, roi=profile["roi"] if profile else None,
+                                digit_regions=profile["digit_regions"] if profile else None)
+        signals["audio_windows"] = audio_windows or []
+        signals["segments"] = detect_footage(signals) if REPLAY_DETECTION else []
+        if signals["segments"]:
+            kinds = [seg["kind"] for seg in signals["segments"]]
+            flagged = sum(seg["end"] - seg["start"] for seg in signals["segments"])
+            print(f"[FOOTAGE] {kinds.count('replay')} replays, {kinds.count('ad')} ad breaks "
+                  f"({flagged:.0f}s) will be skipped.")
+    windows = segment_deliveries(signals, clip_results) if DELIVERY_SEGMENTATION else []
+    frame_paths = schedule_frames(all_frames, windows, frame_rate, subsample, skip=signals.get("segments"),
+                                  signals=signals, audio_windows=signals.get("audio_windows"))
+
+    duration = (len(all_frames) / float(frame_rate)) or 1.0
+    covered = sum(w["end"] - w["start"] for w in windows)
+    print(f"[DELIVERY] {len(windows)} deliveries covering {100 * covered / duration:.0f}% of the video"
+          f"{' (with clip labels)' if clip_results else ''}; {len(frame_paths)} of {len(all_frames)} frames "
+          f"scheduled{' by motion' if ADAPTIVE_SAMPLING else ''} "
+          f"(uniform stride would be {len(all_frames[::max(subsample, 1)])}).")
+    return frame_paths, windows, signals
+
+
+# ================= BALL EVENTS =================
+
+def build_ball_events(windows, timeline, clip_results=None) -> dict:
+    """
+    ball_events.json content: one "ball" per delivery window with the clip it starts in
+    and its timeline events as "supporting_frames". Timeline events inside a window
+    get "ball_index".
+    """
+    clips = sorted((c for c in (clip_results or []) if c.get("start_time") is not None),
+                   key=lambda c: c["start_time"])
+    balls = []
+    for k, w in enumerate(windows):
+        overlapping = [c for c in clips if c["start_time"] < w["end"] and c["end_time"] > w["start"]]
+        bowling = [c for c in overlapping if (c.get("video_class") or {}).get("label") == BOWLING_LABEL]
+        clip = (bowling or overlapping or [{}])[0]
+        frames = [e for e in timeline if w["start"] <= e["time_sec"] < w["end"]]
+        for e in frames:
+            e["ball_index"] = k
+        balls.append({
+            "ball_index": k,
+            "clip_name": clip.get("clip_name"),
+            "clip_path": clip.get("clip_path"),
+            "start_time": round(w["start"], 3),
+            "end_time": round(w["end"], 3),
+            "video_class": clip.get("video_class"),
+            "signals": w["signals"],
+            "supporting_frames": frames,
+        })
+    return {"balls": balls}
+
+
+def save_ball_events(windows, timeline, clip_results=None, path: Path = BALL_EVENTS_JSON):
+    data = build_ball_events(windows, timeline, clip_results)
+    with open(path, "w") as f:
+        json.dump(data, f)
+    print(f"[DELIVERY] Saved {len(data['balls'])} balls to {path}")
+    return data
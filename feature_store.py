@@ -0,0 +1,185 @@
+import hashlib
+import json
+import shutil
+import numpy as np
+from pathlib import Path
+
+from config import FEATURES_DIR, FEATURE_MAX_DET, FRAME_RATE
+
+
+def video_hash(video_path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of the video file contents (first 16 hex chars)."""
+    h = hashlib.sha1()
+    with open(video_path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _frame_count(frames_dir: Path) -> int:
+    """Rows needed to index every frame_XXXXXX.jpg by its file number."""
+    numbers = [int(p.stem.split("_")[1]) for p in frames_dir.glob("frame_*.jpg")]
+    return max(numbers) + 1 if numbers else 0
+
+
+class FeatureStore:
+    """
+    Memory-mapped per-frame store for ONE video, rows keyed by frame number:
+
+        <root>/meta.json          n_frames, yolo class names, head class names
+        <root>/yolo.npy           (n_frames, max_det, 6) float32  [x1, y1, x2, y2, conf, class_id]
+        <root>/yolo_count.npy     (n_frames,) int16, -1 = frame not stored yet
+        <root>/emb_<head>.npy     (n_frames, dim) float16 pooled backbone embedding
+        <root>/has_<head>.npy     (n_frames,) uint8
+
+    Rows are written in place, so a crashed run keeps everything stored so far.
+    """
+
+    def __init__(self, root: Path, n_frames: int, max_det: int = FEATURE_MAX_DET):
+        self.root = Path(root)
+        self.meta_path = self.root / "meta.json"
+        self._arrays = {}
+
+        meta = None
+        if self.meta_path.exists():
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if meta.get("n_frames") != n_frames or meta.get("max_det") != max_det:
+                print(f"[FEATURES] Store layout changed ({meta.get('n_frames')} -> {n_frames} frames). Resetting {self.root}")
+                shutil.rmtree(self.root, ignore_errors=True)
+                meta = None
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta = meta or {"n_frames": n_frames, "max_det": max_det, "yolo_names": {}, "heads": {}}
+        self._save_meta()
+
+    @classmethod
+    def for_video(cls, video_path: Path, frames_dir: Path,
+                  frame_rate=FRAME_RATE, root: Path = FEATURES_DIR):
+        """Open (or create) the store for this video's contents at this frame rate."""
+        key = f"{video_hash(video_path)}_{frame_rate}fps"
+        return cls(Path(root) / key, _frame_count(frames_dir))
+
+    # ---------- internals ----------
+
+    def _save_meta(self):
+        self.meta_path.write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+
+    def _array(self, name, shape, dtype, fill=0):
+        arr = self._arrays.get(name)
+        if arr is not None:
+            return arr
+        path = self.root / f"{name}.npy"
+        if path.exists():
+            arr = np.load(path, mmap_mode="r+")
+        else:
+            arr = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+            arr[:] = fill
+        self._arrays[name] = arr
+        return arr
+
+    def _yolo_arrays(self):
+        n, k = self.meta["n_frames"], self.meta["max_det"]
+        boxes = self._array("yolo", (n, k, 6), np.float32)
+        count = self._array("yolo_count", (n,), np.int16, fill=-1)
+        return boxes, count
+
+    # ---------- YOLO ----------
+
+    def put_yolo(self, frame_no: int, detections, names: dict | None = None):
+        boxes, count = self._yolo_arrays()
+        if names and not self.meta["yolo_names"]:
+            self.meta["yolo_names"] = {str(k): v for k, v in names.items()}
+            self._save_meta()
+
+        dets = sorted(detections, key=lambda d: d["conf"], reverse=True)[:self.meta["max_det"]]
+        for i, d in enumerate(dets):
+            boxes[frame_no, i, :4] = d["bbox"]
+            boxes[frame_no, i, 4] = d["conf"]
+            boxes[frame_no, i, 5] = d["class_id"]
+        count[frame_no] = len(dets)
+
+    def get_yolo(self, frame_no: int):
+        """Detections in the same dict format as run_on_frames, or None if not stored."""
+        boxes, count = self._yolo_arrays()
+        c = int(count[frame_no])
+        if c < 0:
+            return None
+        names = self.meta["yolo_names"]
+        out = []
+        for row in boxes[frame_no, :c]:
+            cls_id = int(row[5])
+            out.append({
+                "bbox": [float(v) for v in row[:4]],
+                "conf": float(row[4]),
+                "class_id": cls_id,
+                "class_name": names.get(str(cls_id), str(cls_id)),
+            })
+        return out
+
+    def stored_frames(self):
+        _, count = self._yolo_arrays()
+        return [int(i) for i in np.nonzero(count >= 0)[0]]
+
+    # ---------- embeddings ----------
+
+    def put_embedding(self, head: str, frame_no: int, emb, class_names=None):
+        emb = np.asarray(emb, dtype=np.float16).reshape(-1)
+        if head not in self.meta["heads"]:
+            self.meta["heads"][head] = {"dim": int(emb.shape[0]), "class_names": list(class_names or [])}
+            self._save_meta()
+        n, dim = self.meta["n_frames"], self.meta["heads"][head]["dim"]
+        self._array(f"emb_{head}", (n, dim), np.float16)[frame_no] = emb
+        self._array(f"has_{head}", (n,), np.uint8)[frame_no] = 1
+
+    def get_embedding(self, head: str, frame_no: int):
+        if head not in self.meta["heads"]:
+            return None
+        n, dim = self.meta["n_frames"], self.meta["heads"][head]["dim"]
+        if not self._array(f"has_{head}", (n,), np.uint8)[frame_no]:
+            return None
+        return np.asarray(self._array(f"emb_{head}", (n, dim), np.float16)[frame_no], dtype=np.float32)
+
+    def flush(self):
+        for arr in self._arrays.values():
+            arr.flush()
+
+
+if __name__ == "__main__":
+    # Recompute heads + timeline from a stored run, without touching YOLO or the backbones:
+    #   python feature_store.py path/to/video.mp4
+    import sys
+    from config import (
+        VIDEO_PATH, FRAMES_DIR, RAW_RESULTS_JSON, TIMELINE_JSON, SCORE_JSON,
+        SHOT_WEIGHTS, UMPIRE_WEIGHTS, RUNOUT_WEIGHTS, SHOT_META_JSON, UMPIRE_META_JSON, RUNOUT_META_JSON
+    )
+    from models import load_efficientnet_classifier, load_umpire_model
+    from inference import run_from_feature_store
+    from timeline import build_timeline
+
+    video = Path(sys.argv[1]) if len(sys.argv) >= 2 else VIDEO_PATH
+    store = FeatureStore.for_video(video, FRAMES_DIR)
+
+    shot_model, shot_classes = load_efficientnet_classifier(SHOT_WEIGHTS, SHOT_META_JSON)
+    umpire_model, umpire_classes = load_umpire_model(UMPIRE_WEIGHTS, UMPIRE_META_JSON)
+    runout_model, runout_classes = load_efficientnet_classifier(RUNOUT_WEIGHTS, RUNOUT_META_JSON)
+
+    frame_results = run_from_feature_store(store, FRAMES_DIR, {
+        "shot": (shot_model, shot_classes),
+        "umpire": (umpire_model, umpire_classes),
+        "runout": (runout_model, runout_classes),
+    })
+
+    clip_results = []
+    if RAW_RESULTS_JSON.exists():
+        clip_results = json.loads(RAW_RESULTS_JSON.read_text()).get("clips", [])
+    score_by_frame = {}
+    if SCORE_JSON.exists():
+        score_by_frame = {e["frame"]: e for e in json.loads(SCORE_JSON.read_text(encoding="utf-8")) if e.get("frame")}
+
+    timeline = build_timeline(frame_results, clip_results, score_by_frame=score_by_frame)
+    with open(TIMELINE_JSON, "w") as f:
+        json.dump({"events": timeline}, f, indent=2)
+    print(f"Recomputed {len(frame_results)} frames from {store.root} -> {TIMELINE_JSON}")
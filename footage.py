@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+from pathlib import Path
+
+from config import (
+    REPLAY_LOGO_TEMPLATE, REPLAY_MATCH, REPLAY_MIN_LAG_SEC, REPLAY_SEARCH_SEC, REPLAY_MAX_SEC,
+    AD_MIN_SEC, STRIP_PRESENT_MIN
+)
+
+MAX_REPEAT_MATCHES = 3   # a replayed moment matches a few older frames; a standard camera view matches many
+DUP_BLOCK = 256          # rows per block of the similarity search
+
+
+def _runs(mask):
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    diff = np.diff(padded)
+    return list(zip(np.nonzero(diff == 1)[0], np.nonzero(diff == -1)[0]))
+
+
+def _normalized(x: np.ndarray) -> np.ndarray:
+    v = x.reshape(len(x), -1).astype(np.float32)
+    v -= v.mean(axis=1, keepdims=True)
+    return v / np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-6)
+
+
+def _frame_step(times: np.ndarray) -> float:
+    return float(np.median(np.diff(times))) if len(times) > 1 else 1.0
+
+
+# ================= SIGNALS =================
+
+def strip_presence(signals) -> np.ndarray:
+    """Correlation of each frame's score strip with its usual (median) appearance."""
+    strips = signals["strips"]
+    if len(strips) == 0:
+        return np.zeros(0, dtype=np.float32)
+    usual = _normalized(np.median(strips, axis=0)[None])[0]
+    return _normalized(strips) @ usual
+
+
+def logo_frames(signals, template_path: Path = REPLAY_LOGO_TEMPLATE) -> np.ndarray:
+    """
+    Frames showing the replay transition logo. With a stored template image the
+    thumbnails are matched against it. Otherwise the logo is learned: a one- or
+    two-frame shot between cuts whose picture recurs at least three times in the video.
+    """
+    thumbs, times, cut = signals["thumbs"], signals["times"], signals["cut"]
+    n = len(thumbs)
+    vecs = _normalized(thumbs)
+    template_path = Path(template_path)
+    if template_path.exists():
+        img = cv2.imread(str(template_path), cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            t = _normalized(cv2.resize(img, thumbs.shape[1:][::-1], interpolation=cv2.INTER_AREA)[None])[0]
+            return vecs @ t >= REPLAY_MATCH
+
+    shot_id = np.cumsum(cut)
+    shot_len = np.bincount(shot_id)[shot_id]
+    flashes = np.nonzero((shot_len <= 2) & (np.arange(n) > 0))[0]
+    mask = np.zeros(n, dtype=bool)
+    if len(flashes) < 3:
+        return mask
+    sims = vecs[flashes] @ vecs[flashes].T
+    far = np.abs(times[flashes][:, None] - times[flashes][None, :]) >= REPLAY_MIN_LAG_SEC
+    recurring = ((sims >= REPLAY_MATCH) & far).sum(axis=1) >= 2
+    mask[flashes[recurring]] = True
+    return mask
+
+
+def near_duplicates(signals) -> np.ndarray:
+    """
+    Frames that repeat a specific earlier moment (REPLAY_MIN_LAG_SEC .. REPLAY_SEARCH_SEC
+    older, in a different shot). Views that match many older frames (the bowler's-end
+    camera, wide shots, graphics) are standard views, not replays.
+    """
+    thumbs, times = signals["thumbs"], signals["times"]
+    n = len(thumbs)
+    vecs = _normalized(thumbs)
+    shot_id = np.cumsum(signals["cut"])
+    dup = np.zeros(n, dtype=bool)
+    for b0 in range(0, n, DUP_BLOCK):
+        rows = np.arange(b0, min(n, b0 + DUP_BLOCK))
+        sims = vecs[rows] @ vecs.T                                    # (rows, n)
+        lag = times[rows][:, None] - times[None, :]
+        eligible = (lag >= REPLAY_MIN_LAG_SEC) & (lag <= REPLAY_SEARCH_SEC) \
+            & (shot_id[rows][:, None] != shot_id[None, :])
+        matches = ((sims >= REPLAY_MATCH) & eligible).sum(axis=1)
+        dup[rows] = (matches >= 1) & (matches <= MAX_REPEAT_MATCHES)
+    return dup
+
+
+# ================= SEGMENTS =================
+
+def detect_footage(signals) -> list:
+    """
+    Replay and ad segments: [{"start", "end", "kind": "replay" | "ad", "evidence"}] in seconds.
+
+    replay: footage between two logo transitions at most REPLAY_MAX_SEC apart, or a run
+    of two or more frames that near-duplicate earlier footage.
+    ad: the score strip is absent (low correlation with its usual look) for AD_MIN_SEC.
+    """
+    times = signals["times"]
+    if len(times) < 3:
+        return []
+    step = _frame_step(times)
+    segments = []
+
+    # Logo transitions, paired in order: logo -> replay -> logo
+    occurrences = _runs(logo_frames(signals))
+    k = 0
+    while k + 1 < len(occurrences):
+        (s0, e0), (s1, e1) = occurrences[k], occurrences[k + 1]
+        if times[s1] - times[e0 - 1] <= REPLAY_MAX_SEC:
+            segments.append({"start": float(times[s0]), "end": float(times[e1 - 1]) + step,
+                             "kind": "replay", "evidence": "logo"})
+            k += 2
+        else:
+            k += 1
+
+    for s, e in _runs(near_duplicates(signals)):
+        if e - s >= 2:
+            segments.append({"start": float(times[s]), "end": float(times[e - 1]) + step,
+                             "kind": "replay", "evidence": "near_duplicate"})
+
+    for s, e in _runs(strip_presence(signals) < STRIP_PRESENT_MIN):
+        start, end = float(times[s]), float(times[e - 1]) + step
+        if end - start >= AD_MIN_SEC:
+            segments.append({"start": start, "end": end, "kind": "ad", "evidence": "no_score_strip"})
+
+    segments.sort(key=lambda seg: seg["start"])
+    merged = []
+    for seg in segments:
+        if merged and seg["start"] <= merged[-1]["end"] and seg["kind"] == merged[-1]["kind"]:
+            merged[-1]["end"] = max(merged[-1]["end"], seg["end"])
+            if seg["evidence"] not in merged[-1]["evidence"]:
+                merged[-1]["evidence"] += "+" + seg["evidence"]
+        else:
+            merged.append(dict(seg))
+    return merged
+
+
+def in_segments(t: float, segments) -> dict | None:
+    for seg in segments:
+        if seg["start"] <= t < seg["end"]:
+            return seg
+    return None
+
+
+def mostly_flagged(start: float, end: float, segments, share: float = 0.5) -> bool:
+    """True if at least `share` of [start, end) lies in flagged segments (e.g. a clip)."""
+    if end <= start:
+        return False
+    covered = sum(max(0.0, min(end, seg["end"]) - max(start, seg["start"])) for seg in segments)
+    return covered >= share * (end - start)
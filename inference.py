@@ -1,10 +1,16 @@
 import cv2
 import torch
+import torch.nn.functional as F
 import torchvision.transforms as T
 from pathlib import Path
 
-from config import DEVICE, FRAME_SUBSAMPLE, FRAME_RATE, CLIP_LENGTH
+from config import (
+    DEVICE, FRAME_SUBSAMPLE, FRAME_RATE, CLIP_LENGTH,
+    CASCADE_THRESHOLD, CASCADE_INPUT_SIZE, CASCADE_AUDIT_EVERY
+)
 from video_processing import get_sampled_frame_paths, frame_index_from_name, load_video_as_tensor
+from models import split_backbone_head
+from footage import mostly_flagged
 
 image_transform = T.Compose([
     T.ToPILImage(),
@@ -15,6 +21,141 @@ image_transform = T.Compose([
                 std=[0.229, 0.224, 0.225]),
 ])
 
+def _parse_yolo(pred):
+    """Flatten one YOLO Results object into detection dicts + lower-cased class names."""
+    detections = []
+    detected_names = set()
+    for box in pred.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        conf = float(box.conf[0])
+        cls_id = int(box.cls[0])
+        cls_name = pred.names.get(cls_id, str(cls_id))
+
+        detections.append({
+            "bbox": [x1, y1, x2, y2],
+            "conf": conf,
+            "class_id": cls_id,
+            "class_name": cls_name,
+        })
+        detected_names.add(cls_name.lower())
+    return detections, detected_names
+
+
+def _head_triggers(detected_names):
+    """Which classifier heads YOLO allows to run on this frame."""
+    return {
+        "shot": any(x in detected_names for x in ["batsman", "batter", "player", "person"]),
+        "umpire": ("umpire" in detected_names or "official" in detected_names),
+        "runout": any(x in detected_names for x in ["stump", "stumps", "wicket", "wickets"]),
+    }
+
+
+def _classify(model, classes, img_tensor):
+    with torch.no_grad():
+        logits = model(img_tensor)
+        probs = torch.softmax(logits, dim=1)[0]
+        top_prob, top_idx = torch.max(probs, dim=0)
+    return classes[int(top_idx)], float(top_prob)
+
+
+# ================= CASCADE (tiny first stage -> full head) =================
+
+class CascadeStats:
+    """
+    Per-head counters for the tiny->full cascade.
+    - escalation_rate: share of triggered frames where the tiny model was unsure
+    - agreement_escalated: tiny top-1 == full top-1 on escalated frames
+    - agreement_audited: same, on the confident frames re-checked every CASCADE_AUDIT_EVERY
+      (this is the estimate of how often an accepted tiny answer is wrong)
+    """
+
+    def __init__(self, audit_every: int = CASCADE_AUDIT_EVERY):
+        self.audit_every = audit_every
+        self.heads = {}
+
+    def _counters(self, head):
+        return self.heads.setdefault(head, {
+            "calls": 0, "escalated": 0, "confident": 0, "audit_tick": 0,
+            "audited": 0, "agree_escalated": 0, "agree_audited": 0,
+        })
+
+    def should_audit(self, head) -> bool:
+        """Call once per confident tiny answer; True for every Nth one."""
+        if not self.audit_every or self.audit_every <= 0:
+            return False
+        c = self._counters(head)
+        c["audit_tick"] += 1
+        return c["audit_tick"] % self.audit_every == 0
+
+    def record(self, head, tiny_label, full_label=None, escalated=False):
+        c = self._counters(head)
+        c["calls"] += 1
+        if escalated:
+            c["escalated"] += 1
+            c["agree_escalated"] += int(tiny_label == full_label)
+        else:
+            c["confident"] += 1
+            if full_label is not None:
+                c["audited"] += 1
+                c["agree_audited"] += int(tiny_label == full_label)
+
+    def summary(self) -> dict:
+        out = {}
+        for head, c in self.heads.items():
+            out[head] = {
+                "calls": c["calls"],
+                "escalated": c["escalated"],
+                "escalation_rate": c["escalated"] / c["calls"] if c["calls"] else 0.0,
+                "audited": c["audited"],
+                "agreement_escalated": c["agree_escalated"] / c["escalated"] if c["escalated"] else None,
+                "agreement_audited": c["agree_audited"] / c["audited"] if c["audited"] else None,
+            }
+        return out
+
+    def print_report(self):
+        for head, s in self.summary().items():
+            agree_esc = "n/a" if s["agreement_escalated"] is None else f"{s['agreement_escalated']:.1%}"
+            agree_aud = "n/a" if s["agreement_audited"] is None else f"{s['agreement_audited']:.1%}"
+            print(f"[CASCADE] {head:7s}: calls={s['calls']}, escalated={s['escalation_rate']:.1%}, "
+                  f"agreement escalated={agree_esc}, audited={agree_aud} (n={s['audited']})")
+
+
+def _downscale_for_tiny(img_tensor):
+    """Tiny models see a smaller copy of the normalised 224px input. Accepts (C,H,W) or (N,C,H,W)."""
+    batched = img_tensor.dim() == 4
+    x = img_tensor if batched else img_tensor.unsqueeze(0)
+    x = F.interpolate(x, size=(CASCADE_INPUT_SIZE, CASCADE_INPUT_SIZE), mode="bilinear", align_corners=False)
+    return x if batched else x[0]
+
+
+def _classify_cascade(head, tiny_model, full_model, classes, img_tensor, stats):
+    tiny_label, tiny_conf = _classify(tiny_model, classes, _downscale_for_tiny(img_tensor))
+    escalate = tiny_conf < CASCADE_THRESHOLD
+
+    if escalate or stats.should_audit(head):
+        full_label, full_conf = _classify(full_model, classes, img_tensor)
+        stats.record(head, tiny_label, full_label, escalated=escalate)
+        if escalate:
+            return full_label, full_conf
+    else:
+        stats.record(head, tiny_label)
+
+    return tiny_label, tiny_conf
+
+
+def _frame_entry(frame_index, fpath, time_sec, detections, head_outputs):
+    entry = {
+        "frame_index": frame_index,
+        "frame_path": str(fpath),
+        "time_sec": time_sec,
+        "yolo_detections": detections,
+    }
+    for head in ("shot", "umpire", "runout"):
+        label, conf = head_outputs.get(head) or ("no_detection", 0.0)
+        entry[head] = {"label": label, "confidence": conf}
+    return entry
+
+
 def run_on_frames(frames_dir: Path,
                   yolo_model,
                   shot_model,
@@ -22,11 +163,68 @@ def run_on_frames(frames_dir: Path,
                   runout_model,
                   shot_classes,
                   umpire_classes,
-                  runout_classes):
+                  runout_classes,
+                  server=None,
+                  cascades=None,
+                  cascade_stats=None,
+                  feature_store=None,
+                  subsample: int = FRAME_SUBSAMPLE,
+                  frame_rate: float = FRAME_RATE,
+                  yolo_conf: float = 0.45,
+                  yolo_imgsz: int = 1280,
+                  run_heads: bool = True,
+                  reuse=None,
+                  result_store=None,
+                  frame_paths=None):
+    """
+    YOLO-first frame inference.
+    subsample / frame_rate / yolo_conf / yolo_imgsz come from the job preset;
+    run_heads=False keeps only YOLO (fast preview).
+    reuse: optional {frame_name: result} from an earlier pass with the same
+    settings; those frames are not re-run.
+    cascades: optional {head: tiny_model}; those heads answer with the tiny model
+    first and only escalate to the full head below CASCADE_THRESHOLD.
+    cascade_stats: CascadeStats to collect escalation/agreement numbers.
+    feature_store: optional FeatureStore; YOLO detections and pooled backbone
+    embeddings of every triggered head are written per frame. Storing needs the
+    full backbone, so it runs in-process and bypasses the cascade.
+    result_store: optional ResultStore; every result is appended as soon as it exists.
+    frame_paths: explicit frames to run (e.g. a delivery-aware schedule) instead of
+    every `subsample`-th frame.
+    """
+    cascades = cascades or {}
+    if cascades and cascade_stats is None:
+        cascade_stats = CascadeStats()
+    if feature_store is not None:
+        cascades = {}
+        server = None
 
     # 🔹 Use the same subsampled frames as OCR
-    frame_files = get_sampled_frame_paths(frames_dir, FRAME_SUBSAMPLE)
-    print(f"Found {len(frame_files)} sampled frames for inference (subsample={FRAME_SUBSAMPLE}).")
+    frame_files = list(frame_paths) if frame_paths is not None else get_sampled_frame_paths(frames_dir, subsample)
+    print(f"Found {len(frame_files)} sampled frames for inference (subsample={subsample}).")
+
+    reused = []
+    if reuse:
+        reused = [reuse[f.name] for f in frame_files if f.name in reuse]
+        frame_files = [f for f in frame_files if f.name not in reuse]
+        print(f"Reusing {len(reused)} frame results from the previous pass.")
+    if result_store is not None:
+        for entry in reused:
+            result_store.append_frame(entry)
+
+    if server is not None:
+        results = _run_on_frames_batched(frame_files, server, cascades, cascade_stats,
+                                         frame_rate, yolo_conf, yolo_imgsz, run_heads, result_store)
+        return _merge_reused(results, reused)
+
+    heads = {
+        "shot": (shot_model, shot_classes),
+        "umpire": (umpire_model, umpire_classes),
+        "runout": (runout_model, runout_classes),
+    }
+    split_heads = {}
+    if feature_store is not None:
+        split_heads = {head: split_backbone_head(model) for head, (model, _) in heads.items()}
 
     results = []
 
@@ -38,111 +236,222 @@ def run_on_frames(frames_dir: Path,
 
         # Recover original frame index & time based on filename
         frame_index = frame_index_from_name(fpath)
-        time_sec = frame_index * (1.0 / FRAME_RATE)
+        time_sec = frame_index * (1.0 / frame_rate)
 
         # --- 1. YOLO (The Gatekeeper) ---
-        # TUNED: conf=0.45 to reduce false positives, imgsz=1280 for small objects (stumps)
-        yolo_out = yolo_model(frame, verbose=False, conf=0.45, imgsz=1280)
-        detections = []
-        detected_names = set()
-        
-        if len(yolo_out) > 0:
-            pred = yolo_out[0]
-            for box in pred.boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0])
-                cls_name = pred.names.get(cls_id, str(cls_id))
-                
-                detections.append({
-                    "bbox": [x1, y1, x2, y2],
-                    "conf": conf,
-                    "class_id": cls_id,
-                    "class_name": cls_name,
-                })
-                detected_names.add(cls_name.lower())
+        # TUNED (balanced): conf=0.45 to reduce false positives, imgsz=1280 for small objects (stumps)
+        yolo_out = yolo_model(frame, verbose=False, conf=yolo_conf, imgsz=yolo_imgsz)
+        detections, detected_names = _parse_yolo(yolo_out[0]) if len(yolo_out) > 0 else ([], set())
+        if feature_store is not None:
+            # Store rows are keyed by the file number (frame_index is number - 1)
+            yolo_names = yolo_out[0].names if len(yolo_out) > 0 else None
+            feature_store.put_yolo(frame_index + 1, detections, yolo_names)
 
         # Define Triggers based on YOLO output
-        shot_trigger = any(x in detected_names for x in ["batsman", "batter", "player", "person"])
-        ump_trigger = ("umpire" in detected_names or "official" in detected_names)
-        runout_trigger = any(x in detected_names for x in ["stump", "stumps", "wicket", "wickets"])
-        
+        triggers = _head_triggers(detected_names) if run_heads else _head_triggers(set())
+
         # --- 2. Lazy Transformation (Optimization) ---
         img_tensor = None
-        
-        if shot_trigger or ump_trigger or runout_trigger:
+
+        if any(triggers.values()):
             img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             img_tensor = image_transform(img_rgb).unsqueeze(0).to(DEVICE)
-        
-        # --- 3. Conditional Inference ---
-        
-        # A) SHOT
-        if shot_trigger and img_tensor is not None:
-            with torch.no_grad():
-                logits_shot = shot_model(img_tensor)
-                probs_shot = torch.softmax(logits_shot, dim=1)[0]
-                shot_prob, shot_idx = torch.max(probs_shot, dim=0)
-                shot_label = shot_classes[int(shot_idx)]
-                shot_conf  = float(shot_prob)
-        else:
-            shot_label = "no_detection"
-            shot_conf = 0.0
-
-        # B) UMPIRE
-        if ump_trigger and img_tensor is not None:
-            with torch.no_grad():
-                logits_ump = umpire_model(img_tensor)
-                probs_ump = torch.softmax(logits_ump, dim=1)[0]
-                ump_prob, ump_idx = torch.max(probs_ump, dim=0)
-                ump_label = umpire_classes[int(ump_idx)]
-                ump_conf  = float(ump_prob)
-        else:
-            ump_label = "no_detection"
-            ump_conf = 0.0
-
-        # C) RUNOUT
-        if runout_trigger and img_tensor is not None:
-            with torch.no_grad():
-                logits_run = runout_model(img_tensor)
-                probs_run = torch.softmax(logits_run, dim=1)[0]
-                run_prob, run_idx = torch.max(probs_run, dim=0)
-                run_label = runout_classes[int(run_idx)]
-                run_conf  = float(run_prob)
-        else:
-            run_label = "no_detection"
-            run_conf = 0.0
-
-        results.append({
-            "frame_index": frame_index,
-            "frame_path": str(fpath),
-            "time_sec": time_sec,
-            "yolo_detections": detections,
-            "shot":   {"label": shot_label, "confidence": shot_conf},
-            "umpire": {"label": ump_label, "confidence": ump_conf},
-            "runout": {"label": run_label, "confidence": run_conf},
-        })
+
+        # --- 3. Conditional Inference (SHOT / UMPIRE / RUNOUT) ---
+        head_outputs = {}
+        for head, (model, classes) in heads.items():
+            if not (triggers[head] and img_tensor is not None):
+                continue
+            if head in cascades:
+                head_outputs[head] = _classify_cascade(
+                    head, cascades[head], model, classes, img_tensor, cascade_stats
+                )
+            elif head in split_heads:
+                embed_fn, head_fn = split_heads[head]
+                with torch.no_grad():
+                    emb = embed_fn(img_tensor)
+                head_outputs[head] = _classify(head_fn, classes, emb)
+                feature_store.put_embedding(head, frame_index + 1, emb[0].cpu().numpy(), classes)
+            else:
+                head_outputs[head] = _classify(model, classes, img_tensor)
+
+        results.append(_frame_entry(frame_index, fpath, time_sec, detections, head_outputs))
+        if result_store is not None:
+            result_store.append_frame(results[-1])
+
+    if feature_store is not None:
+        feature_store.flush()
+
+    return _merge_reused(results, reused)
+
+
+def _merge_reused(results, reused):
+    if not reused:
+        return results
+    return sorted(results + reused, key=lambda r: r["time_sec"])
+
+
+def _run_on_frames_batched(frame_files, server, cascades, cascade_stats,
+                           frame_rate, yolo_conf, yolo_imgsz, run_heads=True, result_store=None):
+    """
+    Same YOLO-first logic as run_on_frames, but every model call goes through the
+    shared InferenceServer. Frames are submitted a chunk at a time so requests
+    from this job (and any other job) are merged into batches.
+    Cascaded heads go to the "<head>_tiny" server head first.
+    """
+    results = []
+    chunk = server.max_batch_size
+
+    for start in range(0, len(frame_files), chunk):
+        loaded = []
+        for fpath in frame_files[start:start + chunk]:
+            frame = cv2.imread(str(fpath))
+            if frame is None:
+                print(f"WARNING: failed to read frame {fpath}")
+                continue
+            loaded.append((fpath, frame, server.submit("yolo", (frame, yolo_conf, yolo_imgsz))))
+
+        pending = []
+        for fpath, frame, yolo_fut in loaded:
+            detections, detected_names = _parse_yolo(yolo_fut.result())
+            triggers = _head_triggers(detected_names) if run_heads else _head_triggers(set())
+
+            head_futs = {}
+            img_tensor = None
+            if any(triggers.values()):
+                img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                img_tensor = image_transform(img_rgb)
+                for head, on in triggers.items():
+                    if not on:
+                        continue
+                    if head in cascades:
+                        head_futs[head] = server.submit(f"{head}_tiny", _downscale_for_tiny(img_tensor))
+                    else:
+                        head_futs[head] = server.submit(head, img_tensor)
+            pending.append((fpath, detections, img_tensor, head_futs))
+
+        # Second round: escalate unsure tiny answers (and audit samples) to the full heads
+        escalations = []
+        for fpath, detections, img_tensor, head_futs in pending:
+            full_futs = {}
+            for head in head_futs:
+                if head not in cascades:
+                    continue
+                tiny_label, tiny_conf = head_futs[head].result()
+                escalate = tiny_conf < CASCADE_THRESHOLD
+                if escalate or cascade_stats.should_audit(head):
+                    full_futs[head] = (tiny_label, escalate, server.submit(head, img_tensor))
+                else:
+                    cascade_stats.record(head, tiny_label)
+            escalations.append(full_futs)
+
+        for (fpath, detections, _, head_futs), full_futs in zip(pending, escalations):
+            frame_index = frame_index_from_name(fpath)
+            time_sec = frame_index * (1.0 / frame_rate)
+            head_outputs = {head: fut.result() for head, fut in head_futs.items()}
+            for head, (tiny_label, escalate, fut) in full_futs.items():
+                full_label, full_conf = fut.result()
+                cascade_stats.record(head, tiny_label, full_label, escalated=escalate)
+                if escalate:
+                    head_outputs[head] = (full_label, full_conf)
+            results.append(_frame_entry(frame_index, fpath, time_sec, detections, head_outputs))
+            if result_store is not None:
+                result_store.append_frame(results[-1])
+
+    return results
+
+
+def run_from_feature_store(store, frames_dir: Path, heads: dict, frame_rate: float = FRAME_RATE):
+    """
+    Rebuild frame results from a FeatureStore without running YOLO or any backbone.
+    heads: {head: (model, class_names)}; only the classifier layers are applied
+    to the stored embeddings, so changed heads/triggers re-run in seconds.
+    """
+    split = {head: (split_backbone_head(model)[1], classes) for head, (model, classes) in heads.items()}
+
+    results = []
+    for frame_no in store.stored_frames():
+        fpath = frames_dir / f"frame_{frame_no:06d}.jpg"
+        frame_index = frame_index_from_name(fpath)
+        time_sec = frame_index * (1.0 / frame_rate)
+
+        detections = store.get_yolo(frame_no) or []
+        triggers = _head_triggers({d["class_name"].lower() for d in detections})
+
+        head_outputs = {}
+        for head, (head_fn, classes) in split.items():
+            if not triggers.get(head):
+                continue
+            emb = store.get_embedding(head, frame_no)
+            if emb is None:
+                continue
+            emb_tensor = torch.from_numpy(emb).unsqueeze(0).to(DEVICE)
+            head_outputs[head] = _classify(head_fn, classes, emb_tensor)
+
+        results.append(_frame_entry(frame_index, fpath, time_sec, detections, head_outputs))
 
     return results
 
 
-def run_on_clips(clips_dir: Path, video_model, video_classes):
+def _clip_times(cpath: Path, clip_length: float):
+    idx_str = cpath.name.replace("clip_", "").replace(".mp4", "")
+    try:
+        clip_index = int(idx_str)
+    except ValueError:
+        clip_index = None
+
+    start_time = clip_index * clip_length if clip_index is not None else None
+    end_time   = start_time + clip_length if start_time is not None else None
+    return clip_index, start_time, end_time
+
+
+def _clip_entry(cpath: Path, label, conf, clip_length: float):
+    clip_index, start_time, end_time = _clip_times(cpath, clip_length)
+    return {
+        "clip_name": cpath.name,
+        "clip_path": str(cpath),
+        "clip_index": clip_index,
+        "start_time": start_time,
+        "end_time": end_time,
+        "video_class": {"label": label, "confidence": conf},
+    }
+
+
+def _select_clips(clip_files, clip_length: float, skip=None, focus=None):
+    """
+    Drop clips that lie mostly inside replay / ad segments (skip) and, when focus
+    windows are given, clips that overlap none of them.
+    """
+    kept, flagged, unfocused = [], 0, 0
+    for cpath in clip_files:
+        _, st, et = _clip_times(cpath, clip_length)
+        if st is not None and skip and mostly_flagged(st, et, skip):
+            flagged += 1
+        elif st is not None and focus and not any(w["start"] < et and st < w["end"] for w in focus):
+            unfocused += 1
+        else:
+            kept.append(cpath)
+    if flagged:
+        print(f"[FOOTAGE] Skipping {flagged} clips inside replays / ad breaks.")
+    if unfocused:
+        print(f"[AUDIO] Skipping {unfocused} clips outside delivery / audio windows.")
+    return kept
+
+
+def run_on_clips(clips_dir: Path, video_model, video_classes, server=None,
+                 clip_length: float = CLIP_LENGTH, result_store=None, skip=None, focus=None):
 
     clip_files = sorted(clips_dir.glob("clip_*.mp4"))
     print(f"Found {len(clip_files)} clips for R(2+1)D.")
+    if skip or focus:
+        clip_files = _select_clips(clip_files, clip_length, skip, focus)
+
+    if server is not None:
+        return _run_on_clips_batched(clip_files, server, clip_length, result_store)
 
     results = []
 
     for cpath in clip_files:
-        cname = cpath.name
-        idx_str = cname.replace("clip_", "").replace(".mp4", "")
-        try:
-            clip_index = int(idx_str)
-        except ValueError:
-            clip_index = None
-
-        start_time = clip_index * CLIP_LENGTH if clip_index is not None else None
-        end_time   = start_time + CLIP_LENGTH if start_time is not None else None
-
         try:
             video_tensor = load_video_as_tensor(
                 cpath, num_frames=16, resize_hw=(112, 112)
@@ -154,23 +463,42 @@ def run_on_clips(clips_dir: Path, video_model, video_classes):
         video_tensor = video_tensor.unsqueeze(0).to(DEVICE)
 
         try:
-            with torch.no_grad():
-                logits = video_model(video_tensor)
-                probs  = torch.softmax(logits, dim=1)[0]
-                top_prob, top_idx = torch.max(probs, dim=0)
-                label = video_classes[int(top_idx)]
-                conf  = float(top_prob)
+            label, conf = _classify(video_model, video_classes, video_tensor)
         except Exception as e:
             print(f"ERROR running R(2+1)D on {cpath}: {e}")
             continue
 
-        results.append({
-            "clip_name": cname,
-            "clip_path": str(cpath),
-            "clip_index": clip_index,
-            "start_time": start_time,
-            "end_time": end_time,
-            "video_class": {"label": label, "confidence": conf},
-        })
+        results.append(_clip_entry(cpath, label, conf, clip_length))
+        if result_store is not None:
+            result_store.append_clip(results[-1])
+
+    return results
+
+
+def _run_on_clips_batched(clip_files, server, clip_length, result_store=None):
+    results = []
+    chunk = server.max_batch_size
+
+    for start in range(0, len(clip_files), chunk):
+        pending = []
+        for cpath in clip_files[start:start + chunk]:
+            try:
+                video_tensor = load_video_as_tensor(
+                    cpath, num_frames=16, resize_hw=(112, 112)
+                )
+            except Exception as e:
+                print(f"ERROR reading clip {cpath}: {e}")
+                continue
+            pending.append((cpath, server.submit("video", video_tensor)))
+
+        for cpath, fut in pending:
+            try:
+                label, conf = fut.result()
+            except Exception as e:
+                print(f"ERROR running R(2+1)D on {cpath}: {e}")
+                continue
+            results.append(_clip_entry(cpath, label, conf, clip_length))
+            if result_store is not None:
+                result_store.append_clip(results[-1])
 
     return results
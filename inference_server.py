@@ -0,0 +1,168 @@
+import threading
+import queue
+import time
+from concurrent.futures import Future
+
+import torch
+
+from config import DEVICE, INFER_MAX_BATCH_SIZE, INFER_MAX_QUEUE_DELAY
+
+
+# ================= DYNAMIC-BATCHING SERVER =================
+
+class InferenceServer:
+    """
+    In-process model server shared by every job.
+
+    Each registered head (yolo / shot / umpire / runout / video) has its own
+    request queue and worker thread. The worker takes the first waiting request,
+    keeps collecting more until the batch is full (max_batch_size) or
+    max_queue_delay seconds have passed, runs the model ONCE on the whole batch
+    and resolves one Future per request.
+    """
+
+    def __init__(self,
+                 max_batch_size: int = INFER_MAX_BATCH_SIZE,
+                 max_queue_delay: float = INFER_MAX_QUEUE_DELAY):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_queue_delay = max(0.0, float(max_queue_delay))
+        self._heads = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def register(self, name: str, batch_fn):
+        """
+        batch_fn(list_of_items) -> list_of_outputs (same length, same order).
+        """
+        with self._lock:
+            if name in self._heads:
+                raise ValueError(f"Head '{name}' is already registered.")
+            q = queue.Queue()
+            worker = threading.Thread(
+                target=self._worker, args=(name, q, batch_fn),
+                name=f"infer-{name}", daemon=True
+            )
+            self._heads[name] = (q, worker)
+            self.stats[name] = {"requests": 0, "batches": 0, "max_batch": 0}
+            worker.start()
+
+    def has_head(self, name: str) -> bool:
+        return name in self._heads
+
+    def submit(self, name: str, item) -> Future:
+        """Queue one frame/clip for head `name`. Returns a Future with the head output."""
+        if name not in self._heads:
+            raise KeyError(f"Unknown inference head '{name}'.")
+        fut = Future()
+        self._heads[name][0].put((item, fut))
+        return fut
+
+    def shutdown(self):
+        with self._lock:
+            heads = list(self._heads.values())
+            self._heads = {}
+        for q, _ in heads:
+            q.put(None)
+        for _, worker in heads:
+            worker.join(timeout=5.0)
+
+    def _worker(self, name, q, batch_fn):
+        while True:
+            first = q.get()
+            if first is None:
+                return
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_queue_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            # Drop requests whose caller already gave up
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    outputs = batch_fn([item for item, _ in batch])
+                except Exception as e:
+                    for _, fut in batch:
+                        fut.set_exception(e)
+                else:
+                    for (_, fut), out in zip(batch, outputs):
+                        fut.set_result(out)
+
+                st = self.stats[name]
+                st["requests"] += len(batch)
+                st["batches"] += 1
+                st["max_batch"] = max(st["max_batch"], len(batch))
+
+            if stop:
+                return
+
+
+# ================= BATCH FUNCTIONS =================
+
+def classifier_batch_fn(model, class_names):
+    """
+    Batched softmax classifier. Items are un-batched tensors, (C, H, W) for the
+    image heads or (C, T, H, W) for R(2+1)D. Output per item: (label, confidence).
+    """
+    def run(tensors):
+        x = torch.stack(tensors).to(DEVICE)
+        with torch.no_grad():
+            probs = torch.softmax(model(x), dim=1)
+            top_prob, top_idx = torch.max(probs, dim=1)
+        return [(class_names[int(i)], float(p)) for p, i in zip(top_prob, top_idx)]
+    return run
+
+
+def yolo_batch_fn(yolo_model):
+    """
+    Batched YOLO. Items are (bgr_frame, conf, imgsz) so jobs on different presets
+    can share the head; frames with the same settings run as one call.
+    Output per item is one Results object.
+    """
+    def run(items):
+        outputs = [None] * len(items)
+        groups = {}
+        for i, (_, conf, imgsz) in enumerate(items):
+            groups.setdefault((conf, imgsz), []).append(i)
+        for (conf, imgsz), idxs in groups.items():
+            preds = yolo_model([items[i][0] for i in idxs], verbose=False, conf=conf, imgsz=imgsz)
+            for i, pred in zip(idxs, preds):
+                outputs[i] = pred
+        return outputs
+    return run
+
+
+def start_inference_server(yolo_model, shot_model, umpire_model, runout_model, video_model,
+                           shot_classes, umpire_classes, runout_classes, video_classes,
+                           tiny_models=None,
+                           max_batch_size: int = INFER_MAX_BATCH_SIZE,
+                           max_queue_delay: float = INFER_MAX_QUEUE_DELAY) -> InferenceServer:
+    """
+    Create a server with the standard pipeline heads registered.
+    tiny_models: optional {head: tiny_model} registered as "<head>_tiny" for the cascade.
+    """
+    server = InferenceServer(max_batch_size=max_batch_size, max_queue_delay=max_queue_delay)
+    server.register("yolo", yolo_batch_fn(yolo_model))
+    server.register("shot", classifier_batch_fn(shot_model, shot_classes))
+    server.register("umpire", classifier_batch_fn(umpire_model, umpire_classes))
+    server.register("runout", classifier_batch_fn(runout_model, runout_classes))
+    server.register("video", classifier_batch_fn(video_model, video_classes))
+
+    head_classes = {"shot": shot_classes, "umpire": umpire_classes, "runout": runout_classes}
+    for head, tiny_model in (tiny_models or {}).items():
+        server.register(f"{head}_tiny", classifier_batch_fn(tiny_model, head_classes[head]))
+    print(f"[INFER] Inference server started (max_batch={server.max_batch_size}, "
+          f"max_delay={server.max_queue_delay * 1000:.0f}ms)")
+    return server
@@ -1,6 +1,23 @@
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
-from config import JINA_MODEL_ID, JINA_BASE_URL, JINA_API_KEY
+from config import (
+    JINA_MODEL_ID, JINA_BASE_URL, JINA_API_KEY, PROMPT_COMPACT_TIMELINE, VISUAL_CONF_MIN,
+    STREAM_MIN_SENTENCE_CHARS, COMMENTARY_WINDOWED, COMMENTARY_WINDOW_SEC, COMMENTARY_WORKERS,
+    COMMENTARY_RETRIES, COMMENTARY_CARRY_SPANS, TTS_MAX_CHARS, CHARS_PER_WORD, CHARS_PER_TOKEN,
+    BUDGET_SAFETY, TOKEN_HEADROOM
+)
+from timeline import compact_timeline, LAST_EVENT_SEC
+
+FOOTAGE_NOTES = {
+    "replay": "REPLAY of earlier action (no new ball - refer back to it briefly)",
+    "ad": "AD BREAK (no play - a short bridging line at most)",
+}
+
+# Spoken in place of a commentary window that still failed after its retries
+WINDOW_BRIDGE = "And the game goes on out in the middle."
+
 
 def _format_parsed_score(parsed):
     if not parsed:
@@ -39,48 +56,27 @@ def _format_parsed_score(parsed):
     return " | ".join(parts) if parts else "Unknown score"
 
 
-def build_commentary_prompt_from_timeline(timeline_events):
-    """
-    Build a prompt describing the entire innings as a time-ordered series of events.
-    Continuous commentary – no BALL 1 / BALL 2 labels.
-    """
-    lines = []
+def _words_for(duration: float, scale: float = 1.0) -> int:
+    # Estimate words (approx 2.5 words/sec -> 150wpm)
+    # We give a range to allow creativity but prevent rambling
+    # scale < 1 shrinks every hint so the whole commentary fits the budget (plan_budget)
+    return max(round(5 * scale), 1, int(duration * 2.5 * scale))
 
-    lines.append(
-        "You are given a time-ordered sequence of events from a cricket innings.\n"
-        "Each event corresponds to a sampled frame and includes:\n"
-        "- SCOREBOARD OCR (parsed runs/wickets/overs for the batting team).\n"
-        "- YOLO detections describing the visual scene on the field.\n"
-        "- An optional video-model label that gives a vague flavour of the shot type.\n\n"
-        "HARD RULES:\n"
-        "1. Treat the SCOREBOARD OCR as the ONLY source of truth for runs, wickets, and overs.\n"
-        "2. Completely IGNORE all classifier outputs such as shot predictions, umpire gestures, and runout predictions. "
-        "   Assume they are 'NOT AVAILABLE' and never use them to decide outcomes.\n"
-        "3. PROCESSED VISUALS: High-confidence YOLO detections (>80%) are provided. You MAY use these to colour the visual scene "
-        "   (e.g., 'Player detected', 'Bat detected'). Use them to add flavour but do NOT over-trust them for subtle events.\n"
-        "4. When scorecard information is missing or unreliable at a time, do NOT invent exact scores. "
-        "   Use safe, neutral commentary (for example, a dot ball or a generic defensive shot).\n"
-        "5. When YOLO detections are empty, still write realistic but conservative commentary with no dramatic events.\n"
-        "6. Do NOT mention OCR, detectors, models, probabilities, JSON, or any technical details.\n\n"
-        "Your goal is to write continuous, live-style commentary over the innings, in chronological order, "
-        "without labelling commentary as 'Ball 1', 'Ball 2', etc.\n"
-    )
 
+def _event_lines(timeline_events, scale: float = 1.0):
+    """Four lines per timeline event (the uncompacted prompt)."""
+    lines = []
     for i in range(len(timeline_events)):
         e = timeline_events[i]
-        
+
         t = e["time_sec"]
         # Calculate duration
         if i < len(timeline_events) - 1:
             next_t = timeline_events[i+1]["time_sec"]
             duration = next_t - t
         else:
-            duration = 5.0 # Default for last event
-
-        # Estimate words (approx 2.5 words/sec -> 150wpm)
-        # We give a range to allow creativity but prevent rambling
-        max_words = int(duration * 2.5) 
-        if max_words < 5: max_words = 5
+            duration = LAST_EVENT_SEC # Default for last event
+        max_words = _words_for(duration, scale)
 
         score_parsed = e.get("score_parsed")
         score_str = _format_parsed_score(score_parsed) if score_parsed else "None"
@@ -91,8 +87,8 @@ def build_commentary_prompt_from_timeline(timeline_events):
         vc_conf = vc.get("confidence", 0.0)
 
         # Filter high-confidence YOLO
-        valid_yolo = [y for y in yolo_objs if y.get("conf", 0) > 0.8]
-        
+        valid_yolo = [y for y in yolo_objs if y.get("conf", 0) > VISUAL_CONF_MIN]
+
         yolo_desc = "None"
         if valid_yolo:
             items = [f"{obj.get('class_name')} ({obj.get('conf'):.2f})" for obj in valid_yolo]
@@ -100,9 +96,152 @@ def build_commentary_prompt_from_timeline(timeline_events):
 
         lines.append(f"\nEVENT {i+1}:")
         lines.append(f" - Time (s): {t:.1f} (Next event in {duration:.1f}s -> Aim for approx {max_words} words)")
+        if e.get("footage", "live") != "live":
+            lines.append(f" - Footage: {FOOTAGE_NOTES.get(e['footage'], e['footage'])}")
+            continue
         lines.append(f" - Scoreboard snapshot: {score_str}")
         lines.append(f" - Video model label (flavour only): {vc_label} (confidence={vc_conf:.2f})")
-        lines.append(f" - High-Confidence Visuals (>0.8): {yolo_desc}")
+        lines.append(f" - High-Confidence Visuals (>{VISUAL_CONF_MIN}): {yolo_desc}")
+    return lines
+
+
+def _format_score_delta(delta):
+    if not delta:
+        return ""
+    parts = []
+    if delta.get("runs"):
+        parts.append(f"+{delta['runs']} run{'s' if delta['runs'] != 1 else ''}")
+    if delta.get("wickets"):
+        parts.append("WICKET" if delta["wickets"] == 1 else f"+{delta['wickets']} wickets")
+    if delta.get("balls"):
+        parts.append(f"+{delta['balls']} ball{'s' if delta['balls'] != 1 else ''}")
+    return f" ({', '.join(parts)})" if parts else ""
+
+
+def _span_lines(spans, scale: float = 1.0):
+    """One block per compacted span; the score, visuals and label are only repeated when they change."""
+    lines = []
+    prev_visuals, prev_label = None, None
+    for i, sp in enumerate(spans):
+        max_words = _words_for(sp["duration"], scale)
+        lines.append(f"\nSPAN {i+1}: {sp['start_sec']:.1f}-{sp['end_sec']:.1f}s "
+                     f"({sp['duration']:.1f}s -> Aim for approx {max_words} words)")
+        if sp.get("footage", "live") != "live":
+            lines.append(f" - Footage: {FOOTAGE_NOTES.get(sp['footage'], sp['footage'])}")
+            continue
+        if sp["score_parsed"] is not None:
+            if sp["score_delta"] is None or any(sp["score_delta"].values()):
+                lines.append(f" - Score: {_format_parsed_score(sp['score_parsed'])}{_format_score_delta(sp['score_delta'])}")
+        elif i == 0:
+            lines.append(" - Score: None")
+        if sp["visuals"] != prev_visuals:
+            lines.append(f" - Visuals: {', '.join(sp['visuals']) or 'None'}")
+            prev_visuals = sp["visuals"]
+        if sp["clip_label"] != prev_label:
+            conf = sp["clip_confidence"] or 0.0
+            lines.append(f" - Video label (flavour only): {sp['clip_label'] or 'Unknown'} (confidence={conf:.2f})")
+            prev_label = sp["clip_label"]
+    return lines
+
+
+# ================= OUTPUT BUDGET =================
+
+def _hint_durations(timeline_events):
+    """Durations that get an 'Aim for X words' hint in the prompt (spans or events)."""
+    if PROMPT_COMPACT_TIMELINE:
+        return [sp["duration"] for sp in compact_timeline(timeline_events)]
+    times = [e["time_sec"] for e in timeline_events]
+    return [b - a for a, b in zip(times, times[1:])] + ([LAST_EVENT_SEC] if times else [])
+
+
+def plan_budget(timeline_events, max_chars: int = TTS_MAX_CHARS, safety: float = BUDGET_SAFETY) -> dict:
+    """
+    Output plan for one generation: the per-span word hints at natural pace, scaled
+    down (by bisection, never up) so their total fits safety * max_chars. When even
+    the one-word floor per hint does not fit (very many spans), the totals and
+    max_tokens are capped at that limit anyway, so a plan never exceeds it.
+    Returns {"scale", "words", "chars", "max_tokens"}.
+    """
+    durations = _hint_durations(timeline_events)
+    limit = int(safety * max_chars)
+    # Largest scale <= 1 whose hints fit (the per-hint floor makes it non-linear)
+    target = limit / CHARS_PER_WORD
+    lo, hi = 0.0, 1.0
+    if sum(_words_for(d, hi) for d in durations) > target:
+        for _ in range(20):
+            mid = (lo + hi) / 2
+            lo, hi = (mid, hi) if sum(_words_for(d, mid) for d in durations) <= target else (lo, mid)
+        hi = lo
+    scale = hi
+    words = min(sum(_words_for(d, scale) for d in durations), int(target))
+    chars = min(int(words * CHARS_PER_WORD), limit)
+    return {"scale": round(scale, 3), "words": words, "chars": chars,
+            "max_tokens": max(64, int(chars / CHARS_PER_TOKEN * TOKEN_HEADROOM))}
+
+
+def window_budgets(windows, budget) -> list:
+    """
+    Plans for the windows of one run that add up to `budget` (the whole-timeline plan):
+    its characters are split by each window's share of the natural-pace words
+    (largest remainder), and every window is planned to fit its share.
+    """
+    natural = [sum(_words_for(d) for d in _hint_durations(w)) for w in windows]
+    total = sum(natural) or 1
+    quotas = [budget["chars"] * n / total for n in natural]
+    shares = [int(q) for q in quotas]
+    by_remainder = sorted(range(len(windows)), key=lambda k: quotas[k] - shares[k], reverse=True)
+    for k in by_remainder[:budget["chars"] - sum(shares)]:
+        shares[k] += 1
+    return [plan_budget(w, max_chars=share, safety=1.0) for w, share in zip(windows, shares)]
+
+
+def build_commentary_prompt_from_timeline(timeline_events, context=None, budget=None):
+    """
+    Build a prompt describing the entire innings as a time-ordered series of events.
+    Continuous commentary – no BALL 1 / BALL 2 labels.
+    context: for one window of a windowed run, {"part", "parts", "carry"} (see window_context).
+    budget: output plan (plan_budget); the word hints are scaled by it and its totals
+    are stated in the task. Planned for the whole timeline when not given.
+    """
+    if budget is None:
+        budget = plan_budget(timeline_events)
+    lines = []
+
+    lines.append(
+        "You are given a time-ordered sequence of events from a cricket innings.\n"
+        "Each event corresponds to a sampled frame and includes:\n"
+        "- SCOREBOARD OCR (parsed runs/wickets/overs for the batting team).\n"
+        "- YOLO detections describing the visual scene on the field.\n"
+        "- An optional video-model label that gives a vague flavour of the shot type.\n\n"
+        "HARD RULES:\n"
+        "1. Treat the SCOREBOARD OCR as the ONLY source of truth for runs, wickets, and overs.\n"
+        "2. Completely IGNORE all classifier outputs such as shot predictions, umpire gestures, and runout predictions. "
+        "   Assume they are 'NOT AVAILABLE' and never use them to decide outcomes.\n"
+        "3. PROCESSED VISUALS: High-confidence YOLO detections (>80%) are provided. You MAY use these to colour the visual scene "
+        "   (e.g., 'Player detected', 'Bat detected'). Use them to add flavour but do NOT over-trust them for subtle events.\n"
+        "4. When scorecard information is missing or unreliable at a time, do NOT invent exact scores. "
+        "   Use safe, neutral commentary (for example, a dot ball or a generic defensive shot).\n"
+        "5. When YOLO detections are empty, still write realistic but conservative commentary with no dramatic events.\n"
+        "6. Do NOT mention OCR, detectors, models, probabilities, JSON, or any technical details.\n"
+        "7. Footage marked REPLAY or AD BREAK is not live play: never count it as a new ball.\n\n"
+        "Your goal is to write continuous, live-style commentary over the innings, in chronological order, "
+        "without labelling commentary as 'Ball 1', 'Ball 2', etc.\n"
+    )
+
+    if context is not None:
+        lines.append(_context_text(context))
+
+    if PROMPT_COMPACT_TIMELINE:
+        spans = compact_timeline(timeline_events)
+        lines.append(
+            "The events below are SPANS: consecutive moments in which the score, the visuals and the "
+            "video label stayed the same. Only changes are listed - a span without a 'Score' line keeps "
+            "the previous score, a span without 'Visuals' keeps the previous visuals.\n"
+        )
+        lines.extend(_span_lines(spans, budget["scale"]))
+        print(f"[LLM] Compacted {len(timeline_events)} timeline events into {len(spans)} spans.")
+    else:
+        lines.extend(_event_lines(timeline_events, budget["scale"]))
 
     lines.append(
         "\nTASK:\n"
@@ -115,65 +254,82 @@ def build_commentary_prompt_from_timeline(timeline_events):
         "5. **PACING (CRITICAL):** Pay close attention to the 'Aim for X words' hint. "
         "   - If the duration is short (2s), write a quick burst. "
         "   - If the duration is long (10s), elaborate on the atmosphere.\n"
-        "6. Keep it chronological but fluid. No 'Event 1', 'Event 2' labels."
+        "6. Keep it chronological but fluid. No 'Event 1', 'Event 2' labels.\n"
+        f"7. **LENGTH BUDGET (HARD):** about {budget['words']} words in total and NEVER more than "
+        f"{budget['chars']} characters. The word hints above already add up to this - follow them."
     )
 
     return "\n".join(lines)
 
 
-def call_llm(prompt: str) -> str:
-    api_key = JINA_API_KEY
-    if not api_key:
-        print("[ERROR] JINA_API_KEY environment variable is not set.")
-        return "[LLM ERROR] No Jina API key found. Skipping commentary generation."
+COMMENTATOR_SYSTEM_MSG = (
+    "You are a HIGH-ENERGY, EMOTIONAL professional live cricket commentator (like Danny Morrison or Ravi Shastri).\n"
+    "You receive time-ordered structured data from a cricket innings. "
+    "The only reliable source of runs, wickets, and overs is the SCOREBOARD OCR. "
+    "YOLO detections and any video-model labels are used only for visual description.\n\n"
+    "HARD CONSTRAINTS:\n"
+    "- Completely IGNORE all shot-classification, umpire-gesture, and runout classifier outputs. "
+    "  Act as if those predictions are not available.\n"
+    "- Use SCOREBOARD OCR to determine how the score changes over time. "
+    "  If the score is missing or unchanged for a period, do not invent exact numbers; "
+    "  instead, use safe, neutral commentary.\n"
+    "- PROCESSED VISUALS: Use them ONLY for flavor. \n"
+    "  BAD: 'The umpire is visible.' (BORING!)\n"
+    "  GOOD: 'The umpire steps in to calm things down.' or 'A nervous look from the umpire.'\n"
+    "  If a visual doesn't add drama, IGNORE IT.\n"
+    "- Never mention OCR, detectors, models, probabilities, JSON, or any technical terms.\n\n"
+    "OUTPUT STYLE & EMOTION:\n"
+    "- **HIGH ENERGY**: You must sound excited! The match is alive!\n"
+    "- **SHOUTING**: Use UPPERCASE for big moments! 'THAT IS HUGE!', 'WHAT A SHOT!', 'OUT! HE IS GONE!'\n"
+    "- **NO ROBOTIC LISTS**: Do not say 'I see a player'. Say 'Smith takes his stance' or 'The fielder is sprinting!'.\n"
+    "- **FILL GAPS**: If the score is stuck, talk about the tension, the crowd, the weather, the strategy. \n"
+    "  'The tension is palpable here at the stadium...'\n"
+    "- **CONTINUOUS FLOW**: Do NOT label 'Ball 1', 'Ball 2'. Write a flowing narrative stream. "
+    "  Connect events smoothly.\n\n"
+    "CRITICAL: STAY WITHIN THE LENGTH BUDGET GIVEN IN THE TASK, AND KEEP THE ENERGY HIGH."
+)
 
+
+def _client():
+    """(client, None) or (None, error string) for the Jina OpenAI-compatible API."""
+    if not JINA_API_KEY:
+        print("[ERROR] JINA_API_KEY environment variable is not set.")
+        return None, "[LLM ERROR] No Jina API key found. Skipping commentary generation."
     try:
-        client = OpenAI(
-            api_key=api_key,
-            base_url=JINA_BASE_URL,
-        )
+        return OpenAI(api_key=JINA_API_KEY, base_url=JINA_BASE_URL), None
     except Exception as e:
         print(f"[ERROR] Failed to create Jina OpenAI client: {e}")
-        return "[LLM ERROR] Failed to create Jina client."
-
-    system_msg = (
-        "You are a HIGH-ENERGY, EMOTIONAL professional live cricket commentator (like Danny Morrison or Ravi Shastri).\n"
-        "You receive time-ordered structured data from a cricket innings. "
-        "The only reliable source of runs, wickets, and overs is the SCOREBOARD OCR. "
-        "YOLO detections and any video-model labels are used only for visual description.\n\n"
-        "HARD CONSTRAINTS:\n"
-        "- Completely IGNORE all shot-classification, umpire-gesture, and runout classifier outputs. "
-        "  Act as if those predictions are not available.\n"
-        "- Use SCOREBOARD OCR to determine how the score changes over time. "
-        "  If the score is missing or unchanged for a period, do not invent exact numbers; "
-        "  instead, use safe, neutral commentary.\n"
-        "- PROCESSED VISUALS: Use them ONLY for flavor. \n"
-        "  BAD: 'The umpire is visible.' (BORING!)\n"
-        "  GOOD: 'The umpire steps in to calm things down.' or 'A nervous look from the umpire.'\n"
-        "  If a visual doesn't add drama, IGNORE IT.\n"
-        "- Never mention OCR, detectors, models, probabilities, JSON, or any technical terms.\n\n"
-        "OUTPUT STYLE & EMOTION:\n"
-        "- **HIGH ENERGY**: You must sound excited! The match is alive!\n"
-        "- **SHOUTING**: Use UPPERCASE for big moments! 'THAT IS HUGE!', 'WHAT A SHOT!', 'OUT! HE IS GONE!'\n"
-        "- **NO ROBOTIC LISTS**: Do not say 'I see a player'. Say 'Smith takes his stance' or 'The fielder is sprinting!'.\n"
-        "- **FILL GAPS**: If the score is stuck, talk about the tension, the crowd, the weather, the strategy. \n"
-        "  'The tension is palpable here at the stadium...'\n"
-        "- **CONTINUOUS FLOW**: Do NOT label 'Ball 1', 'Ball 2'. Write a flowing narrative stream. "
-        "  Connect events smoothly.\n\n"
-        "CRITICAL: YOUR OUTPUT MUST BE UNDER 9000 CHARACTERS. "
-        "Summarize if needed, but KEEP THE ENERGY HIGH."
-    )
+        return None, "[LLM ERROR] Failed to create Jina client."
+
+
+def _llm_error(e) -> str:
+    msg = str(e)
+    if "524" in msg or "A timeout occurred" in msg or "timed out" in msg.lower():
+        print("[ERROR] Jina DeepSearch request timed out (Cloudflare 524).")
+        return "[LLM ERROR] Jina DeepSearch timed out while generating commentary. Try again or shorten the input."
+    print(f"[ERROR] Jina LLM call failed: {e}")
+    return "[LLM ERROR] Jina call failed. See console for details."
+
+
+def _is_error(text: str) -> bool:
+    return not text or text.startswith("[LLM ERROR]") or text.startswith("[LLM WARNING]")
+
+
+def call_llm(prompt: str, max_tokens: int = 4000) -> str:
+    client, error = _client()
+    if client is None:
+        return error
 
     try:
         print(f"[INFO] Calling Jina model: {JINA_MODEL_ID}")
         chat = client.chat.completions.create(
             model=JINA_MODEL_ID,
             messages=[
-                {"role": "system", "content": system_msg},
+                {"role": "system", "content": COMMENTATOR_SYSTEM_MSG},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.9,
-            max_tokens=4000,
+            max_tokens=max_tokens,
         )
 
         if chat.choices and chat.choices[0].message and chat.choices[0].message.content:
@@ -181,12 +337,72 @@ def call_llm(prompt: str) -> str:
 
         return "[LLM WARNING] Jina call succeeded but no text was returned."
     except Exception as e:
-        msg = str(e)
-        if "524" in msg or "A timeout occurred" in msg or "timed out" in msg.lower():
-            print("[ERROR] Jina DeepSearch request timed out (Cloudflare 524).")
-            return "[LLM ERROR] Jina DeepSearch timed out while generating commentary. Try again or shorten the input."
-        print(f"[ERROR] Jina LLM call failed: {e}")
-        return "[LLM ERROR] Jina call failed. See console for details."
+        return _llm_error(e)
+
+
+# ================= STREAMING =================
+
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+
+
+def split_sentences(deltas, min_chars: int = STREAM_MIN_SENTENCE_CHARS):
+    """
+    Sentences from a stream of text deltas, as soon as each one is complete. Sentences
+    shorter than min_chars are joined with the next; the remainder comes out at the end.
+    """
+    buf = ""
+    for delta in deltas:
+        buf += delta
+        start = 0
+        for m in SENTENCE_END.finditer(buf):
+            if m.end() - start >= min_chars:
+                yield buf[start:m.end()].strip()
+                start = m.end()
+        buf = buf[start:]
+    if buf.strip():
+        yield buf.strip()
+
+
+def call_llm_streaming(prompt: str, max_tokens: int = 4000, on_sentence=None) -> str:
+    """
+    call_llm with a streamed completion: on_sentence(text) is called for every
+    sentence as soon as it is complete (e.g. StreamingTTS.submit), and the full
+    text is returned at the end. Errors are returned as "[LLM ERROR] ..." like call_llm.
+    """
+    client, error = _client()
+    if client is None:
+        return error
+
+    parts = []
+
+    def deltas(stream):
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+
+    try:
+        print(f"[INFO] Streaming Jina model: {JINA_MODEL_ID}")
+        stream = client.chat.completions.create(
+            model=JINA_MODEL_ID,
+            messages=[
+                {"role": "system", "content": COMMENTATOR_SYSTEM_MSG},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.9,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for sentence in split_sentences(deltas(stream)):
+            if on_sentence is not None:
+                on_sentence(sentence)
+    except Exception as e:
+        return _llm_error(e)
+
+    if not parts:
+        return "[LLM WARNING] Jina call succeeded but no text was returned."
+    return "".join(parts)
+
 
 def summarize_text(text: str, max_chars: int = 9500) -> str:
     """
@@ -225,3 +441,145 @@ def summarize_text(text: str, max_chars: int = 9500) -> str:
     except Exception as e:
         print(f"[LLM ERROR] Summarization failed: {e}")
         return text # Return original on error
+
+
+# ================= WINDOWED GENERATION =================
+
+def timeline_duration(timeline_events) -> float:
+    if not timeline_events:
+        return 0.0
+    return timeline_events[-1]["time_sec"] - timeline_events[0]["time_sec"] + LAST_EVENT_SEC
+
+
+def split_timeline(timeline_events, window_sec: float = COMMENTARY_WINDOW_SEC):
+    """
+    Consecutive windows of about window_sec. A window is extended (by at most half a
+    window) rather than cut in the middle of a delivery (events with the same "ball_index").
+    """
+    windows, cur = [], []
+    for e in timeline_events:
+        if cur and e["time_sec"] - cur[0]["time_sec"] >= window_sec:
+            ball = cur[-1].get("ball_index")
+            mid_ball = ball is not None and e.get("ball_index") == ball
+            if not mid_ball or e["time_sec"] - cur[0]["time_sec"] >= 1.5 * window_sec:
+                windows.append(cur)
+                cur = []
+        cur.append(e)
+    if cur:
+        windows.append(cur)
+    return windows
+
+
+def window_context(windows, k: int, carry_spans: int = COMMENTARY_CARRY_SPANS) -> dict:
+    """Carry-over for window k from the data before it: last score read and the final spans."""
+    carry = []
+    if k > 0:
+        before = [e for w in windows[:k] for e in w]
+        score = next((e["score_parsed"] for e in reversed(before)
+                      if (e.get("score_parsed") or {}).get("team1_name")), None)
+        if score:
+            carry.append(f"Score at the start of this part: {_format_parsed_score(score)}")
+        tail = compact_timeline(windows[k - 1])[-carry_spans:]
+        if tail:
+            carry.append("The previous part ended with:" + "\n".join(_span_lines(tail)))
+    return {"part": k + 1, "parts": len(windows), "carry": "\n".join(carry)}
+
+
+def _context_text(context) -> str:
+    part, parts = context["part"], context["parts"]
+    text = f"\nTHIS IS PART {part} OF {parts} of one continuous commentary, written in parallel with the other parts.\n"
+    if part > 1:
+        text += "Continue seamlessly: no greeting, no introduction of the match or the teams.\n"
+    if part < parts:
+        text += "Do not wrap up or sign off; the commentary continues after this part.\n"
+    if context.get("carry"):
+        text += "CONTEXT FROM THE PREVIOUS PART (already commentated, do not repeat it):\n" + context["carry"] + "\n"
+    return text
+
+
+def call_llm_windowed(timeline_events, max_tokens: int = 4000, on_sentence=None,
+                      window_sec: float = COMMENTARY_WINDOW_SEC, workers: int = COMMENTARY_WORKERS,
+                      retries: int = COMMENTARY_RETRIES, budget=None, report=None) -> str:
+    """
+    Commentary for a long timeline as parallel windows (split_timeline), each with a
+    carry-over of the score and the previous window's last spans. Every window gets
+    its share of the output budget (window_budgets, so the windows add up to the
+    whole-timeline plan) as word hints, a character limit and max_tokens; a failed
+    window is retried alone.
+    The texts are stitched in order; on_sentence gets the sentences of each window
+    as soon as it and every window before it are done.
+    A window that still fails is replaced by WINDOW_BRIDGE, so the commentary does not
+    silently jump ahead; report (a dict) gets "windows" and the 1-based "failed_windows".
+    """
+    windows = split_timeline(timeline_events, window_sec)
+    budgets = window_budgets(windows, budget or plan_budget(timeline_events))
+    print(f"[LLM] Generating commentary in {len(windows)} windows ({workers} in parallel).")
+
+    def run(k):
+        window_budget = budgets[k]
+        prompt = build_commentary_prompt_from_timeline(windows[k], context=window_context(windows, k),
+                                                       budget=window_budget)
+        tokens = min(max_tokens, window_budget["max_tokens"])
+        text = call_llm(prompt, max_tokens=tokens)
+        for attempt in range(retries):
+            if not _is_error(text):
+                break
+            print(f"[LLM] Window {k + 1}/{len(windows)} failed ({text[:60]}); retry {attempt + 1}/{retries}.")
+            text = call_llm(prompt, max_tokens=tokens)
+        return text
+
+    texts, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-window") as pool:
+        futures = [pool.submit(run, k) for k in range(len(windows))]
+        for k, fut in enumerate(futures):
+            text = fut.result()
+            if _is_error(text):
+                print(f"[LLM] Window {k + 1}/{len(windows)} failed after {retries} retries; bridging it.")
+                failed.append(k + 1)
+                text = WINDOW_BRIDGE
+            texts.append(text.strip())
+            if on_sentence is not None:
+                for sentence in split_sentences([text]):
+                    on_sentence(sentence)
+
+    if report is not None:
+        report.update(windows=len(windows), failed_windows=failed)
+    if len(failed) == len(windows):
+        return "[LLM ERROR] Every commentary window failed. See console for details."
+    return "\n\n".join(texts)
+
+
+def is_windowed(timeline_events) -> bool:
+    """Whether generate_commentary splits this timeline into windows (no single prompt)."""
+    return COMMENTARY_WINDOWED and timeline_duration(timeline_events) > 1.5 * COMMENTARY_WINDOW_SEC
+
+
+def generate_commentary(timeline_events, prompt: str = None, max_tokens: int = 4000, on_sentence=None,
+                        report=None) -> str:
+    """
+    Commentary for the pipeline: windowed when the timeline is long (is_windowed; each
+    window builds its own prompt), otherwise one request for `prompt` (built here with
+    the same plan_budget when not given), streamed when on_sentence is given. max_tokens
+    is capped by the budget, so one pass fits TTS_MAX_CHARS.
+    report: optional dict, filled with the window counts of a windowed run (call_llm_windowed).
+    """
+    budget = plan_budget(timeline_events)
+    tokens = min(max_tokens, budget["max_tokens"])
+    print(f"[LLM] Budget: {budget['words']} words / {budget['chars']} chars "
+          f"(word hints x{budget['scale']}), max_tokens={tokens}.")
+    if is_windowed(timeline_events):
+        return call_llm_windowed(timeline_events, tokens, on_sentence=on_sentence, budget=budget, report=report)
+    if prompt is None:
+        prompt = build_commentary_prompt_from_timeline(timeline_events, budget=budget)
+    if on_sentence is not None:
+        return call_llm_streaming(prompt, tokens, on_sentence=on_sentence)
+    return call_llm(prompt, tokens)
+
+
+def fit_to_limit(text: str, max_chars: int = TTS_MAX_CHARS) -> str:
+    """Safety net after a budgeted call: cut at the last sentence end within max_chars."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    ends = [m.end() for m in SENTENCE_END.finditer(cut + " ")]
+    return cut[:ends[-1]].strip() if ends else cut
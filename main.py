@@ -1,50 +1,80 @@
+import sys
 import time
 import json
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Config
 from config import (
-    BASE_DIR, VIDEO_PATH, FRAMES_DIR, CLIPS_DIR, FRAME_RATE, CLIP_LENGTH,
+    BASE_DIR, VIDEO_PATH, FRAMES_DIR, CLIPS_DIR,
     SCORE_JSON, SCORE_CSV, RAW_RESULTS_JSON, TIMELINE_JSON, PROMPT_TXT, TTS_OUTPUT,
     YOLO_WEIGHTS, SHOT_WEIGHTS, UMPIRE_WEIGHTS, RUNOUT_WEIGHTS, R2P1D_WEIGHTS,
-    SHOT_META_JSON, UMPIRE_META_JSON, RUNOUT_META_JSON, R2P1D_META_JSON
+    SHOT_META_JSON, UMPIRE_META_JSON, RUNOUT_META_JSON, R2P1D_META_JSON,
+    USE_CASCADE, CASCADE_HEADS, CASCADE_REPORT_JSON, USE_FEATURE_STORE, USE_RESULT_STORE,
+    DELIVERY_SEGMENTATION, ADAPTIVE_SAMPLING, AUDIO_PRIOR, AUDIO_CLIP_FOCUS, LLM_STREAMING,
+    DEFAULT_PRESET, get_preset
 )
 
 # Modules
 from video_processing import run_ffmpeg_split
 from ocr import process_score_frames
 from models import (
-    load_yolo_model, load_efficientnet_classifier, load_umpire_model, load_r2plus1d_model
+    load_yolo_model, load_efficientnet_classifier, load_umpire_model, load_r2plus1d_model,
+    load_cascade_heads
 )
-from inference import run_on_frames, run_on_clips
+from inference import run_on_frames, run_on_clips, CascadeStats
+from feature_store import FeatureStore
+from result_store import ResultStore
 from timeline import build_timeline
-from llm import build_commentary_prompt_from_timeline, call_llm
-from tts import synthesize_commentary_audio
+from delivery import plan_frames, save_ball_events
+from audio_prior import analyze_audio
+from llm import build_commentary_prompt_from_timeline, generate_commentary, is_windowed
+from tts import synthesize_commentary_audio, StreamingTTS
 
-def main():
+def main(preset: str = DEFAULT_PRESET):
     overall_start = time.time()
     stage_times = {}
+    p = get_preset(preset)
+    print(f"Using preset '{p['name']}': {p}")
 
     # --- STEP 1: Splitting video ---
     t0 = time.time()
     print("=== STEP 1: Splitting video with ffmpeg ===")
-    run_ffmpeg_split(VIDEO_PATH, FRAMES_DIR, CLIPS_DIR, FRAME_RATE, CLIP_LENGTH)
+    run_ffmpeg_split(VIDEO_PATH, FRAMES_DIR, CLIPS_DIR, p["frame_rate"], p["clip_length"])
     stage_times["ffmpeg_split"] = time.time() - t0
 
-    # --- STEP 1b: Scorecard OCR ---
-    t0 = time.time()
-    print("=== STEP 1b: Running scorecard OCR on sampled frames ===")
-    score_results = process_score_frames(FRAMES_DIR, SCORE_JSON, SCORE_CSV)
-    stage_times["scorecard_ocr"] = time.time() - t0
-
-    # Build quick lookup: frame_name -> score_entry
-    score_by_frame = {
-        entry["frame"]: entry
-        for entry in score_results
-        if entry.get("frame") is not None
-    }
+    # --- STEP 1a: Frame planning (cheap signals: scene cuts, score strip changes, motion, audio) ---
+    ocr_frames, windows, signals, segments, audio_windows = None, [], None, [], []
+    if DELIVERY_SEGMENTATION or ADAPTIVE_SAMPLING:
+        t0 = time.time()
+        print("=== STEP 1a: Segmenting deliveries / planning frames ===")
+        if AUDIO_PRIOR:
+            audio_windows = analyze_audio(VIDEO_PATH)["windows"]
+            stage_times["audio_prior"] = time.time() - t0
+        ocr_frames, windows, signals = plan_frames(FRAMES_DIR, p["frame_rate"], p["frame_subsample"],
+                                                   audio_windows=audio_windows)
+        segments = signals["segments"]
+        stage_times["delivery_segmentation"] = time.time() - t0
+
+    # --- STEP 1b: Scorecard OCR (background) ---
+    # OCR is network-bound and independent of the visual models until the timeline,
+    # so it runs on its own thread while steps 2-4 use the CPU/GPU.
+    print("=== STEP 1b: Running scorecard OCR on sampled frames (in background) ===")
+
+    def run_ocr():
+        t_ocr = time.time()
+        results = process_score_frames(
+            FRAMES_DIR, SCORE_JSON, SCORE_CSV,
+            subsample=p["frame_subsample"], frame_rate=p["frame_rate"], request_interval=p["ocr_interval"],
+            frame_paths=ocr_frames
+        )
+        stage_times["scorecard_ocr"] = time.time() - t_ocr
+        return results
+
+    ocr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-stage")
+    ocr_future = ocr_executor.submit(run_ocr)
 
     # --- STEP 2: Load models ---
     t0 = time.time()
@@ -55,12 +85,38 @@ def main():
     umpire_model, umpire_classes = load_umpire_model(UMPIRE_WEIGHTS,           UMPIRE_META_JSON)
     runout_model, runout_classes = load_efficientnet_classifier(RUNOUT_WEIGHTS, RUNOUT_META_JSON)
     video_model,  video_classes  = load_r2plus1d_model(R2P1D_WEIGHTS,          R2P1D_META_JSON)
+
+    tiny_models = {}
+    if USE_CASCADE:
+        tiny_models = load_cascade_heads(CASCADE_HEADS, {
+            "shot": shot_classes, "umpire": umpire_classes, "runout": runout_classes,
+        })
     stage_times["load_models"] = time.time() - t0
 
-    # --- STEP 3: Frame inference ---
+    # --- STEP 3: Clip inference (R(2+1)D) ---
+    # Clips run first: their "bowling" labels refine the delivery windows for step 4
+    t0 = time.time()
+    print("=== STEP 3: Inference on clips (R(2+1)D) ===")
+    result_store = ResultStore(reset=True) if USE_RESULT_STORE else None
+    clip_results = []
+    focus = windows + audio_windows if AUDIO_CLIP_FOCUS and audio_windows else None
+    if p["run_clips"]:
+        clip_results = run_on_clips(CLIPS_DIR, video_model, video_classes, clip_length=p["clip_length"],
+                                    result_store=result_store, skip=segments, focus=focus)
+    stage_times["clip_inference"] = time.time() - t0
+
+    # --- STEP 4: Frame inference ---
     t0 = time.time()
-    print("=== STEP 3: Inference on sampled frames ===")
+    print("=== STEP 4: Inference on sampled frames ===")
+    frame_paths = None
+    if DELIVERY_SEGMENTATION or ADAPTIVE_SAMPLING:
+        frame_paths, windows, _ = plan_frames(FRAMES_DIR, p["frame_rate"], p["frame_subsample"],
+                                              clip_results=clip_results, signals=signals)
     # Note: we pass class lists now, as they are returned by load functions
+    cascade_stats = CascadeStats()
+    feature_store = None
+    if USE_FEATURE_STORE:
+        feature_store = FeatureStore.for_video(VIDEO_PATH, FRAMES_DIR, frame_rate=p["frame_rate"])
     frame_results = run_on_frames(
         FRAMES_DIR,
         yolo_model, 
@@ -69,47 +125,91 @@ def main():
         runout_model,
         shot_classes,
         umpire_classes,
-        runout_classes
+        runout_classes,
+        cascades=tiny_models,
+        cascade_stats=cascade_stats,
+        feature_store=feature_store,
+        result_store=result_store,
+        frame_paths=frame_paths,
+        subsample=p["frame_subsample"],
+        frame_rate=p["frame_rate"],
+        yolo_conf=p["yolo_conf"],
+        yolo_imgsz=p["yolo_imgsz"],
+        run_heads=p["run_heads"]
     )
     stage_times["frame_inference"] = time.time() - t0
 
-    # --- STEP 4: Clip inference (R(2+1)D) ---
-    t0 = time.time()
-    print("=== STEP 4: Inference on clips (R(2+1)D) ===")
-    clip_results = run_on_clips(CLIPS_DIR, video_model, video_classes)
-    stage_times["clip_inference"] = time.time() - t0
+    if tiny_models:
+        cascade_stats.print_report()
+        with open(CASCADE_REPORT_JSON, "w") as f:
+            json.dump(cascade_stats.summary(), f, indent=2)
+        print(f"Saved cascade report to {CASCADE_REPORT_JSON}")
 
-    # Save raw outputs
+    # Save raw outputs (JSON export for compatibility; the result store already has them)
     t0 = time.time()
-    all_outputs = {"frames": frame_results, "clips": clip_results}
-    with open(RAW_RESULTS_JSON, "w") as f:
-        json.dump(all_outputs, f, indent=2)
+    if result_store is not None:
+        result_store.export_json(RAW_RESULTS_JSON)
+    else:
+        with open(RAW_RESULTS_JSON, "w") as f:
+            json.dump({"frames": frame_results, "clips": clip_results}, f)
     print(f"Saved raw model outputs to {RAW_RESULTS_JSON}")
     stage_times["save_raw_outputs"] = time.time() - t0
 
+    # --- Join the OCR stage ---
+    t0 = time.time()
+    if not ocr_future.done():
+        print("=== Waiting for scorecard OCR to finish ===")
+    score_results = ocr_future.result()
+    ocr_executor.shutdown()
+    if result_store is not None:
+        result_store.append_scores(score_results)
+        result_store.close()
+    stage_times["scorecard_ocr_wait"] = time.time() - t0
+
+    # Build quick lookup: frame_name -> score_entry
+    score_by_frame = {
+        entry["frame"]: entry
+        for entry in score_results
+        if entry.get("frame") is not None
+    }
+
     # --- STEP 5: Timeline (with OCR attached) ---
     t0 = time.time()
     print("=== STEP 5: Building timeline (match frames to clips + OCR) ===")
-    timeline = build_timeline(frame_results, clip_results, score_by_frame=score_by_frame)
+    timeline = build_timeline(frame_results, clip_results, score_by_frame=score_by_frame, segments=segments)
     with open(TIMELINE_JSON, "w") as f:
-        json.dump({"events": timeline}, f, indent=2)
+        json.dump({"events": timeline}, f)
     print(f"Saved timeline to {TIMELINE_JSON}")
+    if DELIVERY_SEGMENTATION:
+        save_ball_events(windows, timeline, clip_results)
     stage_times["build_timeline"] = time.time() - t0
 
     # --- STEP 7: Build LLM prompt from timeline ---
+    # A windowed run builds one prompt per window inside step 8 instead
     t0 = time.time()
-    print("=== STEP 7: Building LLM prompt (timeline-based) ===")
-    prompt = build_commentary_prompt_from_timeline(timeline)
-    with open(PROMPT_TXT, "w", encoding="utf-8") as f:
-        f.write(prompt)
-    print(f"Saved LLM prompt to {PROMPT_TXT}")
-    stage_times["build_prompt"] = time.time() - t0
+    prompt = None
+    if not is_windowed(timeline):
+        print("=== STEP 7: Building LLM prompt (timeline-based) ===")
+        prompt = build_commentary_prompt_from_timeline(timeline)
+        with open(PROMPT_TXT, "w", encoding="utf-8") as f:
+            f.write(prompt)
+        print(f"Saved LLM prompt to {PROMPT_TXT}")
+        stage_times["build_prompt"] = time.time() - t0
 
     # --- STEP 8: LLM commentary ---
+    # Long timelines are generated as parallel windows; with streaming every finished
+    # sentence goes straight to the TTS workers (step 9 overlaps step 8)
     t0 = time.time()
     print("=== STEP 8: Calling LLM for commentary ===")
-    commentary = call_llm(prompt)
+    tts_stream = StreamingTTS(TTS_OUTPUT, prefer_elevenlabs=not p["fast_tts"]) if LLM_STREAMING else None
+    llm_report = {}
+    commentary = generate_commentary(timeline, prompt, max_tokens=p["llm_max_tokens"],
+                                     on_sentence=tts_stream.submit if tts_stream else None,
+                                     report=llm_report)
     stage_times["llm_commentary"] = time.time() - t0
+    if llm_report.get("failed_windows"):
+        print(f"[LLM] Windows {llm_report['failed_windows']} of {llm_report['windows']} failed "
+              f"and were bridged with a neutral line.")
 
     print("\n===== GENERATED COMMENTARY =====\n")
     print(commentary)
@@ -123,10 +223,19 @@ def main():
     t0 = time.time()
     if commentary and not commentary.startswith("[LLM ERROR]"):
         print("\n=== STEP 9: Converting commentary to audio (ElevenLabs) ===")
-        synthesize_commentary_audio(commentary, TTS_OUTPUT)
+        if tts_stream is not None:
+            tts_ok = tts_stream.finish()     # falls back to whole-text Edge TTS on its own
+        else:
+            tts_ok = synthesize_commentary_audio(commentary, TTS_OUTPUT, prefer_elevenlabs=not p["fast_tts"])
+        if not tts_ok:
+            print("[TTS] Audio generation failed on every engine; no audio written.")
     else:
         print("[TTS] Skipping TTS because commentary generation failed or returned an error.")
+        if tts_stream is not None:
+            tts_stream.cancel()
     stage_times["tts"] = time.time() - t0
+    if tts_stream is not None and tts_stream.first_audio_sec is not None:
+        stage_times["time_to_first_audio"] = tts_stream.first_audio_sec
 
     # --- Final latency report ---
     total_time = time.time() - overall_start
@@ -137,9 +246,10 @@ def main():
 
     # Save to JSON for logging
     with open(BASE_DIR / "latency_report.json", "w") as f:
-        json.dump({"stages": stage_times, "total_seconds": total_time}, f, indent=2)
+        json.dump({"preset": p["name"], "stages": stage_times, "total_seconds": total_time}, f, indent=2)
         print(f"Saved latency report to {BASE_DIR / 'latency_report.json'}")
 
 
 if __name__ == "__main__":
-    main()
+    # python main.py [preview|balanced|accurate]
+    main(sys.argv[1] if len(sys.argv) >= 2 else DEFAULT_PRESET)
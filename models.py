@@ -92,6 +92,25 @@ class UmpireEfficientNetClassifier(nn.Module):
         return self.base(x)
 
 
+def split_backbone_head(model):
+    """
+    Return (embed_fn, head_fn) for an image classifier:
+    embed_fn(x) -> pooled backbone features, head_fn(features) -> logits.
+    head_fn(embed_fn(x)) == model(x) (in eval mode).
+    """
+    if isinstance(model, UmpireEfficientNetClassifier):
+        base = model.base
+
+        def embed(x):
+            return torch.flatten(base.avgpool(base.features(x)), 1)
+        return embed, base.classifier
+
+    # timm models (SHOT / RUNOUT / cascade tiny models)
+    def embed(x):
+        return model.forward_head(model.forward_features(x), pre_logits=True)
+    return embed, model.get_classifier()
+
+
 def load_umpire_model(weights_path: Path,
                       meta_json_path: Path | None = None):
     print(f"Loading Umpire EfficientNet model from {weights_path}")
@@ -166,3 +185,29 @@ def load_r2plus1d_model(weights_path: Path,
     model.to(DEVICE)
     model.eval()
     return model, class_names
+
+
+def load_cascade_heads(cascade_heads: dict, full_classes: dict):
+    """
+    Load the optional tiny first-stage classifiers.
+    cascade_heads: {head: (weights_path, meta_json_path)}
+    full_classes:  {head: class_names of the full model}
+    Heads whose weights are missing, or whose classes differ from the full
+    model, are skipped (that head simply runs without a cascade).
+    """
+    tiny = {}
+    for head, (weights_path, meta_json_path) in cascade_heads.items():
+        if not Path(weights_path).exists():
+            continue
+        try:
+            model, class_names = load_efficientnet_classifier(weights_path, meta_json_path)
+        except Exception as e:
+            print(f"[CASCADE] Could not load tiny '{head}' model: {e}")
+            continue
+        if list(class_names) != list(full_classes.get(head) or []):
+            print(f"[CASCADE] Tiny '{head}' classes {class_names} do not match the full model. Skipping.")
+            continue
+        tiny[head] = model
+    if tiny:
+        print(f"[CASCADE] Enabled for heads: {sorted(tiny)}")
+    return tiny
@@ -3,6 +3,8 @@ import requests
 import re
 import time
 import json
+import cv2
+import numpy as np
 import pandas as pd
 from PIL import Image, ImageEnhance, ImageFilter
 from tqdm import tqdm
@@ -11,9 +13,18 @@ from io import BytesIO
 
 from config import (
     OCR_KEYS, VISION_URL,
-    MAX_RETRIES, INITIAL_BACKOFF, FRAME_SUBSAMPLE, FRAME_RATE
+    MAX_RETRIES, INITIAL_BACKOFF, FRAME_SUBSAMPLE, FRAME_RATE,
+    LOCAL_OCR_ENABLED, LOCAL_OCR_LEARN, LOCAL_OCR_MIN_CONF, SCORE_GLYPHS_PATH,
+    SCORE_CHANGE_DETECTION, SCORE_CHANGE_THRESHOLD,
+    OCR_SCHEDULE, OCR_COARSE_INTERVAL_SEC, OCR_BATCH_SIZE, OCR_MOSAIC_SIZE, OCR_MOSAIC_GAP,
+    OCR_CACHE_ENABLED, SCORE_ROI_AUTO, OCR_UPLOAD_FORMAT, SCORE_TRACKING
 )
-from video_processing import get_sampled_frame_paths
+from video_processing import get_sampled_frame_paths, frame_index_from_name
+from score_recognizer import ScoreGlyphRecognizer
+from ocr_client import OCRClient, build_ocr_payload, parse_ocr_response
+from ocr_cache import get_ocr_cache
+from score_roi import resolve_score_profile
+from score_tracker import track_scores
 
 
 # ================= CUSTOM OCR SETTINGS (Sony LIV) =================
@@ -71,11 +82,233 @@ def image_to_base64_bytes(pil_img: Image.Image, quality=90):
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 
 
+# ================= BATCH PREPROCESSING =================
+
+OCR_MAX_WIDTH = 1200    # same target width as resize_for_ocr
+
+
+_REDUCED_GRAY = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+def _decode_gray_crop(image_path, do_crop=True, roi=None) -> np.ndarray:
+    """
+    Grayscale crop of one frame. Frames are decoded straight to grayscale and, when
+    the strip would still be at least OCR_MAX_WIDTH wide, at a reduced JPEG DCT scale,
+    so 4K frames are not decoded at full size just to be downscaled afterwards.
+    """
+    with Image.open(image_path) as header:   # size only, no decode
+        w, _ = header.size
+    strip_frac = (roi["right"] - roi["left"]) if roi is not None and do_crop else 1.0
+    scale = 1
+    while scale < 8 and w * strip_frac / (scale * 2) >= OCR_MAX_WIDTH:
+        scale *= 2
+    gray = cv2.imread(str(image_path), _REDUCED_GRAY[scale])
+    if gray is None:
+        raise ValueError(f"Could not decode {image_path}")
+
+    h, w = gray.shape
+    if not do_crop:
+        return gray
+    if roi is not None:
+        return gray[int(h * roi["top"]):int(h * roi["bottom"]), int(w * roi["left"]):int(w * roi["right"])]
+    return gray[int(h * CROP_TOP_RATIO):int(h * CROP_BOTTOM_RATIO)]
+
+
+# PIL's ImageEnhance.Sharpness(2.0) = 2 * img - SMOOTH(img), as one 3x3 kernel
+_SHARPEN_2X = -np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+_SHARPEN_2X[1, 1] += 2.0
+
+
+def _filter_stack(stack: np.ndarray, fn) -> np.ndarray:
+    """
+    Apply a 3x3 OpenCV filter to every strip of an (N, H, W) stack in ONE call:
+    strips are edge-padded by a row and stacked into one tall image, so no strip
+    sees its neighbour (same result as filtering each strip with BORDER_REPLICATE).
+    """
+    n, h, w = stack.shape
+    tall = np.pad(stack, ((0, 0), (1, 1), (0, 0)), mode="edge").reshape(n * (h + 2), w)
+    return fn(tall).reshape(n, h + 2, w)[:, 1:-1]
+
+
+def preprocess_strip_stack(stack: np.ndarray) -> np.ndarray:
+    """
+    preprocess_for_ocr on an (N, H, W) uint8 stack of same-sized strips at once:
+    contrast x2.8 around each strip's mean, sharpness x2.0, then a 3x3 median.
+    """
+    x = stack.astype(np.float32)
+    mean = np.floor(x.mean(axis=(1, 2), keepdims=True) + 0.5)
+    x = np.clip(mean + 2.8 * (x - mean), 0, 255).round().astype(np.uint8)
+
+    x = _filter_stack(x, lambda img: cv2.filter2D(img, -1, _SHARPEN_2X, borderType=cv2.BORDER_REPLICATE))
+    return _filter_stack(np.ascontiguousarray(x), lambda img: cv2.medianBlur(img, 3))
+
+
+def load_score_strips(image_paths, do_crops, roi=None):
+    """
+    Batch version of load_score_strip. Returns one (strip, error) pair per path;
+    strips of the same size are preprocessed together as one NumPy stack.
+    """
+    out = [(None, None)] * len(image_paths)
+    by_shape = {}
+    for k, (path, do_crop) in enumerate(zip(image_paths, do_crops)):
+        try:
+            gray = _decode_gray_crop(path, do_crop=do_crop, roi=roi)
+        except Exception as e:
+            out[k] = (None, str(e))
+            continue
+        by_shape.setdefault(gray.shape, []).append((k, gray))
+
+    for (h, w), items in by_shape.items():
+        processed = preprocess_strip_stack(np.stack([g for _, g in items]))
+        size = (OCR_MAX_WIDTH, int(h * OCR_MAX_WIDTH / w)) if w > OCR_MAX_WIDTH else None
+        for (k, _), arr in zip(items, processed):
+            if size is not None:
+                arr = cv2.resize(arr, size, interpolation=cv2.INTER_AREA)
+            out[k] = (Image.fromarray(arr), None)
+    return out
+
+
+def strip_upload(img: Image.Image, fmt: str = OCR_UPLOAD_FORMAT):
+    """
+    Bytes sent to OCR.Space for a strip (or mosaic).
+    "png1": Otsu-binarised 1-bit PNG (dark text on white), uploaded as a multipart file;
+    "jpeg": the grayscale image as base64 JPEG, as before.
+    """
+    if fmt != "png1":
+        return image_to_base64_bytes(img)
+    gray = np.asarray(img.convert("L"))
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if bw.mean() < 127:     # background must end up white
+        bw = 255 - bw
+    buf = BytesIO()
+    Image.fromarray(bw).convert("1").save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+# ================= CHANGE DETECTION =================
+
+SIGNATURE_HEIGHT = 32   # strips are compared at this height, aspect ratio kept
+SIGNATURE_TILE = 4      # side of the square tiles compared; about half a glyph at SIGNATURE_HEIGHT
+
+
+def strip_columns(roi, digit_regions):
+    """
+    Digit regions of a score profile (fractions of the frame) as [left, right]
+    fractions of the ROI strip, or None (compare the whole strip).
+    """
+    if roi is None or not digit_regions:
+        return None
+    width = max(roi["right"] - roi["left"], 1e-6)
+    cols = [[max(0.0, (a - roi["left"]) / width), min(1.0, (b - roi["left"]) / width)] for a, b in digit_regions]
+    return [c for c in cols if c[1] > c[0]] or None
+
+
+def select_columns(sig: np.ndarray, columns) -> np.ndarray:
+    """The given column spans (fractions of the width) of a signature or stack of signatures, side by side."""
+    if not columns:
+        return sig
+    w = sig.shape[-1]
+    spans = [(int(np.floor(a * w)), int(np.ceil(b * w))) for a, b in columns]
+    out = np.concatenate([sig[..., x0:max(x1, x0 + 1)] for x0, x1 in spans], axis=-1)
+    return out if out.shape[-1] >= SIGNATURE_TILE else sig   # too narrow to tile: whole strip
+
+
+def strip_signature(strip: Image.Image, columns=None) -> np.ndarray:
+    """
+    Small grayscale copy of the preprocessed strip, float32 in 0..255.
+    columns: strip_columns() spans; only those parts of the strip are kept.
+    """
+    w, h = strip.size
+    size = (max(SIGNATURE_HEIGHT, round(w * SIGNATURE_HEIGHT / max(h, 1))), SIGNATURE_HEIGHT)
+    small = strip.convert("L").resize(size, Image.Resampling.BILINEAR)
+    return select_columns(np.asarray(small, dtype=np.float32), columns)
+
+
+class StripChangeDetector:
+    """
+    Tells whether the score strip changed since the last strip that was actually read.
+    The strip is compared in small square tiles (mean absolute pixel difference per
+    tile) so one changed digit is not averaged away by the rest of the strip. Tiles
+    spanning the full strip height did exactly that: a one-digit change stayed below
+    the noise of an unchanged strip.
+    columns: digit regions of the score profile (strip_columns); when set, only they
+    are compared, so animated logos elsewhere in the overlay do not count as changes.
+    """
+
+    def __init__(self, threshold: float = SCORE_CHANGE_THRESHOLD, columns=None):
+        self.threshold = threshold
+        self.columns = columns
+        self.reference = None
+
+    def set_reference(self, strip: Image.Image):
+        self.reference = strip_signature(strip, self.columns)
+
+    def max_tile_diff(self, strip: Image.Image) -> float:
+        if self.reference is None:
+            return float("inf")
+        sig = strip_signature(strip, self.columns)
+        if sig.shape != self.reference.shape:
+            return float("inf")
+        diff = np.abs(sig - self.reference)
+        t = SIGNATURE_TILE
+        h, w = (diff.shape[0] // t) * t, (diff.shape[1] // t) * t
+        return float(diff[:h, :w].reshape(h // t, t, w // t, t).mean(axis=(1, 3)).max())
+
+    def is_same(self, strip: Image.Image) -> bool:
+        return self.max_tile_diff(strip) <= self.threshold
+
+
+# ================= MOSAIC BATCHING =================
+
+def build_strip_mosaic(strips, gap: int = OCR_MOSAIC_GAP):
+    """
+    Stack preprocessed strips vertically, separated by `gap` rows of background, so
+    several strips go out as one OCR request. Returns (image, bands) where bands[k]
+    is the (top, bottom) pixel rows of strip k inside the mosaic.
+    """
+    arrays = [np.asarray(s.convert("L")) for s in strips]
+    edges = np.concatenate([np.concatenate([a[0], a[-1]]) for a in arrays])
+    background = int(np.median(edges))
+    width = max(a.shape[1] for a in arrays)
+    height = sum(a.shape[0] for a in arrays) + gap * (len(arrays) - 1)
+
+    canvas = np.full((height, width), background, dtype=np.uint8)
+    bands, y = [], 0
+    for a in arrays:
+        canvas[y:y + a.shape[0], :a.shape[1]] = a
+        bands.append((y, y + a.shape[0]))
+        y += a.shape[0] + gap
+    return Image.fromarray(canvas), bands
+
+
+def split_mosaic_text(lines, bands, gap: int = OCR_MOSAIC_GAP):
+    """
+    Split an overlay read of a mosaic back into one text per strip.
+    Every word goes to the band containing its vertical centre (half the gap counts
+    to each neighbour); words keep their overlay line grouping and are re-ordered
+    left to right, so each text has the same layout as a single-strip read.
+    """
+    per_band = [dict() for _ in bands]   # band -> {line index: [(left, word)]}
+    for li, line in enumerate(lines or []):
+        for w in line["words"]:
+            cy = w["top"] + w["height"] / 2
+            for k, (top, bottom) in enumerate(bands):
+                if top - gap / 2 <= cy < bottom + gap / 2:
+                    per_band[k].setdefault(li, []).append((w["left"], w["text"]))
+                    break
+    return [
+        "\n".join(" ".join(t for _, t in sorted(words)) for _, words in sorted(band.items()))
+        for band in per_band
+    ]
+
+
 # ================= OCR.SPACE API =================
 
-def call_vision_ocr(base64_image: str, api_key: str = None):
+def call_vision_ocr(base64_image: str, api_key: str = None, url: str = VISION_URL):
     """
-    Calls the OCR.Space API using base64 image data.
+    Calls the OCR.Space API using base64 image data (single key, no pooling).
+    Batch runs go through ocr_client.OCRClient instead.
     """
     if not api_key:
         return {"success": False, "text": None, "error": "No API key provided"}
@@ -83,18 +316,8 @@ def call_vision_ocr(base64_image: str, api_key: str = None):
     backoff = INITIAL_BACKOFF
 
     for attempt in range(1, MAX_RETRIES + 1):
-        data = {
-            "apikey": api_key,
-            "language": "eng",
-            "base64Image": f"data:image/jpeg;base64,{base64_image}", 
-            "isOverlayRequired": False,
-            "OCREngine": 2,
-            "scale": True,
-            "detectOrientation": True,
-        }
-
         try:
-            resp = requests.post(VISION_URL, data=data, timeout=60)
+            resp = requests.post(url, data=build_ocr_payload(base64_image, api_key), timeout=60)
         except Exception as e:
             if attempt == MAX_RETRIES:
                 return {"success": False, "text": None, "error": str(e)}
@@ -112,19 +335,7 @@ def call_vision_ocr(base64_image: str, api_key: str = None):
             backoff *= 2
             continue
 
-        try:
-            result = resp.json()
-        except:
-             return {"success": False, "text": None, "error": "Invalid JSON response"}
-
-        if result.get("IsErroredOnProcessing"):
-            err_msg = result.get("ErrorMessage")
-            # Loop retry on limit? No, user prefers fail-fast or clean retry. 
-            return {"success": False, "text": None, "error": str(err_msg)}
-
-        parsed = result.get("ParsedResults", [])
-        text = "\n".join([p.get("ParsedText", "") for p in parsed]).strip()
-        return {"success": True, "text": text, "error": None}
+        return parse_ocr_response(resp)
 
     return {"success": False, "text": None, "error": "Max retries exceeded"}
 
@@ -196,81 +407,511 @@ def parse_score_text(text):
 
 # ================= FRAME ANALYSIS =================
 
-def analyze_score_frame(image_path, do_crop=True, api_key=None):
+def _is_score_parsed(parsed) -> bool:
+    return bool(parsed) and parsed.get("team1_name") is not None
+
+
+def load_score_strip(image_path, do_crop=True, roi=None) -> Image.Image:
     """
-    Analyze frame. If do_crop=True, applies specific Sony LIV bottom crop.
-    Also applies User's preprocessing (Contrast/Sharpness).
+    Open a frame and return the OCR-ready strip.
+    roi: localised overlay region (score_roi); otherwise, if do_crop=True,
+    applies specific Sony LIV bottom crop.
+    Also applies User's preprocessing (Contrast/Sharpness), see load_score_strips.
+    """
+    strip, error = load_score_strips([image_path], [do_crop], roi=roi)[0]
+    if error is not None:
+        raise ValueError(error)
+    return strip
+
+
+def analyze_score_frame(image_path, do_crop=True, api_key=None, recognizer=None):
+    """
+    Analyze frame: load_score_strip + read_score_strip (with the shared OCR cache).
     """
     try:
-        img = Image.open(image_path).convert("RGB")
-        
-        if do_crop:
-            img = crop_scorecard(img)
-        
-        # Apply strict preprocessing
-        processed_img = preprocess_for_ocr(img)
-        processed_img = resize_for_ocr(processed_img)
-
-        # To Base64
-        base64_img = image_to_base64_bytes(processed_img)
-        
-        # Call API
-        resp = call_vision_ocr(base64_img, api_key=api_key)
+        processed_img = load_score_strip(image_path, do_crop=do_crop)
+    except Exception as e:
+        return {"error": str(e), "ocr_text": None, "parsed": None, "source": "api"}
+    cache = get_ocr_cache() if OCR_CACHE_ENABLED else None
+    return read_score_strip(processed_img, api_key=api_key, recognizer=recognizer, cache=cache)
 
-        if not resp["success"]:
-            return {"error": resp["error"], "ocr_text": None, "parsed": None}
 
-        text = resp["text"].strip() if resp["text"] else ""
-        parsed = parse_score_text(text)
+def read_score_strip(processed_img: Image.Image, api_key=None, recognizer=None, client=None, cache=None):
+    """
+    Read one preprocessed strip.
+    cache: optional OCRCache, checked first; parsed API reads are added to it.
+    recognizer: optional ScoreGlyphRecognizer. Its read is used when it is confident
+    and parses; otherwise the OCR.Space API is called (and, with LOCAL_OCR_LEARN,
+    a parsed API read teaches the recognizer the glyphs of this strip).
+    client: optional OCRClient used instead of the single api_key.
+    "source" in the result is "cache", "local" or "api".
+    """
+    try:
+        key = cache.key(processed_img) if cache is not None else None
+        hit = cached_score_read(cache, key, processed_img)
+        if hit is not None:
+            return hit
 
-        return {"ocr_text": text, "parsed": parsed, "error": None}
+        local = local_score_read(processed_img, recognizer)
+        if local is not None:
+            return local
+
+        base64_img = image_to_base64_bytes(processed_img)
+        if client is not None:
+            resp = client.ocr(base64_img)
+        else:
+            resp = call_vision_ocr(base64_img, api_key=api_key)
+        entry = api_score_entry(resp, processed_img, recognizer)
+        cache_score_read(cache, key, entry, processed_img)
+        return entry
 
     except Exception as e:
-        return {"error": str(e), "ocr_text": None, "parsed": None}
+        return {"error": str(e), "ocr_text": None, "parsed": None, "source": "api"}
+
+
+def cached_score_read(cache, key, processed_img: Image.Image):
+    """
+    Cached read for this strip key, or None. The key is a coarse hash that two strips
+    differing in one digit can share, so a hit only counts when the signature stored
+    with it matches this strip tile for tile (StripChangeDetector); otherwise the
+    entry is rejected and the strip is read again.
+    """
+    if cache is None or key is None:
+        return None
+    hit = cache.get(key)
+    if hit is None:
+        return None
+    detector = StripChangeDetector()
+    detector.reference = hit.get("signature")
+    if not detector.is_same(processed_img):
+        cache.reject(key)
+        return None
+    return {"ocr_text": hit["ocr_text"], "parsed": hit["parsed"], "error": None, "source": "cache"}
+
+
+def cache_score_read(cache, key, entry, processed_img: Image.Image):
+    """Store an API read that parsed; errors and unparsed text are not cached."""
+    if cache is None or key is None or entry.get("error") or not _is_score_parsed(entry.get("parsed")):
+        return
+    cache.put(key, entry["ocr_text"], entry["parsed"], signature=strip_signature(processed_img))
+
+
+def local_score_read(processed_img: Image.Image, recognizer=None):
+    """Recognizer read if it is confident and parses, else None (no network, no rate limit)."""
+    if recognizer is None or not recognizer.ready:
+        return None
+    # An unlearned digit reads as a learned look-alike (46 -> 45); the API answers until all are known
+    if recognizer.missing_digits:
+        return None
+    local_text, local_conf = recognizer.recognize(processed_img)
+    if local_conf < LOCAL_OCR_MIN_CONF:
+        return None
+    parsed = parse_score_text(local_text)
+    if not _is_score_parsed(parsed):
+        return None
+    return {"ocr_text": local_text, "parsed": parsed, "error": None,
+            "source": "local", "local_confidence": local_conf}
+
+
+def api_score_entry(resp: dict, processed_img: Image.Image, recognizer=None):
+    """Result dict for an OCR.Space response; parsed reads are taught to the recognizer."""
+    if not resp["success"]:
+        return {"error": resp["error"], "ocr_text": None, "parsed": None, "source": "api"}
+
+    text = resp["text"].strip() if resp["text"] else ""
+    parsed = parse_score_text(text)
+
+    if recognizer is not None and LOCAL_OCR_LEARN and _is_score_parsed(parsed):
+        recognizer.learn(processed_img, text)
+
+    return {"ocr_text": text, "parsed": parsed, "error": None, "source": "api"}
 
 
 # ================= BATCH PROCESSING =================
 
+def _should_crop(frame_path: Path, frame_rate: float) -> bool:
+    """Time Logic: < 40s = No Crop (Intro), > 40s = Crop (Ticker)."""
+    m = re.search(r"frame_(\d+)\.jpg", frame_path.name)
+    if m:
+        frame_idx = int(m.group(1))
+        time_sec = frame_idx / float(frame_rate)
+        return time_sec >= 40.0
+    return True
+
+
+def score_key(entry):
+    """(batting team, runs, wickets, overs) of a read, or None if it did not parse."""
+    parsed = (entry or {}).get("parsed")
+    if not _is_score_parsed(parsed):
+        return None
+    s = parsed.get("team1_score") or {}
+    return (parsed.get("team1_name"), s.get("runs"), s.get("wickets"), s.get("overs"))
+
+
+def _coarse_indices(times, interval: float):
+    """Indices spaced at least `interval` seconds apart, from the first frame on."""
+    picked = [0]
+    for i, t in enumerate(times):
+        if t - times[picked[-1]] >= interval:
+            picked.append(i)
+    return picked
+
+
+def bisect_score_reads(frame_paths, read_many, coarse_step: int, times=None, strip_changes=None):
+    """
+    Adaptive OCR schedule over frame_paths (already subsampled).
+    Reads every coarse_step-th frame (plus the last one), or with per-frame `times`
+    (non-uniform schedules) one frame every coarse_step seconds; whenever two neighbouring
+    reads disagree on score_key (or either did not parse), the midpoint is read and both
+    halves are checked again, until each change sits between two adjacent frames. That
+    costs about O(changes * log(coarse_step)) reads instead of one per frame. All
+    midpoints of one bisection level go to read_many(paths) -> entries together.
+    strip_changes(paths) -> [bool]: optional cheap local check of whether each frame's
+    strip differs from the previous frame's. An interval whose ends agree is still
+    bisected if its strip changed inside, so a score that changes and changes back
+    between two reads is not missed. Without it such a change is not seen.
+    Frames that were not read copy the read on their left (the score is a step
+    function, and both neighbours agree) and are marked "interpolated".
+    """
+    n = len(frame_paths)
+    if n == 0:
+        return []
+
+    coarse = list(range(0, n, coarse_step)) if times is None else _coarse_indices(times, coarse_step)
+    if coarse[-1] != n - 1:
+        coarse.append(n - 1)
+    reads = dict(zip(coarse, read_many([frame_paths[i] for i in coarse])))
+
+    # moved[i] = number of strip changes among frames 1..i
+    moved = np.cumsum([0] + [bool(c) for c in strip_changes(frame_paths)[1:]]) if strip_changes else None
+
+    def must_split(lo, hi):
+        if hi - lo <= 1:
+            return False
+        key = score_key(reads[lo])
+        if key is None or key != score_key(reads[hi]):
+            return True
+        return moved is not None and moved[hi] > moved[lo]
+
+    intervals = list(zip(coarse[:-1], coarse[1:]))
+    while intervals:
+        changed = [(lo, hi) for lo, hi in intervals if must_split(lo, hi)]
+        mids = [(lo + hi) // 2 for lo, hi in changed]
+        reads.update(zip(mids, read_many([frame_paths[m] for m in mids])))
+        intervals = [iv for (lo, hi), m in zip(changed, mids) for iv in ((lo, m), (m, hi))]
+
+    results = []
+    last = None
+    for i, f in enumerate(frame_paths):
+        if i in reads:
+            last = reads[i]
+            results.append(last)
+        else:
+            entry = {k: v for k, v in last.items() if k not in ("frame", "reused_from")}
+            results.append({"frame": f.name, **entry,
+                            "interpolated": True, "interpolated_from": last["frame"]})
+    print(f"[OCR] Bisect schedule: {len(reads)}/{n} frames read (coarse step {coarse_step}).")
+    return results
+
+
+def _future_response(fut) -> dict:
+    try:
+        return fut.result()
+    except Exception as e:
+        return {"success": False, "text": None, "error": str(e)}
+
+
+class ScoreStripReader:
+    """
+    Reads score strips for a list of frames, in order.
+
+    Frames are prepared in batches of OCR_BATCH_SIZE on the calling thread (reuse of an
+    earlier pass, change detection, local recognizer); only the remaining strips go to
+    the OCRClient, concurrently. Results are then applied in frame order, so glyph
+    learning and change-detection references are the same as in a sequential run.
+    A strip that matches a read still in flight repeats that read once it returns
+    (or is read itself if that read failed).
+    Ticker strips are sent mosaic_size at a time as one stacked image; a slice of
+    the mosaic read that has text but does not parse is sent again on its own (a slice
+    without any words, e.g. an ad or intro frame, is taken as read: it would not parse
+    on its own either).
+    cache: optional OCRCache consulted before the recognizer and the API.
+    roi: localised overlay region, used instead of the default ticker crop (intro
+    frames are still read full frame); digit_regions: the profile's digit regions,
+    which the change detector and the cache key of ticker strips look at.
+    """
+
+    def __init__(self, client: OCRClient, recognizer=None, frame_rate: float = FRAME_RATE,
+                 change_detection: bool = SCORE_CHANGE_DETECTION, reuse=None, pbar=None,
+                 mosaic_size: int = OCR_MOSAIC_SIZE, cache=None, roi=None, digit_regions=None):
+        self.client = client
+        self.recognizer = recognizer
+        self.frame_rate = frame_rate
+        self.change_detection = change_detection
+        self.reuse = reuse or {}
+        self.pbar = pbar
+        self.mosaic_size = max(1, int(mosaic_size))
+        self.cache = cache
+        self.roi = roi
+        self.columns = strip_columns(roi, digit_regions)
+        self.mosaic_stats = {"requests": 0, "strips": 0, "fallbacks": 0}
+        # One reference per crop mode: intro (full frame) and ticker strips are never compared
+        self.detectors = {True: self._detector(True), False: self._detector(False)}
+        self.last_read = {True: None, False: None}   # crop mode -> last entry actually read
+        self.skipped = 0
+
+    def _detector(self, crop: bool) -> StripChangeDetector:
+        return StripChangeDetector(columns=self.columns if crop else None)
+
+    @staticmethod
+    def _repeat(entry, frame_name):
+        rest = {k: v for k, v in entry.items() if k not in ("frame", "reused_from")}
+        return {"frame": frame_name, **rest, "reused_from": entry["frame"]}
+
+    def read_many(self, paths) -> list:
+        out = []
+        for i in range(0, len(paths), OCR_BATCH_SIZE):
+            out.extend(self._read_batch(paths[i:i + OCR_BATCH_SIZE]))
+            if self.pbar is not None:
+                self.pbar.update(len(paths[i:i + OCR_BATCH_SIZE]))
+        return out
+
+    def strip_changes(self, paths) -> list:
+        """
+        Local check, no OCR: for each frame, whether its strip differs from the previous
+        frame's (the first frame, crop mode switches and unreadable frames count as changed).
+        """
+        flags, previous = [], None    # (crop mode, detector) of the previous frame
+        for i in range(0, len(paths), OCR_BATCH_SIZE):
+            batch = paths[i:i + OCR_BATCH_SIZE]
+            crops = [_should_crop(p, self.frame_rate) for p in batch]
+            for (strip, error), crop in zip(load_score_strips(batch, crops, self.roi), crops):
+                if error is not None:
+                    flags.append(True)
+                    previous = None
+                    continue
+                flags.append(previous is None or previous[0] != crop or not previous[1].is_same(strip))
+                detector = self._detector(crop)
+                detector.set_reference(strip)
+                previous = (crop, detector)
+        return flags
+
+    def _send(self, indices, actual) -> dict:
+        """API responses for the strips at `indices`: {i: {"success", "text", "error"}}."""
+        crop = [i for i in indices if actual[i][1]]
+        groups = [crop[k:k + self.mosaic_size] for k in range(0, len(crop), self.mosaic_size)]
+        singles = [i for i in indices if not actual[i][1]] + [g[0] for g in groups if len(g) == 1]
+        groups = [g for g in groups if len(g) > 1]
+
+        futures = {i: self.client.submit(strip_upload(actual[i][0])) for i in singles}
+        mosaics = []
+        for g in groups:
+            mosaic, bands = build_strip_mosaic([actual[i][0] for i in g])
+            mosaics.append((g, bands, self.client.submit(strip_upload(mosaic), overlay=True)))
+
+        responses = {}
+        fallbacks = []
+        for g, bands, fut in mosaics:
+            self.mosaic_stats["requests"] += 1
+            self.mosaic_stats["strips"] += len(g)
+            resp = _future_response(fut)
+            if not resp["success"]:
+                # Same as a failed single read: reported, and retried on later frames
+                responses.update({i: resp for i in g})
+                continue
+            for i, text in zip(g, split_mosaic_text(resp.get("lines"), bands)):
+                if not text.strip() or _is_score_parsed(parse_score_text(text)):
+                    responses[i] = {"success": True, "text": text, "error": None}
+                else:
+                    fallbacks.append(i)
+
+        # Slices with text that did not parse are read on their own
+        self.mosaic_stats["fallbacks"] += len(fallbacks)
+        futures.update({i: self.client.submit(strip_upload(actual[i][0])) for i in fallbacks})
+        for i, fut in futures.items():
+            responses[i] = _future_response(fut)
+        return responses
+
+    def _read_batch(self, paths, link_pending=True):
+        out = [None] * len(paths)
+        actual = {}    # i -> (strip, do_crop) for frames that were really read
+        keys = {}      # i -> cache key of the strip
+        to_send = []   # indices whose strip goes to the API
+        links = {}     # i -> index of the in-flight read this strip repeats
+        repeated = 0
+
+        # Latest reference per crop mode: (detector, finished entry | index of in-flight read)
+        current = {crop: (self.detectors[crop], self.last_read[crop])
+                   for crop in (True, False) if self.last_read[crop] is not None}
+
+        # Interpolated entries of an earlier pass were never read, so they are not reused
+        todo = []
+        for i, f in enumerate(paths):
+            earlier = self.reuse.get(f.name)
+            if earlier and not earlier.get("interpolated"):
+                out[i] = dict(earlier)
+            else:
+                todo.append(i)
+        crops = {i: _should_crop(paths[i], self.frame_rate) for i in todo}
+        loaded = dict(zip(todo, load_score_strips([paths[i] for i in todo], [crops[i] for i in todo], self.roi)))
+
+        for i in todo:
+            f = paths[i]
+            do_crop = crops[i]
+            strip, error = loaded[i]
+            if error is not None:
+                out[i] = {"frame": f.name, "error": error, "ocr_text": None, "parsed": None}
+                continue
+
+            if self.change_detection and do_crop in current:
+                detector, source = current[do_crop]
+                if isinstance(source, int):
+                    if link_pending and detector.is_same(strip):
+                        links[i] = source
+                        continue
+                elif detector.is_same(strip):
+                    out[i] = self._repeat(source, f.name)
+                    repeated += 1
+                    continue
+
+            actual[i] = (strip, do_crop)
+            try:
+                keys[i] = self.cache.key(strip, self.columns if do_crop else None) if self.cache is not None else None
+                local = cached_score_read(self.cache, keys[i], strip) or local_score_read(strip, self.recognizer)
+            except Exception:
+                local = None
+            if local is not None:
+                out[i] = {"frame": f.name, **local}
+                source = out[i]
+            else:
+                to_send.append(i)
+                source = i
+            detector = self._detector(do_crop)
+            detector.set_reference(strip)
+            current[do_crop] = (detector, source)
+
+        # Apply API results in frame order
+        responses = self._send(to_send, actual)
+        for i in to_send:
+            strip, _ = actual[i]
+            try:
+                r = api_score_entry(responses[i], strip, self.recognizer)
+                cache_score_read(self.cache, keys.get(i), r, strip)
+            except Exception as e:
+                r = {"error": str(e), "ocr_text": None, "parsed": None, "source": "api"}
+            out[i] = {"frame": paths[i].name, **r}
+
+        reread = []
+        for i, j in links.items():
+            if out[j].get("error"):
+                reread.append(i)
+            else:
+                out[i] = self._repeat(out[j], paths[i].name)
+
+        # Only good reads become references; errors are retried on later frames
+        for i in sorted(actual):
+            strip, do_crop = actual[i]
+            if not out[i].get("error"):
+                self.detectors[do_crop].set_reference(strip)
+                self.last_read[do_crop] = out[i]
+        self.skipped += repeated + len(links) - len(reread)
+
+        if reread:
+            for i, entry in zip(reread, self._read_batch([paths[i] for i in reread], link_pending=False)):
+                out[i] = entry
+        return out
+
+
 def process_score_frames(frames_dir: Path,
                          output_json_path: Path,
-                         output_csv_path: Path):
+                         output_csv_path: Path,
+                         subsample: int = FRAME_SUBSAMPLE,
+                         frame_rate: float = FRAME_RATE,
+                         request_interval: float = 1.5,
+                         reuse=None,
+                         change_detection: bool = SCORE_CHANGE_DETECTION,
+                         schedule: str = OCR_SCHEDULE,
+                         localize: bool = SCORE_ROI_AUTO,
+                         frame_paths=None):
     """
-    Run scorecard OCR on subsampled frames using strict Single Key logic.
+    Run scorecard OCR on subsampled frames.
+    subsample / frame_rate come from the job preset; request_interval (seconds) is the
+    minimum average spacing of API calls PER KEY, so every key in OCR_KEYS adds throughput.
+    reuse: optional {frame_name: entry} from an earlier pass; those frames are not sent again.
+    change_detection: skip reading a strip that looks the same as the last strip read
+    and reuse that read (entry gets "reused_from": <frame>).
+    schedule: "stride" reads every subsampled frame; "bisect" reads coarsely and
+    bisects only the intervals where the score changed (see bisect_score_reads).
+    localize: find the score overlay (or match a stored broadcaster profile) instead
+    of the fixed crop + "< 40s = full frame" rule.
+    frame_paths: explicit frames to read (e.g. a delivery-aware or motion-driven schedule)
+    instead of every `subsample`-th frame. Every entry gets "time_sec" from its frame index.
     """
     # 🔹 Use subsampled frames 
-    frame_paths = get_sampled_frame_paths(frames_dir, FRAME_SUBSAMPLE)
-    print(f"Running scorecard OCR on {len(frame_paths)} frames (subsample={FRAME_SUBSAMPLE}) ...")
-    
-    # Use Key 1 for EVERYTHING as requested
-    active_key = OCR_KEYS[0] if OCR_KEYS else None
-
-    if not active_key:
+    uniform = frame_paths is None
+    if frame_paths is None:
+        frame_paths = get_sampled_frame_paths(frames_dir, subsample)
+    frame_paths = list(frame_paths)
+    times = [frame_index_from_name(Path(f)) / float(frame_rate) for f in frame_paths]
+    print(f"Running scorecard OCR on {len(frame_paths)} frames (subsample={subsample}) ...")
+
+    if not OCR_KEYS:
         print("[OCR] CRITICAL: No OCR keys found! Skipping OCR.")
         return []
 
-    results = []
-
-    for f in tqdm(frame_paths, desc="Scorecard OCR"):
-        f_str = str(f)
-        
-        # Time Logic: < 40s = No Crop (Intro), > 40s = Crop (Ticker)
-        do_crop = True
-        m = re.search(r"frame_(\d+)\.jpg", f.name)
-        if m:
-            frame_idx = int(m.group(1))
-            time_sec = frame_idx / float(FRAME_RATE)
-            if time_sec < 40.0:
-                do_crop = False
-            else:
-                do_crop = True
-        
-        r = analyze_score_frame(f_str, do_crop=do_crop, api_key=active_key)
-        entry = {"frame": f.name}
-        entry.update(r)
-        results.append(entry)
-        
-        # Respect rate limit
-        time.sleep(1.5)
+    recognizer = ScoreGlyphRecognizer.load(SCORE_GLYPHS_PATH) if LOCAL_OCR_ENABLED else None
+    templates_before = len(recognizer.chars) if recognizer else 0
+
+    client = OCRClient(OCR_KEYS, rate_per_key=1.0 / max(request_interval, 1e-3))
+    cache = get_ocr_cache() if OCR_CACHE_ENABLED else None
+    profile = resolve_score_profile(sorted(frames_dir.glob("frame_*.jpg"))) if localize else None
+    pbar = tqdm(total=len(frame_paths), desc=f"Scorecard OCR ({schedule})")
+    reader = ScoreStripReader(client, recognizer, frame_rate=frame_rate,
+                              change_detection=change_detection, reuse=reuse, pbar=pbar, cache=cache,
+                              roi=profile["roi"] if profile else None,
+                              digit_regions=profile["digit_regions"] if profile else None)
+    try:
+        strip_changes = reader.strip_changes if change_detection else None
+        if schedule == "bisect" and uniform:
+            coarse_step = max(1, round(OCR_COARSE_INTERVAL_SEC * frame_rate / max(subsample, 1)))
+            results = bisect_score_reads(frame_paths, reader.read_many, coarse_step, strip_changes=strip_changes)
+        elif schedule == "bisect":
+            results = bisect_score_reads(frame_paths, reader.read_many, OCR_COARSE_INTERVAL_SEC, times=times,
+                                         strip_changes=strip_changes)
+        else:
+            results = reader.read_many(frame_paths)
+    finally:
+        pbar.close()
+        client.close()
+
+    print(f"[OCR] {client.stats['requests']} API requests over {len(client.pool.keys)} key(s), "
+          f"{client.stats['rate_limited']} rate limited.")
+    cache_reads = sum(1 for r in results if r.get("source") == "cache")
+    if cache is not None:
+        print(f"[OCR] Cache: {cache_reads}/{len(results)} frames resolved from {cache.path.name}, "
+              f"{cache.stats['rejected']} colliding entries rejected so far.")
+    ms = reader.mosaic_stats
+    if ms["requests"]:
+        print(f"[OCR] Mosaic: {ms['strips']} strips in {ms['requests']} requests, "
+              f"{ms['fallbacks']} re-read on their own.")
+    if change_detection:
+        print(f"[OCR] Strip unchanged on {reader.skipped}/{len(frame_paths)} frames; reused the previous read.")
+
+    for r, t in zip(results, times):
+        r["time_sec"] = t
+
+    if SCORE_TRACKING:
+        results = track_scores(results)
+
+    if recognizer is not None:
+        local_reads = sum(1 for r in results if r.get("source") == "local")
+        print(f"[LOCAL OCR] {local_reads}/{len(results)} frames read locally.")
+        if len(recognizer.chars) > templates_before:
+            recognizer.save(SCORE_GLYPHS_PATH)
+            print(f"[LOCAL OCR] Learned {len(recognizer.chars) - templates_before} new glyph exemplars.")
+        if recognizer.missing_digits:
+            print(f"[LOCAL OCR] No exemplars yet for digits {recognizer.missing_digits}; "
+                  f"local reads stay off until they are learned.")
 
     # Save JSON
     with open(output_json_path, "w", encoding="utf-8") as f_out:
@@ -282,6 +923,7 @@ def process_score_frames(frames_dir: Path,
         parsed = r.get("parsed") or {}
         rows.append({
             "frame": r.get("frame"),
+            "time_sec": r.get("time_sec"),
             "ocr_text": (r.get("ocr_text") or "")[:500],
             "team1_name": parsed.get("team1_name"),
             "team1_runs": parsed.get("team1_score", {}).get("runs"),
@@ -0,0 +1,184 @@
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from config import OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES
+
+HASH_HEIGHT = 32        # strips are hashed at this height, aspect ratio kept
+DIGIT_HASH_HEIGHT = 64  # digit regions are hashed again at this height
+MEMORY_ENTRIES = 512    # hot entries kept in-process in front of SQLite
+EVICT_CHECK_EVERY = 50  # inserts between size checks
+
+
+def _binarised(strip: Image.Image, height: int) -> np.ndarray:
+    w, h = strip.size
+    size = (max(height, round(w * height / max(h, 1))), height)
+    gray = np.asarray(strip.convert("L").resize(size, Image.Resampling.BILINEAR), dtype=np.float32)
+    lo, hi = np.percentile(gray, [5, 95])
+    return gray > (lo + hi) / 2
+
+
+def strip_hash(strip: Image.Image, columns=None) -> str:
+    """
+    Hash of the preprocessed strip that survives re-encoding: the strip is shrunk
+    to HASH_HEIGHT rows and binarised halfway between its dark and bright levels,
+    so JPEG noise and small brightness shifts do not change the key.
+    columns: digit regions as [left, right] fractions of the strip (ocr.strip_columns);
+    they are hashed again at DIGIT_HASH_HEIGHT, where similar digits (3/8) differ.
+    """
+    bits = _binarised(strip, HASH_HEIGHT)
+    h = hashlib.sha1(f"{bits.shape[1]}x{bits.shape[0]}".encode() + np.packbits(bits).tobytes())
+    if columns:
+        digits = _binarised(strip, DIGIT_HASH_HEIGHT)
+        w = digits.shape[1]
+        for left, right in columns:
+            span = digits[:, int(np.floor(left * w)):int(np.ceil(right * w))]
+            h.update(f"|{span.shape[1]}".encode() + np.packbits(span).tobytes())
+    return h.hexdigest()
+
+
+def _pack_signature(signature):
+    if signature is None:
+        return None
+    buf = io.BytesIO()
+    np.save(buf, np.clip(np.rint(signature), 0, 255).astype(np.uint8))
+    return buf.getvalue()
+
+
+def _unpack_signature(blob):
+    if blob is None:
+        return None
+    return np.load(io.BytesIO(blob)).astype(np.float32)
+
+
+class OCRCache:
+    """
+    On-disk strip hash -> {ocr_text, parsed, signature} cache shared by jobs and processes
+    (SQLite, WAL). The hash is coarse, so each row also keeps the grayscale signature of
+    the strip it was read from; callers compare it before trusting a hit (see reject()).
+    Least recently used rows are evicted once the stored rows exceed max_bytes.
+    A small in-memory LRU answers repeated strips without touching the database.
+    """
+
+    def __init__(self, path: Path = OCR_CACHE_PATH, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._inserts = 0
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0, "rejected": 0}
+
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY, ocr_text TEXT, parsed TEXT, signature BLOB,"
+            " size INTEGER, created REAL, last_used REAL, hits INTEGER DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(ocr_cache)")]
+        if "signature" not in columns:
+            # Rows from before signatures were stored have none and are never trusted
+            self._db.execute("ALTER TABLE ocr_cache ADD COLUMN signature BLOB")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache(last_used)")
+        self._db.commit()
+
+    key = staticmethod(strip_hash)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """{"ocr_text", "parsed", "signature"} or None (signature is None for old rows)."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+
+            row = self._db.execute("SELECT ocr_text, parsed, signature FROM ocr_cache WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE ocr_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                             (time.time(), key))
+            self._db.commit()
+            value = {"ocr_text": row[0], "parsed": json.loads(row[1]), "signature": _unpack_signature(row[2])}
+            self._remember(key, value)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: str, ocr_text: str, parsed, signature=None):
+        """signature: grayscale signature of the strip that was read (ocr.strip_signature)."""
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        blob = _pack_signature(signature)
+        size = len(ocr_text.encode("utf-8")) + len(parsed_json.encode("utf-8")) + len(blob or b"")
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, ocr_text, parsed, signature, size, created, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, ocr_text, parsed_json, blob, size, now, now)
+            )
+            self._db.commit()
+            self._remember(key, {"ocr_text": ocr_text, "parsed": parsed,
+                                 "signature": _unpack_signature(blob)})
+            self._inserts += 1
+            if self._inserts % EVICT_CHECK_EVERY == 0:
+                self._evict()
+
+    def reject(self, key: str):
+        """Drop a hit that did not match its strip (hash collision) so later jobs cannot reuse it."""
+        with self._lock:
+            self._db.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+            self._db.commit()
+            self._memory.pop(key, None)
+            self.stats["rejected"] += 1
+
+    def _evict(self):
+        """Drop least recently used rows until the cache is back under 90% of max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = 0.9 * self.max_bytes
+        removed = []
+        for key, size in self._db.execute("SELECT key, size FROM ocr_cache ORDER BY last_used"):
+            if total <= target:
+                break
+            removed.append(key)
+            total -= size
+        self._db.executemany("DELETE FROM ocr_cache WHERE key = ?", [(k,) for k in removed])
+        self._db.commit()
+        for k in removed:
+            self._memory.pop(k, None)
+        self.stats["evicted"] += len(removed)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_cache() -> OCRCache:
+    """Process-wide cache instance (jobs in the same server share it)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = OCRCache()
+        return _shared_cache
@@ -0,0 +1,346 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from urllib.parse import parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    OCR_KEYS, VISION_URL, MAX_RETRIES, INITIAL_BACKOFF,
+    OCR_MAX_WORKERS, OCR_KEY_BURST, OCR_KEY_COOLDOWN
+)
+
+
+# ================= REQUEST / RESPONSE =================
+
+def build_ocr_payload(base64_image: str | None, api_key: str, overlay: bool = False) -> dict:
+    """
+    Form fields for one OCR.Space parse/image call. overlay=True asks for word boxes.
+    base64_image=None when the image goes as a multipart file (see OCRClient.ocr).
+    """
+    data = {
+        "apikey": api_key,
+        "language": "eng",
+        "isOverlayRequired": overlay,
+        "OCREngine": 2,
+        "scale": True,
+        "detectOrientation": True,
+    }
+    if base64_image is not None:
+        data["base64Image"] = f"data:image/jpeg;base64,{base64_image}"
+    else:
+        data["filetype"] = "PNG"
+    return data
+
+
+def parse_ocr_response(resp) -> dict:
+    """
+    Turn a 200 response into {"success", "text", "error", "lines"}.
+    lines is None unless an overlay was returned; otherwise one dict per text line:
+    {"text", "words": [{"text", "left", "top", "width", "height"}, ...]}.
+    """
+    try:
+        result = resp.json()
+    except Exception:
+        return {"success": False, "text": None, "error": "Invalid JSON response"}
+
+    if result.get("IsErroredOnProcessing"):
+        return {"success": False, "text": None, "error": str(result.get("ErrorMessage"))}
+
+    parsed = result.get("ParsedResults", [])
+    text = "\n".join([p.get("ParsedText", "") for p in parsed]).strip()
+
+    lines = None
+    overlays = [p.get("TextOverlay") for p in parsed if p.get("TextOverlay")]
+    if overlays:
+        lines = [
+            {"text": line.get("LineText", ""),
+             "words": [{"text": w.get("WordText", ""), "left": w.get("Left", 0), "top": w.get("Top", 0),
+                        "width": w.get("Width", 0), "height": w.get("Height", 0)}
+                       for w in line.get("Words", [])]}
+            for ov in overlays for line in ov.get("Lines", [])
+        ]
+    return {"success": True, "text": text, "error": None, "lines": lines}
+
+
+# ================= RATE LIMITING =================
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst` tokens."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = max(float(rate), 1e-6)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token. Returns 0.0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class KeyPool:
+    """
+    API keys with one token bucket each. acquire() hands out keys round-robin,
+    skipping keys that are out of tokens or cooling down after a 403, and blocks
+    until one is usable.
+    """
+
+    def __init__(self, keys, rate_per_key: float, burst: int = OCR_KEY_BURST,
+                 cooldown: float = OCR_KEY_COOLDOWN):
+        self.keys = list(dict.fromkeys(keys))   # drop duplicates, keep order
+        self.buckets = {k: TokenBucket(rate_per_key, burst) for k in self.keys}
+        self.cooldown = cooldown
+        self.cooling_until = {k: 0.0 for k in self.keys}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=()):
+        """A key with a token, or None if every key is in `exclude`."""
+        while True:
+            with self._lock:
+                candidates = [k for k in self.keys if k not in exclude]
+                if not candidates:
+                    return None
+                now = time.monotonic()
+                wait = float("inf")
+                for step in range(len(self.keys)):
+                    key = self.keys[(self._next + step) % len(self.keys)]
+                    if key in exclude:
+                        continue
+                    if self.cooling_until[key] > now:
+                        wait = min(wait, self.cooling_until[key] - now)
+                        continue
+                    key_wait = self.buckets[key].try_acquire()
+                    if key_wait == 0.0:
+                        self._next = (self._next + step + 1) % len(self.keys)
+                        return key
+                    wait = min(wait, key_wait)
+            time.sleep(min(wait, 1.0))
+
+    def cool_down(self, key):
+        with self._lock:
+            self.cooling_until[key] = time.monotonic() + self.cooldown
+
+
+# ================= CLIENT =================
+
+class OCRClient:
+    """
+    Threaded OCR.Space client.
+
+    Requests share one keep-alive Session and run on a small thread pool; each key
+    has its own token bucket (rate_per_key requests/s), so throughput follows the
+    keys' quota instead of a fixed sleep. A 403 cools that key down and the request
+    is retried on another key. ocr_many() returns results in input order.
+    """
+
+    def __init__(self, keys=None, url: str = VISION_URL, rate_per_key: float = 1 / 1.5,
+                 burst: int = OCR_KEY_BURST, cooldown: float = OCR_KEY_COOLDOWN,
+                 max_workers: int = OCR_MAX_WORKERS, timeout: float = 60):
+        self.url = url
+        self.timeout = timeout
+        self.pool = KeyPool(OCR_KEYS if keys is None else keys, rate_per_key, burst, cooldown)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+        self.stats = {"requests": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, field):
+        with self._stats_lock:
+            self.stats[field] += 1
+
+    def ocr(self, image, overlay: bool = False) -> dict:
+        """
+        One image -> {"success", "text", "error", "lines"}. Blocks until a key is available.
+        image: base64 JPEG string, or PNG bytes sent as a multipart file upload.
+        """
+        is_file = isinstance(image, bytes)
+        rate_limited = set()
+        backoff = INITIAL_BACKOFF
+        attempt = 0
+        while True:
+            key = self.pool.acquire(exclude=rate_limited)
+            if key is None:
+                return {"success": False, "text": None, "error": "Rate limit (403) on every OCR key"}
+
+            self._count("requests")
+            try:
+                if is_file:
+                    resp = self.session.post(self.url, data=build_ocr_payload(None, key, overlay),
+                                             files={"file": ("strip.png", image, "image/png")},
+                                             timeout=self.timeout)
+                else:
+                    resp = self.session.post(self.url, data=build_ocr_payload(image, key, overlay),
+                                             timeout=self.timeout)
+            except Exception as e:
+                attempt += 1
+                if attempt >= MAX_RETRIES:
+                    return {"success": False, "text": None, "error": str(e)}
+                time.sleep(backoff)
+                backoff *= 2
+                continue
+
+            if resp.status_code == 403:
+                self._count("rate_limited")
+                print(f"[OCR] Rate limit (403) for key {key[:4]}..., cooling down {self.pool.cooldown:.0f}s")
+                self.pool.cool_down(key)
+                rate_limited.add(key)
+                continue
+
+            if resp.status_code != 200:
+                attempt += 1
+                if attempt >= MAX_RETRIES:
+                    return {"success": False, "text": None, "error": f"HTTP {resp.status_code}: {resp.text}"}
+                time.sleep(backoff)
+                backoff *= 2
+                continue
+
+            return parse_ocr_response(resp)
+
+    def submit(self, image, overlay: bool = False):
+        return self._executor.submit(self.ocr, image, overlay)
+
+    def ocr_many(self, images) -> list:
+        """Run concurrently; results keep the order of the input."""
+        futures = [self.submit(b) for b in images]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+# ================= LOCAL STAND-IN SERVER =================
+
+def _decode_form(content_type: str, body: bytes) -> dict:
+    """Fields of a urlencoded or multipart/form-data body (file parts as bytes)."""
+    if content_type.startswith("multipart/form-data"):
+        msg = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        form = {}
+        for part in msg.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True)
+            form[name] = payload if part.get_filename() else payload.decode("utf-8")
+        return form
+    return {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+
+
+class StandInOCRServer:
+    """
+    Local HTTP server that answers like OCR.Space, for exercising OCRClient
+    without spending quota:
+
+        with StandInOCRServer(quota={"key-b": 3}) as server:
+            client = OCRClient(keys=["key-a", "key-b"], url=server.url)
+
+    text_fn(form) -> text to return (form is the decoded request fields; an uploaded
+    file is in form["file"] as bytes).
+    overlay_fn(form) -> OCR.Space "Lines" list, returned when the request asks for an overlay.
+    quota: {key: n} answers 403 for that key after n requests.
+    transient_errors: the first n requests (any key) get an HTTP 503, as a flaky endpoint would.
+    """
+
+    def __init__(self, text_fn=None, quota=None, latency: float = 0.0, overlay_fn=None,
+                 transient_errors: int = 0):
+        self.text_fn = text_fn or (lambda form: "IND 45-2 10.3/20 Toss AUS Kohli 23(18) Gill 12(9) AUS")
+        self.overlay_fn = overlay_fn
+        self.quota = dict(quota or {})
+        self.latency = latency
+        self.transient_errors = transient_errors
+        self.requests = 0
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/parse/image"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like the real endpoint
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                form = _decode_form(self.headers.get("Content-Type", ""), body)
+                key = form.get("apikey", "")
+                with server._lock:
+                    server.requests += 1
+                    flaky = server.requests <= server.transient_errors
+                    server.calls[key] = server.calls.get(key, 0) + 1
+                    over_quota = key in server.quota and server.calls[key] > server.quota[key]
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if flaky:
+                    status, payload = 503, {"ErrorMessage": "Service unavailable"}
+                elif over_quota:
+                    status, payload = 403, {"ErrorMessage": "Rate limit exceeded"}
+                else:
+                    result = {"ParsedText": server.text_fn(form)}
+                    if form.get("isOverlayRequired") == "True" and server.overlay_fn is not None:
+                        result["TextOverlay"] = {"Lines": server.overlay_fn(form), "HasOverlay": True}
+                    status, payload = 200, {"ParsedResults": [result], "IsErroredOnProcessing": False}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # Smoke test against the stand-in: two keys, the second runs out of quota.
+    images = [f"img{i}" for i in range(20)]
+    with StandInOCRServer(text_fn=lambda form: form["base64Image"].split(",", 1)[1],
+                          quota={"stand-in-key-2": 3}, latency=0.05) as server:
+        client = OCRClient(keys=["stand-in-key-1", "stand-in-key-2"], url=server.url,
+                           rate_per_key=20, burst=2, cooldown=30)
+        t0 = time.time()
+        results = client.ocr_many(images)
+        elapsed = time.time() - t0
+        client.close()
+
+    in_order = [r["text"] for r in results] == images
+    print(f"{len(results)} requests in {elapsed:.2f}s, ordered={in_order}, "
+          f"errors={sum(not r['success'] for r in results)}, stats={client.stats}, server calls={server.calls}")
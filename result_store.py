@@ -0,0 +1,322 @@
+import json
+import shutil
+import threading
+import numpy as np
+from pathlib import Path
+
+from config import RESULTS_DIR
+from score_tracker import overs_to_balls, balls_to_overs
+
+STORE_VERSION = 1
+HEADS = ("shot", "umpire", "runout")
+
+FRAME_DTYPE = np.dtype([
+    ("frame_index", "<i4"), ("time_sec", "<f8"), ("frame_path", "<i4"),
+    ("shot", "<i4"), ("shot_conf", "<f4"),
+    ("umpire", "<i4"), ("umpire_conf", "<f4"),
+    ("runout", "<i4"), ("runout_conf", "<f4"),
+    ("det_start", "<i8"), ("det_count", "<i4"),
+])
+DET_DTYPE = np.dtype([
+    ("x1", "<f4"), ("y1", "<f4"), ("x2", "<f4"), ("y2", "<f4"),
+    ("conf", "<f4"), ("class_id", "<i2"), ("class_name", "<i4"),
+])
+CLIP_DTYPE = np.dtype([
+    ("clip_index", "<i4"), ("start_time", "<f8"), ("end_time", "<f8"),
+    ("clip_name", "<i4"), ("clip_path", "<i4"), ("label", "<i4"), ("conf", "<f4"),
+])
+SCORE_DTYPE = np.dtype([
+    ("frame", "<i4"), ("ocr_text", "<i4"), ("confidence", "<f4"), ("corrected", "u1"),
+    ("team1", "<i4"), ("runs1", "<i4"), ("wickets1", "<i2"), ("balls1", "<i4"),
+    ("team2", "<i4"), ("runs2", "<i4"), ("wickets2", "<i2"), ("balls2", "<i4"),
+])
+TABLES = {"frames": FRAME_DTYPE, "detections": DET_DTYPE, "clips": CLIP_DTYPE, "scores": SCORE_DTYPE}
+
+
+def _int(v, missing=-1):
+    return missing if v is None else int(v)
+
+
+class ResultStore:
+    """
+    Append-only columnar store for one run's model outputs:
+
+        <root>/meta.json        version and record layouts
+        <root>/strings.jsonl    string table (labels, paths, OCR text), one JSON string per line
+        <root>/frames.bin       FRAME_DTYPE rows (one per sampled frame)
+        <root>/detections.bin   DET_DTYPE rows; a frame owns [det_start, det_start + det_count)
+        <root>/clips.bin        CLIP_DTYPE rows
+        <root>/scores.bin       SCORE_DTYPE rows (OCR fields; -1 = missing)
+
+    Rows are appended and flushed as results arrive, so a crashed run keeps every
+    row written so far; a torn last row is ignored on read. Tables are read back as
+    NumPy structured arrays through np.memmap, without parsing the whole run.
+    readonly=True opens an existing store for lookups (e.g. from another process).
+    """
+
+    def __init__(self, root: Path = RESULTS_DIR, reset: bool = False, readonly: bool = False):
+        self.root = Path(root)
+        self.meta_path = self.root / "meta.json"
+        self._lock = threading.Lock()
+
+        if readonly:
+            if not self.meta_path.exists():
+                raise FileNotFoundError(f"No result store at {self.root}")
+            self._strings = self._load_strings()
+            self._codes = {s: i for i, s in enumerate(self._strings)}
+            self._files, self._strings_file = {}, None
+            return
+
+        if self.meta_path.exists() and not reset:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != STORE_VERSION:
+                print(f"[RESULTS] Store version changed ({meta.get('version')} -> {STORE_VERSION}). Resetting {self.root}")
+                reset = True
+        if reset and self.root.exists():
+            shutil.rmtree(self.root, ignore_errors=True)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not self.meta_path.exists():
+            meta = {"version": STORE_VERSION, "tables": {k: dt.descr for k, dt in TABLES.items()}}
+            self.meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+        self._strings = self._load_strings()
+        self._codes = {s: i for i, s in enumerate(self._strings)}
+        self._repair()
+        self._files = {name: open(self.root / f"{name}.bin", "ab") for name in TABLES}
+        self._strings_file = open(self.root / "strings.jsonl", "a", encoding="utf-8")
+        self._n_dets = len(self.table("detections"))
+
+    # ---------- internals ----------
+
+    def _load_strings(self):
+        path = self.root / "strings.jsonl"
+        if not path.exists():
+            return []
+        out = []
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                break   # torn last line
+        return out
+
+    def _repair(self):
+        """Cut torn rows / string lines left by a crash, so appends stay aligned."""
+        for name, dtype in TABLES.items():
+            path = self.root / f"{name}.bin"
+            if path.exists() and path.stat().st_size % dtype.itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(path.stat().st_size // dtype.itemsize * dtype.itemsize)
+        path = self.root / "strings.jsonl"
+        if path.exists():
+            valid = "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in self._strings)
+            if path.read_text(encoding="utf-8") != valid:
+                path.write_text(valid, encoding="utf-8")
+
+    def _code(self, s) -> int:
+        if s is None:
+            return -1
+        s = str(s)
+        code = self._codes.get(s)
+        if code is None:
+            code = len(self._strings)
+            self._strings.append(s)
+            self._codes[s] = code
+            self._strings_file.write(json.dumps(s, ensure_ascii=False) + "\n")
+        return code
+
+    def _string(self, code):
+        return self._strings[code] if code >= 0 else None
+
+    def _append(self, name, rows):
+        self._strings_file.flush()   # strings first, so no row points past the string table
+        self._files[name].write(rows.tobytes())
+        self._files[name].flush()
+
+    # ---------- writes ----------
+
+    def append_frame(self, entry):
+        """One run_on_frames result."""
+        with self._lock:
+            dets = entry.get("yolo_detections") or []
+            det_rows = np.zeros(len(dets), dtype=DET_DTYPE)
+            for i, d in enumerate(dets):
+                x1, y1, x2, y2 = d["bbox"]
+                det_rows[i] = (x1, y1, x2, y2, d["conf"], d.get("class_id", -1), self._code(d.get("class_name")))
+
+            row = np.zeros(1, dtype=FRAME_DTYPE)
+            row["frame_index"] = entry["frame_index"]
+            row["time_sec"] = entry["time_sec"]
+            row["frame_path"] = self._code(entry["frame_path"])
+            for head in HEADS:
+                out = entry.get(head) or {}
+                row[head] = self._code(out.get("label"))
+                row[f"{head}_conf"] = out.get("confidence") or 0.0
+            row["det_start"] = self._n_dets
+            row["det_count"] = len(dets)
+
+            # Detections before the frame row: a frame row is only valid once its detections exist
+            if len(dets):
+                self._append("detections", det_rows)
+            self._append("frames", row)
+            self._n_dets += len(dets)
+
+    def append_clip(self, entry):
+        """One run_on_clips result."""
+        with self._lock:
+            vc = entry.get("video_class") or {}
+            row = np.zeros(1, dtype=CLIP_DTYPE)
+            row[0] = (_int(entry.get("clip_index")),
+                      np.nan if entry.get("start_time") is None else entry["start_time"],
+                      np.nan if entry.get("end_time") is None else entry["end_time"],
+                      self._code(entry.get("clip_name")), self._code(entry.get("clip_path")),
+                      self._code(vc.get("label")), vc.get("confidence") or 0.0)
+            self._append("clips", row)
+
+    def append_scores(self, entries):
+        """OCR entries from process_score_frames (only the fields the timeline uses)."""
+        with self._lock:
+            rows = np.zeros(len(entries), dtype=SCORE_DTYPE)
+            for i, e in enumerate(entries):
+                parsed = e.get("parsed") or {}
+                s1, s2 = parsed.get("team1_score") or {}, parsed.get("team2_score") or {}
+                conf = e.get("score_confidence")
+                rows[i] = (self._code(e.get("frame")), self._code(e.get("ocr_text")),
+                           np.nan if conf is None else conf, bool(e.get("score_corrected")),
+                           self._code(parsed.get("team1_name")), _int(s1.get("runs")), _int(s1.get("wickets")),
+                           _int(overs_to_balls(s1.get("overs")) if s1.get("overs") else None),
+                           self._code(parsed.get("team2_name")), _int(s2.get("runs")), _int(s2.get("wickets")),
+                           _int(overs_to_balls(s2.get("overs")) if s2.get("overs") else None))
+            if len(rows):
+                self._append("scores", rows)
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            if self._strings_file is not None:
+                self._strings_file.close()
+
+    # ---------- reads ----------
+
+    def table(self, name) -> np.ndarray:
+        """Memory-mapped structured array of the complete rows of a table."""
+        path = self.root / f"{name}.bin"
+        dtype = TABLES[name]
+        n = path.stat().st_size // dtype.itemsize if path.exists() else 0
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+
+    def _frames(self):
+        frames = self.table("frames")
+        n_dets = len(self.table("detections"))
+        return frames[frames["det_start"] + frames["det_count"] <= n_dets]
+
+    def _frame_dict(self, row, dets) -> dict:
+        entry = {
+            "frame_index": int(row["frame_index"]),
+            "frame_path": self._string(int(row["frame_path"])),
+            "time_sec": float(row["time_sec"]),
+            "yolo_detections": [
+                {"bbox": [float(d["x1"]), float(d["y1"]), float(d["x2"]), float(d["y2"])],
+                 "conf": float(d["conf"]), "class_id": int(d["class_id"]),
+                 "class_name": self._string(int(d["class_name"]))}
+                for d in dets[int(row["det_start"]):int(row["det_start"]) + int(row["det_count"])]
+            ],
+        }
+        for head in HEADS:
+            entry[head] = {"label": self._string(int(row[head])), "confidence": float(row[f"{head}_conf"])}
+        return entry
+
+    def frame_results(self) -> list:
+        """Frame results in the run_on_frames format, ordered by time."""
+        frames, dets = self._frames(), self.table("detections")
+        order = np.argsort(frames["time_sec"], kind="stable")
+        return [self._frame_dict(frames[i], dets) for i in order]
+
+    def _clip_dict(self, row) -> dict:
+        st, et = float(row["start_time"]), float(row["end_time"])
+        return {
+            "clip_name": self._string(int(row["clip_name"])),
+            "clip_path": self._string(int(row["clip_path"])),
+            "clip_index": None if row["clip_index"] < 0 else int(row["clip_index"]),
+            "start_time": None if np.isnan(st) else st,
+            "end_time": None if np.isnan(et) else et,
+            "video_class": {"label": self._string(int(row["label"])), "confidence": float(row["conf"])},
+        }
+
+    def clip_results(self) -> list:
+        return [self._clip_dict(row) for row in self.table("clips")]
+
+    def _score_dict(self, row) -> dict:
+        def team(runs, wickets, balls):
+            return {"runs": None if runs < 0 else int(runs),
+                    "wickets": None if wickets < 0 else int(wickets),
+                    "overs": None if balls < 0 else balls_to_overs(int(balls))}
+        conf = float(row["confidence"])
+        entry = {
+            "frame": self._string(int(row["frame"])),
+            "ocr_text": self._string(int(row["ocr_text"])),
+            "parsed": {
+                "team1_name": self._string(int(row["team1"])),
+                "team2_name": self._string(int(row["team2"])),
+                "team1_score": team(row["runs1"], row["wickets1"], row["balls1"]),
+                "team2_score": team(row["runs2"], row["wickets2"], row["balls2"]),
+            },
+            "score_confidence": None if np.isnan(conf) else round(conf, 3),
+        }
+        if row["corrected"]:
+            entry["score_corrected"] = True
+        return entry
+
+    def score_by_frame(self) -> dict:
+        out = {}
+        for row in self.table("scores"):
+            e = self._score_dict(row)
+            out[e["frame"]] = e
+        return out
+
+    def event_at(self, seconds: float):
+        """
+        Timeline event of the latest frame at or before `seconds` (None if there is none),
+        found by binary search on the time column instead of reading the whole run.
+        """
+        from timeline import make_event, frame_number
+
+        frames = self._frames()
+        if len(frames) == 0:
+            return None
+        times = np.asarray(frames["time_sec"])
+        order = None
+        if np.any(np.diff(times) < 0):
+            order = np.argsort(times, kind="stable")
+            times = times[order]
+        i = int(np.searchsorted(times, seconds, side="right")) - 1
+        if i < 0:
+            return None
+        row = frames[order[i] if order is not None else i]
+        fr = self._frame_dict(row, self.table("detections"))
+
+        clips = self.table("clips")
+        hit = np.nonzero((clips["start_time"] <= fr["time_sec"]) & (fr["time_sec"] < clips["end_time"]))[0]
+        clip_ctx = self._clip_dict(clips[hit[-1]]) if len(hit) else None
+
+        # The frame's own OCR read, else the latest read before it
+        score_entry = None
+        scores = self.table("scores")
+        hit = np.nonzero(scores["frame"] == self._codes.get(Path(fr["frame_path"]).name, -2))[0]
+        if not len(hit) and len(scores):
+            numbers = np.array([frame_number(self._string(int(c))) or -1 for c in scores["frame"]])
+            target = frame_number(fr["frame_path"])
+            if target is not None and (numbers <= target).any():
+                hit = np.nonzero(numbers == numbers[numbers <= target].max())[0]
+        if len(hit):
+            score_entry = self._score_dict(scores[hit[-1]])
+        return make_event(fr, clip_ctx, score_entry)
+
+    def export_json(self, path: Path):
+        """model_outputs.json-compatible export: {"frames": [...], "clips": [...]}."""
+        with open(path, "w") as f:
+            json.dump({"frames": self.frame_results(), "clips": self.clip_results()}, f)
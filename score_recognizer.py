@@ -0,0 +1,229 @@
+import re
+import numpy as np
+from pathlib import Path
+from PIL import Image
+
+from config import SCORE_GLYPHS_PATH
+
+
+# ================= GLYPH SEGMENTATION =================
+
+GLYPH_SIZE = 16            # glyphs are compared as 16x16 grayscale patches
+MAX_EXEMPLARS_PER_CHAR = 24
+MIN_WORD_GAP_RATIO = 0.25  # a space is never narrower than 25% of the line height
+MIN_LINE_HEIGHT = 6
+SCORE_CHARS = set("0123456789-/().")
+DIGITS = "0123456789"
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = total - w0
+    m0 = np.cumsum(hist * levels)
+    mean_all = m0[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_all * w0 / total - m0) ** 2 / (w0 * w1 / total)
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+
+def _binarize(gray: np.ndarray) -> np.ndarray:
+    """Text pixels = True. Text is assumed to be the minority polarity of the strip."""
+    fg = gray > _otsu_threshold(gray)
+    if fg.mean() > 0.5:
+        fg = ~fg
+    return fg
+
+
+def _runs(mask: np.ndarray):
+    """(start, end) pairs of consecutive True values in a 1-D mask, end exclusive."""
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    diff = np.diff(padded)
+    return list(zip(np.nonzero(diff == 1)[0], np.nonzero(diff == -1)[0]))
+
+
+def _segment(gray: np.ndarray):
+    """
+    Split a strip into lines -> words -> glyph patches.
+    Returns [[[patch, ...] per word] per line]; patches keep the full line height so
+    '.', '-' and digits are told apart by position and size, not just shape.
+    """
+    fg = _binarize(gray)
+    w = fg.shape[1]
+    lines = []
+    for y0, y1 in _runs(fg.sum(axis=1) > max(1, int(0.005 * w))):
+        if y1 - y0 < MIN_LINE_HEIGHT:
+            continue
+        band = fg[y0:y1]
+        h = y1 - y0
+        spans = [(x0, x1) for x0, x1 in _runs(band.any(axis=0)) if band[:, x0:x1].sum() >= 3]
+        if not spans:
+            continue
+
+        gaps = [spans[i + 1][0] - spans[i][1] for i in range(len(spans) - 1)]
+        word_gap = _word_gap_threshold(gaps, h)
+
+        words, current = [], []
+        prev_end = None
+        for x0, x1 in spans:
+            if prev_end is not None and (x0 - prev_end) > word_gap:
+                words.append(current)
+                current = []
+            current.append(_glyph_patch(band[:, x0:x1]))
+            prev_end = x1
+        words.append(current)
+        lines.append(words)
+    return lines
+
+
+def _word_gap_threshold(gaps, line_height):
+    """
+    Split the column gaps of one line into letter gaps and word gaps (2-means in 1-D).
+    Fonts differ in spacing, so the split is learned per line instead of being fixed.
+    """
+    floor = MIN_WORD_GAP_RATIO * line_height
+    if not gaps or max(gaps) <= floor:
+        return float("inf") if not gaps else max(floor, max(gaps))
+    lo, hi = float(min(gaps)), float(max(gaps))
+    for _ in range(10):
+        mid = (lo + hi) / 2
+        small = [g for g in gaps if g <= mid]
+        large = [g for g in gaps if g > mid]
+        if not small or not large:
+            break
+        lo, hi = sum(small) / len(small), sum(large) / len(large)
+    return max(floor, (lo + hi) / 2)
+
+
+def _glyph_patch(glyph: np.ndarray) -> np.ndarray:
+    """Center the glyph on a square canvas (side = line height) and resize to GLYPH_SIZE."""
+    h, w = glyph.shape
+    side = max(h, w)
+    canvas = np.zeros((side, side), dtype=np.uint8)
+    x_off = (side - w) // 2
+    canvas[(side - h) // 2:(side - h) // 2 + h, x_off:x_off + w] = glyph.astype(np.uint8) * 255
+    small = Image.fromarray(canvas).resize((GLYPH_SIZE, GLYPH_SIZE), Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.float32).ravel()
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    vecs = vecs - vecs.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-6)
+
+
+def _match_margin(sims: np.ndarray, labels: np.ndarray, best: int) -> float:
+    """
+    How far the best match stands out from the best exemplar of any other character,
+    as a fraction of the way from that runner-up to a perfect match (1.0 = unambiguous).
+    A raw similarity stays high when the true character has no exemplar and a similar
+    one answers instead (6 -> 5, 3 -> 5); the margin does not.
+    """
+    others = sims[labels != labels[best]]
+    runner_up = min(max(float(others.max()), 0.0), 1.0 - 1e-6) if others.size else 0.0
+    return max(0.0, (float(sims[best]) - runner_up) / (1.0 - runner_up))
+
+
+# ================= RECOGNIZER =================
+
+class ScoreGlyphRecognizer:
+    """
+    Offline recognizer for the fixed-layout score strip.
+    Broadcast fonts are learned as glyph templates (digits, uppercase, '-', '/', '(', ')', '.')
+    from strips whose text is already known, e.g. successful OCR.Space reads.
+    recognize() returns text in the same line/word layout parse_score_text expects
+    plus a confidence (smallest margin between the best and the runner-up character
+    among the digit/punctuation glyphs), so callers can fall back to the API on doubtful reads.
+    A digit without exemplars still matches some other digit closely, so reads are only
+    trustworthy once missing_digits is empty.
+    """
+
+    def __init__(self):
+        self.chars = []       # one entry per exemplar
+        self.templates = np.zeros((0, GLYPH_SIZE * GLYPH_SIZE), dtype=np.float32)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.chars) > 0
+
+    @property
+    def missing_digits(self) -> str:
+        """Digits with no exemplar yet; any of them would be misread as a known digit."""
+        known = set(self.chars)
+        return "".join(d for d in DIGITS if d not in known)
+
+    @classmethod
+    def load(cls, path: Path = SCORE_GLYPHS_PATH):
+        rec = cls()
+        path = Path(path)
+        if path.exists():
+            data = np.load(path)
+            rec.chars = [str(c) for c in data["chars"]]
+            rec.templates = data["templates"].astype(np.float32)
+            print(f"[LOCAL OCR] Loaded {len(rec.chars)} glyph templates "
+                  f"({len(set(rec.chars))} characters) from {path}")
+        return rec
+
+    def save(self, path: Path = SCORE_GLYPHS_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, chars=np.array(self.chars), templates=self.templates)
+
+    def learn(self, strip: Image.Image, text: str) -> bool:
+        """
+        Add exemplars from a strip with known text. Only used when the segmentation
+        lines up word-for-word and glyph-for-glyph with the text; returns True if it did.
+        """
+        words_text = (text or "").split()
+        words_glyphs = [w for line in _segment(np.asarray(strip.convert("L"))) for w in line]
+        if not words_text or len(words_text) != len(words_glyphs):
+            return False
+        if any(len(wt) != len(wg) for wt, wg in zip(words_text, words_glyphs)):
+            return False
+
+        new_chars, new_vecs = [], []
+        for wt, wg in zip(words_text, words_glyphs):
+            for ch, patch in zip(wt, wg):
+                ch = ch.upper()
+                if self.chars.count(ch) + new_chars.count(ch) >= MAX_EXEMPLARS_PER_CHAR:
+                    continue
+                new_chars.append(ch)
+                new_vecs.append(patch)
+        if new_vecs:
+            self.chars.extend(new_chars)
+            self.templates = np.vstack([self.templates, _normalize(np.stack(new_vecs))])
+        return True
+
+    def recognize(self, strip: Image.Image):
+        """Returns (text, confidence). confidence is 0.0 when nothing could be read."""
+        if not self.ready:
+            return "", 0.0
+        lines = _segment(np.asarray(strip.convert("L")))
+        if not lines:
+            return "", 0.0
+
+        labels = np.array(self.chars)
+        out_lines = []
+        score_glyphs = []   # match margins of glyphs that carry the score (digits and - / ( ) .)
+        for words in lines:
+            out_words = []
+            for word in words:
+                sims = _normalize(np.stack(word)) @ self.templates.T   # (glyphs, exemplars)
+                best = sims.argmax(axis=1)
+                chars = [self.chars[i] for i in best]
+                for ch, row, i in zip(chars, sims, best):
+                    if ch in SCORE_CHARS:
+                        score_glyphs.append(_match_margin(row, labels, i))
+                out_words.append("".join(chars))
+            out_lines.append(" ".join(out_words))
+
+        # A single misread digit (45-2 -> 46-2) is what hurts, so the weakest digit decides
+        confidence = min(score_glyphs) if score_glyphs else 0.0
+        # Narrow '1's can leave a word-sized gap inside ball counts: "14(1 1)" -> "14(11)"
+        text = re.sub(r"\((\d+)\s+(\d+)\)", r"(\1\2)", "\n".join(out_lines))
+        return text, confidence
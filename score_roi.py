@@ -0,0 +1,193 @@
+import json
+import time
+import numpy as np
+from pathlib import Path
+from PIL import Image
+
+from config import (
+    SCORE_ROI_PROFILES_JSON, SCORE_ROI_SAMPLE_FRAMES, SCORE_ROI_MATCH_MIN, BROADCAST_PROFILE
+)
+
+LOCALIZE_WIDTH = 480           # frames are analysed at this width
+STATIC_STD_MAX = 12.0          # temporal std (0-255) below which a pixel counts as overlay
+BAND_KEEP_RATIO = 0.35         # rows above this share of the peak row score belong to the band
+MIN_BAND_HEIGHT, MAX_BAND_HEIGHT = 0.02, 0.25   # band height as a share of the frame
+MIN_BAND_WIDTH = 0.20
+TEMPLATE_SIZE = (128, 16)      # (w, h) of the stored overlay appearance
+MATCH_FRAMES = 8
+
+
+# ================= LOCALISATION =================
+
+def _load_small(path: Path) -> np.ndarray:
+    img = Image.open(path).convert("L")
+    w, h = img.size
+    img = img.resize((LOCALIZE_WIDTH, max(1, round(h * LOCALIZE_WIDTH / w))), Image.Resampling.BILINEAR)
+    return np.asarray(img, dtype=np.float32)
+
+
+def _spread(frame_paths, n):
+    """n paths spread evenly over the video."""
+    if len(frame_paths) <= n:
+        return list(frame_paths)
+    idx = np.linspace(0, len(frame_paths) - 1, n).round().astype(int)
+    return [frame_paths[i] for i in idx]
+
+
+def _runs(mask):
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    diff = np.diff(padded)
+    return list(zip(np.nonzero(diff == 1)[0], np.nonzero(diff == -1)[0]))
+
+
+def localize_scoreboard(frame_paths, n_sample: int = SCORE_ROI_SAMPLE_FRAMES):
+    """
+    Find the score overlay from a sample of frames.
+
+    The overlay is static while the picture behind it changes, and it is full of
+    text edges. Per pixel: temporal std (low = static) and mean gradient magnitude
+    (high = text-like). The widest horizontal band of static, text-like pixels is
+    the scoreboard; a compact logo scores lower because row sums favour wide bands.
+    Inside the band, columns whose text DOES change over time are the digit regions.
+
+    Returns {"roi": {top, bottom, left, right}, "digit_regions": [[left, right], ...]}
+    as fractions of the frame, or None if no plausible band is found.
+    """
+    sample = _spread(frame_paths, n_sample)
+    if len(sample) < 3:
+        return None
+    stack = np.stack([_load_small(p) for p in sample])   # (n, h, w)
+    _, h, w = stack.shape
+
+    std = stack.std(axis=0)
+    gx = np.abs(np.diff(stack, axis=2))[:, :-1, :]
+    gy = np.abs(np.diff(stack, axis=1))[:, :, :-1]
+    edges = (gx + gy).mean(axis=0)                        # (h-1, w-1)
+    std = std[:-1, :-1]
+
+    static_text = edges * (std < STATIC_STD_MAX)
+    rows = np.convolve(static_text.sum(axis=1), np.ones(5) / 5, mode="same")
+    if rows.max() <= 0:
+        return None
+    peak = int(rows.argmax())
+    band = rows > BAND_KEEP_RATIO * rows[peak]
+    top = peak
+    while top > 0 and band[top - 1]:
+        top -= 1
+    bottom = peak
+    while bottom < len(rows) - 1 and band[bottom + 1]:
+        bottom += 1
+    pad = max(2, (bottom - top) // 4)
+    top, bottom = max(0, top - pad), min(h, bottom + 1 + pad)
+
+    cols = static_text[top:bottom].sum(axis=0)
+    active = np.nonzero(cols > 0.1 * cols.max())[0]
+    left, right = max(0, int(active[0]) - pad), min(w, int(active[-1]) + 1 + pad)
+
+    roi = {"top": float(top / h), "bottom": float(bottom / h), "left": float(left / w), "right": float(right / w)}
+    if not (MIN_BAND_HEIGHT <= roi["bottom"] - roi["top"] <= MAX_BAND_HEIGHT) \
+            or roi["right"] - roi["left"] < MIN_BAND_WIDTH:
+        return None
+
+    # Digit regions: changing columns, merged across gaps narrower than the band height
+    changing = (edges * (std >= STATIC_STD_MAX))[top:bottom, left:right].sum(axis=0)
+    spans = []
+    if changing.max() > 0:
+        for x0, x1 in _runs(changing > 0.3 * changing.max()):
+            if spans and x0 - spans[-1][1] <= bottom - top:
+                spans[-1][1] = x1
+            else:
+                spans.append([x0, x1])
+    digit_regions = [[float(left + x0) / w, float(left + x1) / w] for x0, x1 in spans if x1 - x0 >= 3]
+
+    return {"roi": {k: round(v, 4) for k, v in roi.items()},
+            "digit_regions": [[round(a, 4), round(b, 4)] for a, b in digit_regions]}
+
+
+def crop_roi(img: Image.Image, roi: dict) -> Image.Image:
+    w, h = img.size
+    return img.crop((int(w * roi["left"]), int(h * roi["top"]),
+                     int(w * roi["right"]), int(h * roi["bottom"])))
+
+
+# ================= BROADCASTER PROFILES =================
+
+def _mean_frame(frame_paths) -> Image.Image:
+    """Mean of MATCH_FRAMES frames spread over the video (float image), decoded once per video."""
+    frames = [np.asarray(Image.open(p).convert("L"), dtype=np.float32) for p in _spread(frame_paths, MATCH_FRAMES)]
+    return Image.fromarray(np.mean(frames, axis=0))
+
+
+def _roi_template(mean_frame: Image.Image, roi) -> np.ndarray:
+    """Normalised mean appearance of the ROI (what the overlay looks like)."""
+    img = crop_roi(mean_frame, roi).resize(TEMPLATE_SIZE, Image.Resampling.BILINEAR)
+    t = np.array(img, dtype=np.float32).ravel()
+    t -= t.mean()
+    return t / max(float(np.linalg.norm(t)), 1e-6)
+
+
+def load_profiles(path: Path = SCORE_ROI_PROFILES_JSON) -> dict:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_profiles(profiles: dict, path: Path = SCORE_ROI_PROFILES_JSON):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(profiles, indent=2), encoding="utf-8")
+
+
+def resolve_score_profile(frame_paths, name: str | None = BROADCAST_PROFILE,
+                          path: Path = SCORE_ROI_PROFILES_JSON):
+    """
+    Score overlay profile for this video: {"name", "roi", "digit_regions"} or None.
+
+    A named profile (BROADCAST_PROFILE) is used as stored. Otherwise every stored
+    profile is checked by matching its overlay template at its ROI in the video's
+    mean frame (decoded once for all profiles); the best match above
+    SCORE_ROI_MATCH_MIN is reused. Only when nothing matches is the video localised,
+    and the result is stored as a new profile for later videos.
+    """
+    frame_paths = list(frame_paths)
+    if not frame_paths:
+        return None
+    profiles = load_profiles(path)
+
+    if name and name in profiles:
+        p = profiles[name]
+        print(f"[ROI] Using broadcast profile '{name}': {p['roi']}")
+        return {"name": name, "roi": p["roi"], "digit_regions": p.get("digit_regions", [])}
+
+    mean_frame = None
+    if not name and profiles:
+        mean_frame = _mean_frame(frame_paths)
+        best, best_score = None, SCORE_ROI_MATCH_MIN
+        for pname, p in profiles.items():
+            score = float(_roi_template(mean_frame, p["roi"]) @ np.asarray(p["template"], dtype=np.float32))
+            if score >= best_score:
+                best, best_score = pname, score
+        if best is not None:
+            p = profiles[best]
+            print(f"[ROI] Matched broadcast profile '{best}' (score {best_score:.2f}): {p['roi']}")
+            return {"name": best, "roi": p["roi"], "digit_regions": p.get("digit_regions", [])}
+
+    t0 = time.time()
+    found = localize_scoreboard(frame_paths)
+    if found is None:
+        print("[ROI] No stable score overlay found; using the default crop.")
+        return None
+
+    if mean_frame is None:
+        mean_frame = _mean_frame(frame_paths)
+    name = name or f"profile_{len(profiles) + 1}"
+    profiles[name] = {
+        **found,
+        "template": [round(float(v), 5) for v in _roi_template(mean_frame, found["roi"])],
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    save_profiles(profiles, path)
+    print(f"[ROI] Localised score overlay in {time.time() - t0:.1f}s -> '{name}': {found['roi']} "
+          f"({len(found['digit_regions'])} digit regions)")
+    return {"name": name, **found}
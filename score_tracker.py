@@ -0,0 +1,276 @@
+import math
+
+from config import (
+    TRACK_MISREAD_COST, TRACK_CHANGE_COST, TRACK_JUMP_COST, TRACK_MAX_JUMP_COST, TRACK_ENTRY_COST,
+    TRACK_BEAM, TRACK_TEAM_SWITCH_READS
+)
+
+
+# ================= SCORE STATE =================
+
+def overs_to_balls(overs):
+    """"10.3" -> 63 legal balls; None if the string is not a legal over count (e.g. "10.7")."""
+    try:
+        whole, _, part = str(overs).partition(".")
+        whole, part = int(whole), int(part or 0)
+    except (TypeError, ValueError):
+        return None
+    if part > 5:
+        return None
+    return whole * 6 + part
+
+
+def balls_to_overs(balls: int) -> str:
+    return f"{balls // 6}.{balls % 6}"
+
+
+def observation(parsed):
+    """(runs, wickets, balls) from a parsed read; a field is None when it is missing or illegal."""
+    if not parsed or parsed.get("team1_name") is None:
+        return None
+    s = parsed.get("team1_score") or {}
+    runs, wickets = s.get("runs"), s.get("wickets")
+    if wickets is not None and not 0 <= wickets <= 10:
+        wickets = None
+    return (runs, wickets, overs_to_balls(s.get("overs")))
+
+
+def _logsumexp(values):
+    m = max(values)
+    if m == -math.inf:
+        return m
+    return m + math.log(sum(math.exp(v - m) for v in values))
+
+
+# ================= TRACKER =================
+
+class ScoreTracker:
+    """
+    Streaming tracker for one innings: a small lattice over (runs, wickets, balls) states.
+
+    States only enter the lattice when a read proposes them, and at most `beam`
+    states are kept per step. Transitions follow the cricket invariants: runs,
+    wickets and balls never go down, at most 10 wickets, and overs advance in legal
+    balls (x.0 - x.5). Staying costs nothing, a change costs TRACK_CHANGE_COST plus
+    TRACK_JUMP_COST per extra ball / wicket / implausible run jump, capped at
+    max_jump_cost so a real jump (reads resuming after an ad break) takes over after
+    a couple of reads. Any other move costs entry_cost: a state the invariants cannot
+    reach (a first frame misread as 48-2, then 45-2 on every read) still enters, so
+    one misread cannot pin the innings. A read that disagrees with a state costs
+    TRACK_MISREAD_COST per differing field, so one misread (45-2 -> 46-2 -> 45-2) is
+    cheaper to explain as noise than as two changes.
+
+    update() gives the filtered state as reads stream in; finalize() runs the
+    backward pass and returns the smoothed (Viterbi) state and its posterior per step.
+    """
+
+    def __init__(self, misread_cost=TRACK_MISREAD_COST, change_cost=TRACK_CHANGE_COST,
+                 jump_cost=TRACK_JUMP_COST, max_jump_cost=TRACK_MAX_JUMP_COST,
+                 entry_cost=TRACK_ENTRY_COST, beam=TRACK_BEAM):
+        self.misread_cost = misread_cost
+        self.change_cost = change_cost
+        self.jump_cost = jump_cost
+        self.max_jump_cost = max_jump_cost
+        self.entry_cost = entry_cost
+        self.beam = beam
+        self.steps = []   # per step: {"obs", "alpha": {s: logp}, "delta": {s: logp}, "back": {s: prev}}
+
+    def _transition(self, a, b) -> float:
+        if a == b:
+            return 0.0
+        dr, dw, db = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+        if dr < 0 or dw < 0 or db < 0 or b[1] > 10:
+            return -self.entry_cost
+        excess = max(db - 1, 0) + max(dw - 1, 0) + max(dr - 6 * max(db, 1), 0)
+        change = self.change_cost + min(self.jump_cost * excess, self.max_jump_cost)
+        return -min(change, self.entry_cost)
+
+    def _emission(self, obs, s) -> float:
+        if obs is None:
+            return 0.0
+        wrong = sum(1 for o, v in zip(obs, s) if o is not None and o != v)
+        return -self.misread_cost * wrong
+
+    def update(self, obs):
+        """Add one step (obs from observation(), or None). Returns (state, confidence) or None."""
+        prev = self.steps[-1] if self.steps else None
+        candidates = set(prev["alpha"]) if prev else set()
+        if obs is not None and None not in obs:
+            candidates.add(obs)
+
+        alpha, delta, back = {}, {}, {}
+        for s in candidates:
+            e = self._emission(obs, s)
+            if prev is None or not prev["alpha"]:
+                alpha[s] = delta[s] = e
+                back[s] = None
+                continue
+            trans = {p: self._transition(p, s) for p in prev["alpha"]}
+            alpha[s] = _logsumexp([prev["alpha"][p] + t for p, t in trans.items()]) + e
+            best = max(trans, key=lambda p: prev["delta"][p] + trans[p])
+            delta[s] = prev["delta"][best] + trans[best] + e
+            back[s] = best
+
+        alpha = {s: v for s, v in alpha.items() if v > -math.inf}
+        if len(alpha) > self.beam:
+            alpha = dict(sorted(alpha.items(), key=lambda kv: kv[1], reverse=True)[:self.beam])
+        delta = {s: delta[s] for s in alpha}
+        back = {s: back[s] for s in alpha}
+        self.steps.append({"obs": obs, "alpha": alpha, "delta": delta, "back": back})
+
+        if not alpha:
+            return None
+        z = _logsumexp(list(alpha.values()))
+        best = max(alpha, key=alpha.get)
+        return best, math.exp(alpha[best] - z)
+
+    def finalize(self):
+        """Smoothed [(state, confidence) or None] for every step so far."""
+        n = len(self.steps)
+        out = [None] * n
+        if n == 0:
+            return out
+
+        # Backward pass (sum-product) for posteriors
+        beta = [None] * n
+        beta[-1] = {s: 0.0 for s in self.steps[-1]["alpha"]}
+        for t in range(n - 2, -1, -1):
+            nxt = self.steps[t + 1]
+            beta[t] = {}
+            for s in self.steps[t]["alpha"]:
+                terms = [self._transition(s, s2) + self._emission(nxt["obs"], s2) + beta[t + 1][s2]
+                         for s2 in nxt["alpha"]]
+                beta[t][s] = _logsumexp(terms) if terms else -math.inf
+
+        # Viterbi backtrace
+        path = [None] * n
+        last = self.steps[-1]["delta"]
+        if last:
+            path[-1] = max(last, key=last.get)
+        for t in range(n - 1, 0, -1):
+            if path[t] is None:
+                d = self.steps[t - 1]["delta"]
+                path[t - 1] = max(d, key=d.get) if d else None
+            else:
+                path[t - 1] = self.steps[t]["back"].get(path[t])
+                if path[t - 1] is None and self.steps[t - 1]["delta"]:
+                    d = self.steps[t - 1]["delta"]
+                    path[t - 1] = max(d, key=d.get)
+
+        backfilled = self._backfill(path)
+
+        for t, s in enumerate(path):
+            if s is None or t in backfilled:
+                continue
+            post = {k: self.steps[t]["alpha"][k] + beta[t][k] for k in self.steps[t]["alpha"]}
+            z = _logsumexp(list(post.values()))
+            out[t] = (s, math.exp(post[s] - z) if z > -math.inf else 0.0)
+        for t in sorted(backfilled, reverse=True):
+            out[t] = (path[t], out[t + 1][1])
+        return out
+
+    def _backfill(self, path) -> set:
+        """
+        A state that entered late (at entry_cost) was not in the lattice of earlier steps,
+        so the path before it keeps the state it entered from. Where holding the new state
+        over that earlier run costs less (a misread first frame), the run is rewritten.
+        Returns the rewritten steps; they take the confidence of the step after them.
+        """
+        backfilled = set()
+        for t in range(len(path) - 1, 0, -1):
+            a, b = path[t - 1], path[t]
+            if a is None or b is None or a == b or self._transition(a, b) != -self.entry_cost:
+                continue
+            j = t - 1
+            while j > 0 and path[j - 1] == a:
+                j -= 1
+            before = path[j - 1] if j > 0 else None
+            keep = self._transition(a, b) + (self._transition(before, a) if before else 0.0)
+            swap = self._transition(before, b) if before else 0.0
+            for k in range(j, t):
+                keep += self._emission(self.steps[k]["obs"], a)
+                swap += self._emission(self.steps[k]["obs"], b)
+            if swap > keep:
+                for k in range(j, t):
+                    path[k] = b
+                    backfilled.add(k)
+        return backfilled
+
+
+# ================= OCR RESULTS =================
+
+def _innings_segments(teams):
+    """
+    Split the read sequence into innings by batting team. A new team only starts an
+    innings after TRACK_TEAM_SWITCH_READS consecutive reads agree on it, so a
+    misread team name does not. Returns [(start, end, team)] with end exclusive.
+    """
+    segments = []
+    current, start = None, 0
+    run_team, run_len, run_start = None, 0, 0
+    for i, team in enumerate(teams):
+        if team is None:
+            continue
+        if current is None:
+            current, start = team, 0
+            continue
+        if team == current:
+            run_team, run_len = None, 0
+            continue
+        if team != run_team:
+            run_team, run_len, run_start = team, 0, i
+        run_len += 1
+        if run_len >= TRACK_TEAM_SWITCH_READS:
+            segments.append((start, run_start, current))
+            current, start = team, run_start
+            run_team, run_len = None, 0
+    if current is not None:
+        segments.append((start, len(teams), current))
+    return segments
+
+
+def track_scores(results):
+    """
+    Reconcile per-frame OCR results (in frame order) into a consistent score sequence.
+
+    Only real reads count as evidence (entries marked "interpolated" or "reused_from"
+    repeat another read). Every frame of an innings gets "score_confidence", and
+    "parsed" carries the tracked runs / wickets / overs; frames whose read disagreed
+    keep it under "parsed_raw" and get "score_corrected": True. Frames that did not
+    parse inherit the tracked state. Returns the same list, updated in place.
+    """
+    def is_read(e):
+        return not e.get("interpolated") and "reused_from" not in e
+
+    teams = [((e.get("parsed") or {}).get("team1_name") if is_read(e) else None) for e in results]
+    corrected = 0
+    for start, end, team in _innings_segments(teams):
+        tracker = ScoreTracker()
+        for i in range(start, end):
+            e = results[i]
+            obs = observation(e.get("parsed")) if is_read(e) and teams[i] == team else None
+            tracker.update(obs)
+
+        template = next((results[i]["parsed"] for i in range(start, end)
+                         if teams[i] == team and results[i].get("parsed")), None)
+        for k, tracked in enumerate(tracker.finalize()):
+            e = results[start + k]
+            parsed = e.get("parsed")
+            if parsed and parsed.get("team1_name") == team:
+                template = parsed
+            if tracked is None or template is None:
+                continue
+            (runs, wickets, balls), conf = tracked
+            new = {**template, "team1_score": {**(template.get("team1_score") or {}),
+                                               "runs": runs, "wickets": wickets,
+                                               "overs": balls_to_overs(balls)}}
+            raw = observation(parsed) if parsed and parsed.get("team1_name") == team else None
+            if raw is not None and raw != (runs, wickets, balls):
+                e["parsed_raw"] = parsed
+                e["score_corrected"] = True
+                corrected += 1 if is_read(e) else 0
+            e["parsed"] = new
+            e["score_confidence"] = round(conf, 3)
+
+    print(f"[SCORE] Tracked {len(results)} frames; corrected {corrected} inconsistent reads.")
+    return results
@@ -0,0 +1,31 @@
+from io import BytesIO
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+SCORE_TEXT = "IND 45-2 P 10.1/20 Toss AUS Kohli 23(15) Gill 12(9) AUS"
+
+
+def render_strip(text: str = SCORE_TEXT, noise: float = 0.0, seed: int = 0) -> np.ndarray:
+    """A grayscale ticker crop (light text on a dark band), optionally noisy and JPEG-compressed."""
+    img = np.full((140, 1200), 40, np.uint8)
+    cv2.putText(img, text, (20, 95), cv2.FONT_HERSHEY_SIMPLEX, 1.6, 235, 3, cv2.LINE_AA)
+    if noise:
+        rng = np.random.default_rng(seed)
+        img = np.clip(img + rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+        buf = BytesIO()
+        Image.fromarray(img).save(buf, format="JPEG", quality=85)
+        img = np.asarray(Image.open(buf))
+    return img
+
+
+@pytest.fixture
+def make_strip():
+    """OCR-ready strip (preprocessed like load_score_strips) for a ticker text."""
+    from ocr import preprocess_strip_stack
+
+    def make(text: str = SCORE_TEXT, noise: float = 0.0, seed: int = 0) -> Image.Image:
+        return Image.fromarray(preprocess_strip_stack(render_strip(text, noise, seed)[None])[0])
+    return make
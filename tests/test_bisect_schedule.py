@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from ocr import bisect_score_reads, score_key
+
+
+def _frames(n):
+    return [Path(f"frame_{i:06d}.jpg") for i in range(n)]
+
+
+def _entry(frame, score):
+    if score is None:
+        return {"frame": frame.name, "ocr_text": "", "parsed": {"team1_name": None}, "error": None}
+    runs, wickets, overs = score
+    return {"frame": frame.name, "ocr_text": f"IND {runs}-{wickets} {overs}", "error": None,
+            "parsed": {"team1_name": "IND", "team1_score": {"runs": runs, "wickets": wickets, "overs": overs}}}
+
+
+class FakeReader:
+    """read_many over a scripted score per frame; records which frames were read."""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.read = []
+
+    def read_many(self, paths):
+        self.read.extend(int(p.stem.split("_")[1]) for p in paths)
+        return [_entry(p, self.scores[int(p.stem.split("_")[1])]) for p in paths]
+
+    def strip_changes(self, paths):
+        idx = [int(p.stem.split("_")[1]) for p in paths]
+        return [True] + [self.scores[a] != self.scores[b] for a, b in zip(idx, idx[1:])]
+
+
+def _keys(results):
+    return [score_key(r) for r in results]
+
+
+def test_change_is_localised_with_few_reads():
+    scores = [(45, 2, "10.1")] * 37 + [(46, 2, "10.2")] * 63
+    reader = FakeReader(scores)
+    results = bisect_score_reads(_frames(100), reader.read_many, coarse_step=10)
+    assert _keys(results) == [("IND",) + s for s in scores]
+    assert len(reader.read) < 25
+    assert results[38]["interpolated"] and results[38]["interpolated_from"] == "frame_000037.jpg"
+
+
+def test_change_that_reverts_inside_one_interval_needs_strip_changes():
+    # 20..24 show a different score; reads at 0, 10, 20, 30 would all agree without 20..24
+    scores = [(45, 2, "10.1")] * 100
+    scores[22:25] = [(99, 9, "19.5")] * 3
+    frames = _frames(100)
+
+    reader = FakeReader(scores)
+    blind = bisect_score_reads(frames, reader.read_many, coarse_step=10)
+    assert ("IND", 99, 9, "19.5") not in _keys(blind)
+
+    reader = FakeReader(scores)
+    results = bisect_score_reads(frames, reader.read_many, coarse_step=10, strip_changes=reader.strip_changes)
+    assert _keys(results) == [("IND",) + s for s in scores]
+    assert len(reader.read) < 30
+
+
+def test_unparsed_reads_are_not_treated_as_unchanged():
+    scores = [None] * 5 + [(45, 2, "10.1")] * 3 + [None] * 4 + [(46, 2, "10.2")] * 8
+    reader = FakeReader(scores)
+    results = bisect_score_reads(_frames(20), reader.read_many, coarse_step=10)
+    assert _keys(results) == [None if s is None else ("IND",) + s for s in scores]
+
+
+def test_non_uniform_times_space_coarse_reads_in_seconds():
+    frames = _frames(6)
+    times = [0, 1, 2, 40, 41, 80]
+    reader = FakeReader([(45, 2, "10.1")] * 6)
+    bisect_score_reads(frames, reader.read_many, 30, times=times)
+    assert sorted(reader.read) == [0, 3, 5]
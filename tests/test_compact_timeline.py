@@ -0,0 +1,52 @@
+from llm import build_commentary_prompt_from_timeline
+from timeline import LAST_EVENT_SEC, compact_timeline
+
+
+def event(t, runs=45, wickets=2, overs="10.1", visuals=("batsman",), label="batting", footage="live"):
+    parsed = None if runs is None else {
+        "team1_name": "IND", "team1_score": {"runs": runs, "wickets": wickets, "overs": overs}}
+    return {
+        "time_sec": t, "frame_path": f"frame_{t:06d}.jpg", "footage": footage,
+        "models": {"yolo_detections": [{"class_name": v, "conf": 0.95} for v in visuals]},
+        "score_parsed": parsed, "score_confidence": 0.9,
+        "clip_context": {"video_class": {"label": label, "confidence": 0.7}},
+    }
+
+
+def test_identical_events_merge_into_one_span():
+    spans = compact_timeline([event(t) for t in range(10)])
+    assert len(spans) == 1
+    assert spans[0]["frames"] == 10
+    assert spans[0]["duration"] == 9 + LAST_EVENT_SEC
+
+
+def test_score_change_starts_a_span_with_its_delta():
+    spans = compact_timeline([event(0), event(1), event(2, runs=49, overs="10.2"), event(3, runs=49, wickets=3, overs="10.3")])
+    assert [sp["score_delta"] for sp in spans] == [
+        None, {"runs": 4, "wickets": 0, "balls": 1}, {"runs": 0, "wickets": 1, "balls": 1}]
+    assert spans[0]["end_sec"] == spans[1]["start_sec"] == 2
+
+
+def test_events_without_a_read_continue_the_span():
+    spans = compact_timeline([event(0), event(1, runs=None), event(2)])
+    assert len(spans) == 1
+
+
+def test_short_visual_flicker_is_folded_but_a_lasting_change_splits():
+    events = ([event(t) for t in range(5)] + [event(5, visuals=("ball",))] + [event(t) for t in range(6, 12)]
+              + [event(t, visuals=("ball",)) for t in range(12, 20)])
+    spans = compact_timeline(events, min_span_sec=12.0)
+    assert len(spans) == 2
+    assert spans[0]["visuals"] == ["ball", "batsman"]
+    assert spans[1]["start_sec"] == 12
+
+
+def test_footage_and_label_changes_split():
+    events = [event(0), event(1, footage="replay"), event(2), event(3, label="bowling")]
+    assert [sp["start_sec"] for sp in compact_timeline(events)] == [0, 1, 2, 3]
+
+
+def test_prompt_grows_with_events_not_video_length():
+    short = build_commentary_prompt_from_timeline([event(t) for t in range(10)] + [event(10, runs=49)])
+    long = build_commentary_prompt_from_timeline([event(t) for t in range(1000)] + [event(1000, runs=49)])
+    assert abs(len(long) - len(short)) < 100
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from inference_server import InferenceServer
+
+
+@pytest.fixture
+def server():
+    srv = InferenceServer(max_batch_size=4, max_queue_delay=0.05)
+    yield srv
+    srv.shutdown()
+
+
+def test_results_follow_request_order(server):
+    server.register("double", lambda items: [2 * x for x in items])
+    futures = [server.submit("double", i) for i in range(10)]
+    assert [f.result(timeout=5) for f in futures] == [2 * i for i in range(10)]
+
+
+def test_concurrent_requests_share_batches(server):
+    sizes = []
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(timeout=5)      # hold the first batch so the queue fills up
+        sizes.append(len(items))
+        return items
+
+    server.register("echo", batch_fn)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = list(pool.map(lambda i: server.submit("echo", i), range(12)))
+    release.set()
+    assert sorted(f.result(timeout=5) for f in futures) == list(range(12))
+    assert max(sizes) <= 4
+    assert len(sizes) < 12
+    st = server.stats["echo"]
+    assert st["requests"] == 12 and st["batches"] == len(sizes) and st["max_batch"] == max(sizes)
+
+
+def test_batch_error_reaches_every_caller(server):
+    def boom(items):
+        raise RuntimeError("model failed")
+
+    server.register("boom", boom)
+    futures = [server.submit("boom", i) for i in range(3)]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            f.result(timeout=5)
+
+
+def test_cancelled_requests_are_not_run(server):
+    seen = []
+    gate = threading.Event()
+
+    def batch_fn(items):
+        gate.wait(timeout=5)
+        seen.extend(items)
+        return items
+
+    server.register("slow", batch_fn)
+    first = server.submit("slow", "first")
+    while not first.running():
+        pass
+    cancelled = server.submit("slow", "cancelled")
+    assert cancelled.cancel()
+    kept = server.submit("slow", "kept")
+    gate.set()
+    assert first.result(timeout=5) == "first"
+    assert kept.result(timeout=5) == "kept"
+    assert "cancelled" not in seen
+
+
+def test_unknown_and_duplicate_heads(server):
+    server.register("a", lambda items: items)
+    with pytest.raises(ValueError):
+        server.register("a", lambda items: items)
+    with pytest.raises(KeyError):
+        server.submit("missing", 1)
@@ -0,0 +1,49 @@
+import llm
+from llm import WINDOW_BRIDGE, call_llm_windowed, generate_commentary
+
+
+def timeline(seconds, step=5):
+    return [{"time_sec": float(t), "frame_path": f"frame_{t:06d}.jpg", "footage": "live",
+             "models": {"yolo_detections": []}, "score_parsed": None, "score_confidence": None,
+             "clip_context": None} for t in range(0, seconds, step)]
+
+
+def fake_llm(monkeypatch, fail_part=None):
+    """call_llm answering "Commentary for part N." and always failing for part fail_part."""
+    calls = []
+
+    def call(prompt, max_tokens=4000):
+        part = int(prompt.split("THIS IS PART ")[1].split()[0])
+        calls.append(part)
+        if part == fail_part or fail_part == "all":
+            return "[LLM ERROR] timeout"
+        return f"Commentary for part {part}."
+    monkeypatch.setattr(llm, "call_llm", call)
+    return calls
+
+
+def test_failed_window_is_bridged_and_reported(monkeypatch):
+    calls = fake_llm(monkeypatch, fail_part=2)
+    report, spoken = {}, []
+    text = call_llm_windowed(timeline(360), window_sec=120, retries=2, report=report, on_sentence=spoken.append)
+    assert text.split("\n\n") == ["Commentary for part 1.", WINDOW_BRIDGE, "Commentary for part 3."]
+    assert spoken == ["Commentary for part 1.", WINDOW_BRIDGE, "Commentary for part 3."]
+    assert report == {"windows": 3, "failed_windows": [2]}
+    assert calls.count(2) == 3
+
+
+def test_every_window_failing_is_an_error(monkeypatch):
+    fake_llm(monkeypatch, fail_part="all")
+    report = {}
+    assert call_llm_windowed(timeline(360), window_sec=120, retries=0, report=report).startswith("[LLM ERROR]")
+    assert report["failed_windows"] == [1, 2, 3]
+
+
+def test_windowed_run_builds_no_full_timeline_prompt(monkeypatch):
+    fake_llm(monkeypatch)
+    built = []
+    build = llm.build_commentary_prompt_from_timeline
+    monkeypatch.setattr(llm, "build_commentary_prompt_from_timeline",
+                        lambda events, **kw: built.append((len(events), kw.get("context"))) or build(events, **kw))
+    generate_commentary(timeline(600))
+    assert built and all(context is not None for _, context in built)
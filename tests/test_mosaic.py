@@ -0,0 +1,97 @@
+from concurrent.futures import Future
+
+from PIL import Image
+
+from ocr import ScoreStripReader, build_strip_mosaic, split_mosaic_text
+from tests.conftest import SCORE_TEXT
+
+
+def _word(text, left, top, height=20):
+    return {"text": text, "left": left, "top": top, "width": 10 * len(text), "height": height}
+
+
+def test_mosaic_bands_stack_strips_with_gaps():
+    strips = [Image.new("L", (100, 30), 0), Image.new("L", (80, 40), 0), Image.new("L", (100, 30), 0)]
+    mosaic, bands = build_strip_mosaic(strips, gap=10)
+    assert mosaic.size == (100, 30 + 40 + 30 + 2 * 10)
+    assert bands == [(0, 30), (40, 80), (90, 120)]
+
+
+def test_split_mosaic_text_assigns_words_by_vertical_centre():
+    bands = [(0, 30), (40, 80), (90, 120)]
+    lines = [
+        # one overlay line that spans two bands (OCR merged rows at similar heights)
+        {"words": [_word("45-2", 60, 5), _word("IND", 0, 5), _word("AUS", 0, 50)]},
+        {"words": [_word("Toss", 40, 52)]},
+        # centres inside the gap: half the gap counts to each neighbour
+        {"words": [_word("NZ", 0, 78, height=10), _word("SL", 40, 82, height=10)]},
+    ]
+    texts = split_mosaic_text(lines, bands, gap=10)
+    assert texts == ["IND 45-2", "AUS\nToss\nNZ", "SL"]
+
+
+def test_split_mosaic_text_without_overlay():
+    assert split_mosaic_text(None, [(0, 30), (40, 70)]) == ["", ""]
+
+
+class FakeClient:
+    """OCRClient stand-in: mosaics get a scripted overlay, single strips a scripted text."""
+
+    def __init__(self, overlay_lines, single_text="", mosaic_ok=True):
+        self.overlay_lines = overlay_lines
+        self.single_text = single_text
+        self.mosaic_ok = mosaic_ok
+        self.sent = []
+
+    def submit(self, image, overlay=False):
+        self.sent.append("mosaic" if overlay else "single")
+        fut = Future()
+        if overlay and not self.mosaic_ok:
+            fut.set_result({"success": False, "text": None, "error": "HTTP 500"})
+        elif overlay:
+            fut.set_result({"success": True, "text": "", "error": None, "lines": self.overlay_lines})
+        else:
+            fut.set_result({"success": True, "text": self.single_text, "error": None, "lines": None})
+        return fut
+
+
+def _strips(n):
+    return {i: (Image.new("L", (1200, 60), 0), True) for i in range(n)}
+
+
+def _overlay_for(texts, height=60, gap=24):
+    """One overlay line per band, words centred in their band."""
+    lines = []
+    for k, text in enumerate(texts):
+        top = k * (height + gap) + 20
+        lines.append({"words": [_word(w, 100 * j, top) for j, w in enumerate(text.split())]})
+    return lines
+
+
+def test_only_slices_with_unparsed_text_are_resent():
+    # slice 0 parses, slice 1 is empty (ad / intro), slice 2 has text that does not parse
+    client = FakeClient(_overlay_for([SCORE_TEXT, "", "SPONSORED BY"]), single_text=SCORE_TEXT)
+    reader = ScoreStripReader(client, change_detection=False, mosaic_size=6)
+    responses = reader._send([0, 1, 2], _strips(3))
+
+    assert client.sent == ["mosaic", "single"]
+    assert responses[0]["text"] == SCORE_TEXT
+    assert responses[1] == {"success": True, "text": "", "error": None}
+    assert responses[2]["text"] == SCORE_TEXT
+    assert reader.mosaic_stats == {"requests": 1, "strips": 3, "fallbacks": 1}
+
+
+def test_mosaic_of_empty_frames_costs_one_request():
+    client = FakeClient(_overlay_for([""] * 6))
+    reader = ScoreStripReader(client, change_detection=False, mosaic_size=6)
+    responses = reader._send(list(range(6)), _strips(6))
+    assert client.sent == ["mosaic"]
+    assert all(r["success"] and r["text"] == "" for r in responses.values())
+
+
+def test_failed_mosaic_is_reported_not_resent():
+    client = FakeClient([], mosaic_ok=False)
+    reader = ScoreStripReader(client, change_detection=False, mosaic_size=6)
+    responses = reader._send([0, 1, 2], _strips(3))
+    assert client.sent == ["mosaic"]
+    assert all(r["error"] == "HTTP 500" for r in responses.values())
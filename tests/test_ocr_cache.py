@@ -0,0 +1,49 @@
+from ocr import cached_score_read, cache_score_read, parse_score_text
+from ocr_cache import OCRCache, strip_hash
+from tests.conftest import SCORE_TEXT
+
+TEXT_43 = SCORE_TEXT.replace("45-2", "43-2")
+TEXT_48 = SCORE_TEXT.replace("45-2", "48-2")
+
+
+def api_entry(text):
+    return {"ocr_text": text, "parsed": parse_score_text(text), "error": None, "source": "api"}
+
+
+def test_read_survives_reopening(tmp_path, make_strip):
+    strip = make_strip()
+    cache = OCRCache(tmp_path / "cache.sqlite")
+    cache_score_read(cache, "k", api_entry(SCORE_TEXT), strip)
+    cache.close()
+
+    reopened = OCRCache(tmp_path / "cache.sqlite")
+    hit = cached_score_read(reopened, "k", make_strip(noise=4, seed=1))
+    assert hit["source"] == "cache"
+    assert hit["parsed"] == parse_score_text(SCORE_TEXT)
+
+
+def test_colliding_key_is_rejected_and_dropped(tmp_path, make_strip):
+    # Force the collision the coarse hash can produce: 43-2 and 48-2 under one key
+    cache = OCRCache(tmp_path / "cache.sqlite")
+    cache_score_read(cache, "k", api_entry(TEXT_43), make_strip(TEXT_43))
+
+    assert cached_score_read(cache, "k", make_strip(TEXT_48)) is None
+    assert cache.stats["rejected"] == 1
+    assert cache.get("k") is None
+
+
+def test_rows_without_signature_are_not_trusted(tmp_path, make_strip):
+    cache = OCRCache(tmp_path / "cache.sqlite")
+    cache.put("k", SCORE_TEXT, parse_score_text(SCORE_TEXT))
+    assert cached_score_read(cache, "k", make_strip()) is None
+
+
+def test_unparsed_reads_are_not_cached(tmp_path, make_strip):
+    cache = OCRCache(tmp_path / "cache.sqlite")
+    cache_score_read(cache, "k", api_entry("no score here"), make_strip())
+    assert cache.get("k") is None
+
+
+def test_hash_separates_one_digit(make_strip):
+    assert strip_hash(make_strip(TEXT_43)) != strip_hash(make_strip(TEXT_48))
+    assert strip_hash(make_strip()) == strip_hash(make_strip())
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+import ocr_client
+from ocr_client import OCRClient, StandInOCRServer, TokenBucket
+
+
+def echo(form):
+    """The stand-in answers with the image it was sent, so results can be matched to requests."""
+    if "file" in form:
+        return form["file"].decode("utf-8")
+    return form["base64Image"].split(",", 1)[1]
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(ocr_client, "INITIAL_BACKOFF", 0.01)
+
+
+def test_ocr_many_keeps_input_order_and_runs_concurrently():
+    images = [f"img{i}" for i in range(12)]
+    with StandInOCRServer(text_fn=echo, latency=0.1) as server:
+        client = OCRClient(keys=["key-a", "key-b"], url=server.url, rate_per_key=100, burst=10, max_workers=4)
+        t0 = time.monotonic()
+        results = client.ocr_many(images)
+        elapsed = time.monotonic() - t0
+        client.close()
+    assert [r["text"] for r in results] == images
+    assert all(r["success"] for r in results)
+    assert elapsed < 0.1 * len(images) / 2      # 4 workers: well under the sequential 1.2 s
+    assert client.stats == {"requests": 12, "rate_limited": 0}
+
+
+def test_key_rotates_away_after_403():
+    images = [f"img{i}" for i in range(10)]
+    with StandInOCRServer(text_fn=echo, quota={"key-b": 2}) as server:
+        client = OCRClient(keys=["key-a", "key-b"], url=server.url, rate_per_key=100, burst=10,
+                           cooldown=60, max_workers=1)
+        results = client.ocr_many(images)
+        client.close()
+    assert [r["text"] for r in results] == images
+    assert server.calls["key-b"] == 3                   # 2 in quota, then one 403 and never again
+    assert server.calls["key-a"] == len(images) - 2
+    assert client.stats["rate_limited"] == 1
+
+
+def test_every_key_rate_limited_is_an_error():
+    with StandInOCRServer(text_fn=echo, quota={"key-a": 0, "key-b": 0}) as server:
+        client = OCRClient(keys=["key-a", "key-b"], url=server.url, rate_per_key=100, burst=10)
+        result = client.ocr("img")
+        client.close()
+    assert not result["success"]
+    assert "every OCR key" in result["error"]
+    assert server.calls == {"key-a": 1, "key-b": 1}
+
+
+def test_requests_per_key_follow_the_rate_limit():
+    with StandInOCRServer(text_fn=echo) as server:
+        client = OCRClient(keys=["key-a"], url=server.url, rate_per_key=20, burst=1, max_workers=4)
+        t0 = time.monotonic()
+        client.ocr_many([f"img{i}" for i in range(6)])
+        elapsed = time.monotonic() - t0
+        client.close()
+    assert elapsed >= 5 / 20 * 0.9                      # first token is free, then 20/s
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    wait = bucket.try_acquire()
+    assert 0.05 < wait <= 0.1
+
+
+def test_transient_errors_are_retried_with_backoff():
+    with StandInOCRServer(text_fn=echo, transient_errors=2) as server:
+        client = OCRClient(keys=["key-a"], url=server.url, rate_per_key=100, burst=10)
+        result = client.ocr("img")
+        client.close()
+    assert result["success"] and result["text"] == "img"
+    assert server.requests == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(ocr_client, "MAX_RETRIES", 3)
+    with StandInOCRServer(text_fn=echo, transient_errors=10) as server:
+        client = OCRClient(keys=["key-a"], url=server.url, rate_per_key=100, burst=10)
+        result = client.ocr("img")
+        client.close()
+    assert not result["success"]
+    assert result["error"].startswith("HTTP 503")
+    assert server.requests == 3
+
+
+def test_png_bytes_go_as_multipart_upload():
+    with StandInOCRServer(text_fn=echo) as server:
+        client = OCRClient(keys=["key-a"], url=server.url, rate_per_key=100, burst=10)
+        result = client.ocr(b"png-bytes")
+        client.close()
+    assert result["text"] == "png-bytes"
+
+
+def test_overlay_lines_are_parsed():
+    lines = [{"LineText": "IND 45-2", "Words": [
+        {"WordText": "IND", "Left": 1, "Top": 2, "Width": 30, "Height": 10},
+        {"WordText": "45-2", "Left": 40, "Top": 2, "Width": 35, "Height": 10}]}]
+    with StandInOCRServer(text_fn=echo, overlay_fn=lambda form: lines) as server:
+        client = OCRClient(keys=["key-a"], url=server.url, rate_per_key=100, burst=10)
+        result = client.ocr("img", overlay=True)
+        client.close()
+    assert result["lines"] == [{"text": "IND 45-2", "words": [
+        {"text": "IND", "left": 1, "top": 2, "width": 30, "height": 10},
+        {"text": "45-2", "left": 40, "top": 2, "width": 35, "height": 10}]}]
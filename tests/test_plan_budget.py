@@ -0,0 +1,43 @@
+import pytest
+
+from config import BUDGET_SAFETY, TTS_MAX_CHARS
+from llm import plan_budget, split_timeline, window_budgets
+
+
+def timeline(seconds, step=5, change=30):
+    """An event every `step` s, one run scored every `change` s (a new span each time)."""
+    return [{"time_sec": float(t), "frame_path": f"frame_{t:06d}.jpg", "footage": "live",
+             "models": {"yolo_detections": []}, "score_confidence": 0.9, "clip_context": None,
+             "score_parsed": {"team1_name": "IND",
+                              "team1_score": {"runs": t // change, "wickets": 2, "overs": f"{t // 36}.{t // 6 % 6}"}}}
+            for t in range(0, seconds, step)]
+
+
+def test_short_timeline_keeps_natural_pace():
+    plan = plan_budget(timeline(120))
+    assert plan["scale"] == 1.0
+    assert plan["chars"] <= BUDGET_SAFETY * TTS_MAX_CHARS
+
+
+@pytest.mark.parametrize("hours", [0.5, 1, 2, 3])
+def test_plan_never_exceeds_the_limit(hours):
+    plan = plan_budget(timeline(int(hours * 3600)))
+    assert plan["chars"] <= BUDGET_SAFETY * TTS_MAX_CHARS
+    assert plan["words"] * 6 <= BUDGET_SAFETY * TTS_MAX_CHARS
+
+
+@pytest.mark.parametrize("hours", [1, 2, 3])
+def test_windows_add_up_to_the_global_plan(hours):
+    events = timeline(int(hours * 3600))
+    plan = plan_budget(events)
+    budgets = window_budgets(split_timeline(events), plan)
+    assert sum(b["chars"] for b in budgets) <= plan["chars"] <= TTS_MAX_CHARS
+
+
+def test_chars_are_split_by_share_with_largest_remainder():
+    # Natural-pace words 730 / 365 / 365: quotas 500.5 / 250.25 / 250.25 -> shares 501 / 250 / 250
+    events = timeline(600, change=10)
+    windows = [events[:60], events[60:90], events[90:]]
+    budgets = window_budgets(windows, {"chars": 1001})
+    assert all(b["chars"] <= share for b, share in zip(budgets, [501, 250, 250]))
+    assert budgets[0]["chars"] == 2 * budgets[1]["chars"] == 2 * budgets[2]["chars"]
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+import commentator as commentator_module
+from commentator import Commentator
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(commentator_module, "SCORE_JSON", tmp_path / "score_data.json")
+    monkeypatch.setattr(commentator_module, "SCORE_CSV", tmp_path / "score_data.csv")
+    monkeypatch.setattr(commentator_module, "RESULTS_DIR", tmp_path / "results")
+    c = Commentator(tmp_path)
+    gate = threading.Event()
+
+    def fake_pass(video_path, has_scorecard, notify, preset, reuse=None, work_dir=None):
+        out = c.output_paths(work_dir)
+        notify("Step 1/7")
+        if work_dir is not None:
+            gate.wait(timeout=5)
+            notify("Step 7/7")
+        out["video"].write_text(preset)
+        out["timeline"].write_text(preset)
+        out["results"].mkdir(parents=True, exist_ok=True)
+        (out["results"] / "meta.json").write_text(preset)
+        return str(out["video"]), {"preset": {"name": preset}}
+
+    monkeypatch.setattr(c, "_run_pass", fake_pass)
+    return c, gate, tmp_path
+
+
+def _wait_for_refinement(c):
+    deadline = time.time() + 5
+    while c.refinement_in_flight and time.time() < deadline:
+        time.sleep(0.01)
+    assert not c.refinement_in_flight
+
+
+def test_refinement_publishes_into_the_current_job(pipeline):
+    c, gate, base = pipeline
+    reports = []
+    preview = c.process_video(base / "match.mp4", preset="accurate", progressive=True,
+                              refine_callback=lambda *a: reports.append(a))
+    assert (base / "final_output.mp4").read_text() == "preview"
+    assert preview == str((base / "final_output.mp4").resolve())
+    assert c.refinement_in_flight
+
+    gate.set()
+    _wait_for_refinement(c)
+    assert reports[-1] == ("completed", "Refined result ready.", preview)
+    assert (base / "final_output.mp4").read_text() == "accurate"
+    assert (base / "timeline_for_llm.json").read_text() == "accurate"
+    assert (base / "results" / "meta.json").read_text() == "accurate"
+    assert not any((base / "refine").iterdir())
+
+
+def test_refinement_of_a_superseded_job_is_dropped(pipeline):
+    c, gate, base = pipeline
+    reports = []
+    c.process_video(base / "first.mp4", preset="accurate", progressive=True,
+                    refine_callback=lambda *a: reports.append(a))
+    # The next job starts while the first one is still refining
+    c.process_video(base / "second.mp4", preset="balanced")
+    gate.set()
+    _wait_for_refinement(c)
+
+    assert all(status != "completed" for status, _, _ in reports)
+    assert (base / "final_output.mp4").read_text() == "balanced"
+    assert (base / "timeline_for_llm.json").read_text() == "balanced"
+    assert (base / "results" / "meta.json").read_text() == "balanced"
+    assert not any((base / "refine").iterdir())
@@ -0,0 +1,63 @@
+import json
+
+from result_store import FRAME_DTYPE, ResultStore
+
+
+def frame(i, t, dets=1):
+    return {
+        "frame_index": i, "time_sec": t, "frame_path": f"frames/frame_{i:06d}.jpg",
+        "shot": {"label": "drive", "confidence": 0.5}, "umpire": {"label": None, "confidence": 0.0},
+        "runout": {"label": "no", "confidence": 0.25},
+        "yolo_detections": [{"bbox": [1.0, 2.0, 3.0, 4.0], "conf": 0.75, "class_id": 0, "class_name": "batsman"}] * dets,
+    }
+
+
+CLIP = {"clip_name": "clip_0.mp4", "clip_path": "clips/clip_0.mp4", "clip_index": 0,
+        "start_time": 0.0, "end_time": 4.0, "video_class": {"label": "bowling", "confidence": 0.5}}
+SCORE = {"frame": "frame_000001.jpg", "ocr_text": "IND 45-2 10.1", "score_confidence": 0.875,
+         "parsed": {"team1_name": "IND", "team2_name": None,
+                    "team1_score": {"runs": 45, "wickets": 2, "overs": "10.1"},
+                    "team2_score": {"runs": None, "wickets": None, "overs": None}}}
+
+
+def test_round_trip(tmp_path):
+    store = ResultStore(tmp_path, reset=True)
+    frames = [frame(2, 2.0, dets=2), frame(1, 1.0), frame(3, 3.0, dets=0)]
+    for fr in frames:
+        store.append_frame(fr)
+    store.append_clip(CLIP)
+    store.append_scores([SCORE])
+    store.close()
+
+    reader = ResultStore(tmp_path, readonly=True)
+    assert reader.frame_results() == sorted(frames, key=lambda f: f["time_sec"])
+    assert reader.clip_results() == [CLIP]
+    assert reader.score_by_frame() == {"frame_000001.jpg": SCORE}
+
+    event = reader.event_at(2.5)
+    assert event["frame_path"] == "frames/frame_000002.jpg"
+    assert event["clip_context"] == CLIP
+    assert event["score_parsed"] == SCORE["parsed"]    # carried over from frame 1
+    assert reader.event_at(0.5) is None
+
+    reader.export_json(tmp_path / "out.json")
+    assert json.loads((tmp_path / "out.json").read_text())["frames"][0] == frames[1]
+
+
+def test_torn_rows_are_cut_and_appends_stay_aligned(tmp_path):
+    store = ResultStore(tmp_path, reset=True)
+    store.append_frame(frame(1, 1.0))
+    store.close()
+
+    # A crash mid-write: half a frame row and half a string line
+    with open(tmp_path / "frames.bin", "ab") as f:
+        f.write(b"\x01" * (FRAME_DTYPE.itemsize // 2))
+    with open(tmp_path / "strings.jsonl", "a", encoding="utf-8") as f:
+        f.write('"frames/fra')
+
+    store = ResultStore(tmp_path)
+    assert (tmp_path / "frames.bin").stat().st_size == FRAME_DTYPE.itemsize
+    store.append_frame(frame(2, 2.0))
+    store.close()
+
+    assert ResultStore(tmp_path, readonly=True).frame_results() == [frame(1, 1.0), frame(2, 2.0)]
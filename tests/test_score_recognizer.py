@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from config import LOCAL_OCR_MIN_CONF
+from ocr import local_score_read, parse_score_text, preprocess_strip_stack
+from score_recognizer import ScoreGlyphRecognizer
+from tests.conftest import SCORE_TEXT
+
+SHORT_TEXT = "IND 45-2 P 10.1/20 Gill 12(9)"     # no 3, 6, 7 or 8
+OTHER_DIGITS = SCORE_TEXT.replace("45-2 P 10.1", "67-3 P 18.4")
+
+
+def ticker(text, thickness=3, font=cv2.FONT_HERSHEY_SIMPLEX):
+    """Full ticker at a scale where every word of SCORE_TEXT fits the strip."""
+    img = np.full((140, 1200), 40, np.uint8)
+    cv2.putText(img, text, (20, 95), font, 1.2, 235, thickness, cv2.LINE_AA)
+    return Image.fromarray(preprocess_strip_stack(img[None])[0])
+
+
+def learned(*texts, strip=ticker):
+    rec = ScoreGlyphRecognizer()
+    for text in texts:
+        assert rec.learn(strip(text), text)
+    return rec
+
+
+def test_learned_strip_reads_back_unambiguously(make_strip):
+    rec = learned(SHORT_TEXT, strip=make_strip)
+    text, conf = rec.recognize(make_strip(SHORT_TEXT, noise=6, seed=2))
+    assert text == SHORT_TEXT.upper()
+    assert conf >= LOCAL_OCR_MIN_CONF
+
+
+@pytest.mark.parametrize("unseen", ["46-2", "43-2"])
+def test_unseen_digit_has_low_confidence(make_strip, unseen):
+    # The look-alike (6 -> 5, 3 -> 5) still has a raw similarity above 0.80; its margin is far lower
+    rec = learned(SHORT_TEXT, strip=make_strip)
+    assert rec.missing_digits == "3678"
+    _, conf = rec.recognize(make_strip(SHORT_TEXT.replace("45-2", unseen)))
+    assert conf < LOCAL_OCR_MIN_CONF
+
+
+def test_local_read_waits_for_every_digit():
+    rec = learned(SCORE_TEXT)
+    assert rec.missing_digits == "678"
+    assert local_score_read(ticker(SCORE_TEXT), rec) is None
+    assert local_score_read(ticker(SCORE_TEXT.replace("45-2", "46-2")), rec) is None
+
+
+def test_local_read_once_digits_are_covered():
+    rec = learned(SCORE_TEXT, OTHER_DIGITS)
+    assert rec.missing_digits == ""
+    text = SCORE_TEXT.replace("45-2", "83-7")
+    entry = local_score_read(ticker(text), rec)
+    assert entry["source"] == "local"
+    assert entry["parsed"] == parse_score_text(text.upper())
+
+
+def test_unfamiliar_font_goes_to_the_api():
+    rec = learned(SCORE_TEXT, OTHER_DIGITS)
+    bold = ticker(SCORE_TEXT.replace("45-2", "46-2"), thickness=4, font=cv2.FONT_HERSHEY_DUPLEX)
+    assert rec.recognize(bold)[1] < LOCAL_OCR_MIN_CONF
+    assert local_score_read(bold, rec) is None
+
+
+def test_empty_or_missing_recognizer():
+    blank = Image.new("L", (1200, 140))
+    assert ScoreGlyphRecognizer().recognize(blank) == ("", 0.0)
+    assert local_score_read(blank, ScoreGlyphRecognizer()) is None
+    assert local_score_read(blank, None) is None
+
+
+def test_save_and_load_keep_coverage(tmp_path):
+    rec = learned(SCORE_TEXT, OTHER_DIGITS)
+    rec.save(tmp_path / "glyphs.npz")
+    loaded = ScoreGlyphRecognizer.load(tmp_path / "glyphs.npz")
+    assert loaded.chars == rec.chars
+    assert loaded.missing_digits == ""
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+import pytest
+
+import score_roi
+from ocr import StripChangeDetector, _decode_gray_crop, select_columns, strip_columns
+from score_roi import resolve_score_profile
+from tests.conftest import SCORE_TEXT
+
+ROI = {"top": 0.8, "bottom": 0.95, "left": 0.25, "right": 0.75}
+
+
+@pytest.fixture
+def video_frames(tmp_path):
+    """12 frames: a changing background under a static score band with a changing score."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(12):
+        img = cv2.resize(rng.integers(0, 255, (36, 64), dtype=np.uint8), (640, 360))
+        img[300:340, 40:600] = 30
+        cv2.putText(img, f"IND {40 + i}-2  P {i + 3}.{i % 6}", (60, 330),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, 230, 2, cv2.LINE_AA)
+        path = tmp_path / f"frame_{i:06d}.jpg"
+        cv2.imwrite(str(path), img)
+        paths.append(path)
+    return paths
+
+
+def test_profile_is_stored_then_matched_with_one_decode(video_frames, tmp_path, monkeypatch):
+    profiles = tmp_path / "profiles.json"
+    found = resolve_score_profile(video_frames, name=None, path=profiles)
+    assert found["name"] == "profile_1"
+
+    stored = score_roi.load_profiles(profiles)
+    stored["other"] = {**stored["profile_1"], "roi": {"top": 0.0, "bottom": 0.1, "left": 0.0, "right": 0.5}}
+    score_roi.save_profiles(stored, profiles)
+
+    calls = []
+    mean_frame = score_roi._mean_frame
+    monkeypatch.setattr(score_roi, "_mean_frame", lambda paths: calls.append(1) or mean_frame(paths))
+    matched = resolve_score_profile(video_frames, name=None, path=profiles)
+    assert matched["name"] == "profile_1"
+    assert len(calls) == 1
+
+
+def test_intro_frames_are_not_cropped_to_the_roi(video_frames):
+    assert _decode_gray_crop(video_frames[0], do_crop=False, roi=ROI).shape == (360, 640)
+    assert _decode_gray_crop(video_frames[0], do_crop=True, roi=ROI).shape == (54, 320)
+
+
+def test_strip_columns_are_relative_to_the_roi():
+    assert np.allclose(strip_columns(ROI, [[0.25, 0.5], [0.7, 0.9]]), [[0.0, 0.5], [0.9, 1.0]])
+    assert strip_columns(ROI, []) is None
+    assert strip_columns(None, [[0.3, 0.4]]) is None
+
+    sig = np.arange(40, dtype=np.float32).reshape(1, 40)
+    assert select_columns(sig, [[0.0, 0.25], [0.5, 0.75]]).tolist() == [list(range(10)) + list(range(20, 30))]
+
+
+def test_detector_only_compares_digit_columns(make_strip):
+    # Columns over the score "45-2 P 10.1": a changed batter's figure elsewhere is ignored
+    d = StripChangeDetector(columns=[[0.08, 0.45]])
+    d.set_reference(make_strip())
+    assert d.is_same(make_strip(SCORE_TEXT.replace("12(9)", "12(8)")))
+    assert not d.is_same(make_strip(SCORE_TEXT.replace("45-2", "46-2")))
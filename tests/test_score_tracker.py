@@ -0,0 +1,50 @@
+import pytest
+
+from score_tracker import ScoreTracker, balls_to_overs, overs_to_balls, track_scores
+
+
+def smoothed(reads):
+    tracker = ScoreTracker()
+    for obs in reads:
+        tracker.update(obs)
+    return [s for s, _ in tracker.finalize()]
+
+
+def test_single_misread_is_smoothed_away():
+    reads = [(45, 2, 60)] * 5 + [(46, 2, 60)] + [(45, 2, 60)] * 5
+    assert smoothed(reads) == [(45, 2, 60)] * 11
+
+
+def test_misread_first_frame_does_not_pin_the_innings():
+    reads = [(48, 2, 60)] + [(45, 2, 60)] * 10 + [(46, 2, 61)] * 5
+    assert smoothed(reads) == [(45, 2, 60)] * 11 + [(46, 2, 61)] * 5
+
+
+@pytest.mark.parametrize("after", [2, 8])
+def test_large_legitimate_jump_is_followed(after):
+    # Reads resume at 120-4 @20.0 after an ad break
+    reads = [(45, 2, 60)] * 10 + [(120, 4, 120)] * after
+    assert smoothed(reads) == [(45, 2, 60)] * 10 + [(120, 4, 120)] * after
+
+
+def test_one_wild_read_is_not_a_jump():
+    reads = [(45, 2, 60)] * 10 + [(120, 4, 120)] + [(45, 2, 60)] * 3
+    assert smoothed(reads) == [(45, 2, 60)] * 14
+
+
+def test_overs_round_trip():
+    assert overs_to_balls("10.3") == 63
+    assert overs_to_balls("10.7") is None
+    assert overs_to_balls(None) is None
+    assert balls_to_overs(63) == "10.3"
+
+
+def test_track_scores_corrects_the_read_and_keeps_the_raw_one():
+    def read(runs, overs):
+        return {"parsed": {"team1_name": "IND", "team1_score": {"runs": runs, "wickets": 2, "overs": overs}}}
+
+    results = [read(45, "10.0"), read(45, "10.0"), read(46, "10.0"), read(45, "10.0"), read(45, "10.0")]
+    track_scores(results)
+    assert results[2]["score_corrected"]
+    assert results[2]["parsed_raw"]["team1_score"]["runs"] == 46
+    assert all(r["parsed"]["team1_score"]["runs"] == 45 for r in results)
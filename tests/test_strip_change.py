@@ -0,0 +1,34 @@
+import pytest
+
+from ocr import StripChangeDetector
+from tests.conftest import SCORE_TEXT
+
+
+@pytest.fixture
+def detector(make_strip):
+    d = StripChangeDetector()
+    d.set_reference(make_strip())
+    return d
+
+
+def test_same_strip_with_noise_is_unchanged(detector, make_strip):
+    assert detector.is_same(make_strip())
+    for seed in range(3):
+        assert detector.is_same(make_strip(noise=6, seed=seed))
+
+
+@pytest.mark.parametrize("changed", [
+    SCORE_TEXT.replace("45-2", "46-2"),        # one run
+    SCORE_TEXT.replace("10.1/", "10.2/"),      # one ball
+    SCORE_TEXT.replace("12(9)", "12(8)"),      # one digit of a batter's balls
+])
+def test_one_digit_change_is_detected(detector, make_strip, changed):
+    assert not detector.is_same(make_strip(changed))
+    assert not detector.is_same(make_strip(changed, noise=6, seed=1))
+
+
+def test_no_reference_or_other_size_counts_as_changed(make_strip):
+    d = StripChangeDetector()
+    assert not d.is_same(make_strip())
+    d.set_reference(make_strip())
+    assert not d.is_same(make_strip().crop((0, 0, 600, 140)))
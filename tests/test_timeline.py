@@ -0,0 +1,61 @@
+import pytest
+
+from timeline import TimelineBuilder, build_timeline
+
+
+def frame(t, fps=1):
+    return {"time_sec": t, "frame_path": f"frames/frame_{int(t * fps):06d}.jpg",
+            "shot": None, "umpire": None, "runout": None, "yolo_detections": []}
+
+
+def clip(st, et, label="bowling"):
+    return {"start_time": st, "end_time": et, "video_class": {"label": label, "confidence": 0.9}}
+
+
+def score(runs):
+    return {"ocr_text": f"IND {runs}-2", "parsed": {"team1_name": "IND", "team1_score": {"runs": runs}}}
+
+
+def test_out_of_order_input_is_emitted_in_time_order():
+    events = build_timeline([frame(3), frame(1), frame(2)], [clip(2, 4), clip(0, 2, "batting")])
+    assert [e["time_sec"] for e in events] == [1, 2, 3]
+    assert [e["clip_context"]["video_class"]["label"] for e in events] == ["batting", "bowling", "bowling"]
+
+
+def test_unread_frame_takes_the_latest_earlier_read():
+    scores = {"frame_000001.jpg": score(45), "frame_000003.jpg": score(46)}
+    events = build_timeline([frame(t) for t in range(5)], [], score_by_frame=scores)
+    assert [(e["score_parsed"] or {}).get("team1_score", {}).get("runs") for e in events] == [None, 45, 45, 46, 46]
+
+
+def test_segments_add_a_marker_and_tag_their_frames():
+    events = build_timeline([frame(1), frame(2), frame(3)], [], segments=[{"start": 2, "end": 3, "kind": "replay"}])
+    assert [(e["time_sec"], e["footage"], e["frame_path"] is None) for e in events] == [
+        (1, "live", False), (2, "replay", True), (2, "replay", False), (3, "live", False)]
+
+
+def test_streaming_emit_matches_the_batch_build_and_releases_memory():
+    frames = [frame(t) for t in range(20)]
+    clips = [clip(t, t + 5) for t in range(0, 20, 5)]
+    scores = {f"frame_{t:06d}.jpg": score(40 + t // 4) for t in range(0, 20, 4)}
+
+    builder = TimelineBuilder()
+    streamed = []
+    for t0 in range(0, 20, 5):
+        builder.extend(frames[t0:t0 + 5], [clips[t0 // 5]],
+                       {k: v for k, v in scores.items() if t0 <= int(k[6:12]) < t0 + 5})
+        streamed += builder.emit(until=t0 + 5)
+        assert len(builder) == 0
+        assert len(builder._clips) == 0
+        assert len(builder._scores) <= 1     # only the carry-over read is kept
+    streamed += builder.finish()
+
+    assert streamed == build_timeline(frames, clips, scores)
+
+
+def test_frame_behind_the_watermark_is_refused():
+    builder = TimelineBuilder()
+    builder.add_frame(frame(5))
+    builder.emit(until=6)
+    with pytest.raises(ValueError):
+        builder.add_frame(frame(4))
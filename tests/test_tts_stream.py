@@ -0,0 +1,78 @@
+import pytest
+
+import tts
+from llm import split_sentences
+from tts import StreamingTTS
+
+
+def test_split_sentences_waits_for_the_end_and_joins_short_ones():
+    text = "What a shot! Four runs. He has timed that beautifully through the covers and it races away. Dot ball"
+    deltas = [text[i:i + 7] for i in range(0, len(text), 7)]
+    assert list(split_sentences(deltas, min_chars=30)) == [
+        "What a shot! Four runs. He has timed that beautifully through the covers and it races away.",
+        "Dot ball",
+    ]
+
+
+def test_split_sentences_keeps_closing_quotes_and_ellipses():
+    text = 'He says "that is out!" Then nothing... The crowd waits. '
+    assert list(split_sentences([text], min_chars=1)) == [
+        'He says "that is out!"', "Then nothing...", "The crowd waits."]
+
+
+@pytest.fixture
+def engine_calls(monkeypatch, tmp_path):
+    """Fake engines: records (sentence, engine); sentences in `fail` never synthesise."""
+    calls, fail = [], set()
+
+    def synth(text, path, engine):
+        calls.append((text, engine))
+        if text in fail:
+            return False
+        path.write_bytes(text.encode())
+        return True
+
+    def concat(parts, out):
+        out.write_bytes(b"|".join(p.read_bytes() for p in parts))
+        return True
+
+    monkeypatch.setattr(tts, "synthesize_with_engine", synth)
+    monkeypatch.setattr(tts, "concat_audio", concat)
+    monkeypatch.setattr(tts.time, "sleep", lambda s: None)
+    return calls, fail
+
+
+def test_stream_uses_one_engine_and_joins_in_order(engine_calls, tmp_path):
+    calls, _ = engine_calls
+    stream = StreamingTTS(tmp_path / "out.mp3", prefer_elevenlabs=False, workers=3)
+    for s in ("One.", "Two.", "Three."):
+        stream.submit(s)
+    assert stream.finish()
+    assert (tmp_path / "out.mp3").read_bytes() == b"One.|Two.|Three."
+    assert {engine for _, engine in calls} == {"edge"}
+
+
+def test_failed_sentence_is_retried_then_falls_back_to_edge(engine_calls, tmp_path, monkeypatch):
+    calls, fail = engine_calls
+    fail.add("Two.")
+    monkeypatch.setattr(tts, "tts_engine", lambda prefer_elevenlabs=True: "elevenlabs" if prefer_elevenlabs else "edge")
+    stream = StreamingTTS(tmp_path / "out.mp3", prefer_elevenlabs=True, workers=1, retries=2)
+    for s in ("One.", "Two.", "Three."):
+        stream.submit(s)
+    assert stream.finish()
+    assert [c for c in calls if c[0] == "Two."] == [("Two.", "elevenlabs")] * 3
+    assert ("Three.", "elevenlabs") not in calls     # later parts are skipped once the stream failed
+    # No gap and no mixed voices: the whole text is spoken again by Edge
+    assert calls[-1] == ("One. Two. Three.", "edge")
+    assert (tmp_path / "out.mp3").read_bytes() == b"One. Two. Three."
+    assert not stream.parts_dir.exists()
+
+
+def test_stream_fails_only_when_the_fallback_fails_too(engine_calls, tmp_path):
+    _, fail = engine_calls
+    fail.update({"Two.", "One. Two."})
+    stream = StreamingTTS(tmp_path / "out.mp3", prefer_elevenlabs=False, workers=1, retries=0)
+    for s in ("One.", "Two."):
+        stream.submit(s)
+    assert not stream.finish()
+    assert not (tmp_path / "out.mp3").exists()
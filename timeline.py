@@ -1,45 +1,339 @@
+import bisect
+import re
 from pathlib import Path
 
-def build_timeline(frame_results, clip_results, score_by_frame=None):
+from config import VISUAL_CONF_MIN, COMPACT_MIN_SPAN_SEC
+from score_tracker import overs_to_balls
+
+LAST_EVENT_SEC = 5.0   # assumed duration of the final event
+
+
+def frame_number(frame_name):
+    m = re.search(r"frame_(\d+)", str(frame_name))
+    return int(m.group(1)) if m else None
+
+
+# ================= EVENTS =================
+
+def make_event(fr, clip_ctx=None, score_entry=None, footage="live") -> dict:
+    """One timeline event: SCOREBOARD OCR + YOLO + (optional) clip context for a frame result."""
+    return {
+        "time_sec": fr["time_sec"],
+        "frame_path": fr["frame_path"],
+        "models": {
+            "shot": fr["shot"],
+            "umpire": fr["umpire"],
+            "runout": fr["runout"],
+            "yolo_detections": fr["yolo_detections"],
+        },
+        "score_ocr_text": (score_entry or {}).get("ocr_text"),
+        "score_parsed": (score_entry or {}).get("parsed"),
+        "score_confidence": (score_entry or {}).get("score_confidence"),
+        "clip_context": clip_ctx,
+        "footage": footage,
+    }
+
+
+def segment_event(seg) -> dict:
+    """Marker event for a replay / ad segment whose frames were skipped."""
+    return {
+        "time_sec": seg["start"],
+        "frame_path": None,
+        "models": {"shot": None, "umpire": None, "runout": None, "yolo_detections": []},
+        "score_ocr_text": None,
+        "score_parsed": None,
+        "score_confidence": None,
+        "clip_context": None,
+        "footage": seg["kind"],
+        "footage_end": seg["end"],
+        "footage_evidence": seg.get("evidence"),
+    }
+
+
+# ================= INCREMENTAL BUILDER =================
+
+class TimelineBuilder:
     """
-    Build a time-ordered list of events.
-    Each event carries SCOREBOARD OCR + YOLO + (optional) clip context.
+    Timeline that is filled as results arrive and emits finished events as a stream.
+
+    Frames and clips are kept in lists sorted by time (bisect), so a clip or frame
+    is found in O(log n) and out-of-order arrivals are inserted in place. OCR entries
+    are keyed by frame name and can arrive before or after their frame; a frame that
+    was not read itself (OCR and inference sampled different frames) takes the latest
+    read at or before it. Replay / ad segments become marker events at their start,
+    and frames inside one are tagged with its kind.
+
+        builder = TimelineBuilder()
+        builder.add_clip(c); builder.add_frame(fr); builder.add_score(entry)
+        events = builder.emit(until=t)    # everything before t has arrived
+        events = builder.finish()         # the rest
+
+    Emitted frames, clips that end before the watermark and their OCR entries are
+    dropped, so a long or live match only holds the pending window in memory.
     """
-    clip_ranges = []
-    for c in clip_results:
-        st = c.get("start_time")
-        et = c.get("end_time")
-        if st is None or et is None:
-            continue
-        clip_ranges.append((st, et, c))
-    clip_ranges.sort(key=lambda x: x[0])
 
-    events = []
-    for fr in frame_results:
+    def __init__(self):
+        self._frame_times, self._frames = [], []
+        self._clip_starts, self._clips = [], []
+        self._scores = {}
+        self._score_numbers, self._score_names = [], []   # sorted by frame number
+        self._segment_starts, self._segments = [], []     # for lookup until they end
+        self._markers = []                                 # segments not emitted yet
+        self.watermark = float("-inf")
+        self.emitted = 0
+
+    # ---- input ----
+
+    def add_frame(self, fr):
         t = fr["time_sec"]
-        clip_ctx = None
-        for st, et, c in clip_ranges:
-            if t >= st and t < et:
-                clip_ctx = c
-                break
-
-        frame_path = fr["frame_path"]
-        frame_name = Path(frame_path).name
-        score_entry = score_by_frame.get(frame_name) if score_by_frame else None
-
-        events.append({
-            "time_sec": t,
-            "frame_path": frame_path,
-            "models": {
-                "shot": fr["shot"],
-                "umpire": fr["umpire"],
-                "runout": fr["runout"],
-                "yolo_detections": fr["yolo_detections"],
-            },
-            "score_ocr_text": (score_entry or {}).get("ocr_text"),
-            "score_parsed": (score_entry or {}).get("parsed"),
-            "clip_context": clip_ctx,
-        })
-
-    events.sort(key=lambda e: e["time_sec"])
-    return events
+        if t < self.watermark:
+            raise ValueError(f"Frame at {t:.2f}s arrived after the timeline was emitted up to {self.watermark:.2f}s")
+        i = bisect.bisect_right(self._frame_times, t)
+        self._frame_times.insert(i, t)
+        self._frames.insert(i, fr)
+
+    def add_clip(self, c):
+        st, et = c.get("start_time"), c.get("end_time")
+        if st is None or et is None:
+            return
+        i = bisect.bisect_right(self._clip_starts, st)
+        self._clip_starts.insert(i, st)
+        self._clips.insert(i, (st, et, c))
+
+    def add_score(self, entry, frame_name=None):
+        frame_name = frame_name or entry.get("frame")
+        if frame_name is None:
+            return
+        if frame_name not in self._scores:
+            num = frame_number(frame_name)
+            if num is not None:
+                i = bisect.bisect_right(self._score_numbers, num)
+                self._score_numbers.insert(i, num)
+                self._score_names.insert(i, frame_name)
+        self._scores[frame_name] = entry
+
+    def add_segment(self, seg):
+        if seg["start"] < self.watermark:
+            raise ValueError(f"Segment at {seg['start']:.2f}s arrived after the timeline was emitted up to {self.watermark:.2f}s")
+        i = bisect.bisect_right(self._segment_starts, seg["start"])
+        self._segment_starts.insert(i, seg["start"])
+        self._segments.insert(i, seg)
+        self._markers.append(seg)
+
+    def extend(self, frame_results=(), clip_results=(), score_by_frame=None, segments=()):
+        for seg in segments or ():
+            self.add_segment(seg)
+        for c in clip_results:
+            self.add_clip(c)
+        for fr in frame_results:
+            self.add_frame(fr)
+        for frame_name, entry in (score_by_frame or {}).items():
+            self.add_score(entry, frame_name)
+
+    # ---- lookup ----
+
+    def clip_at(self, t):
+        """The clip covering time t (latest start <= t), or None."""
+        i = bisect.bisect_right(self._clip_starts, t) - 1
+        if i >= 0:
+            st, et, c = self._clips[i]
+            if st <= t < et:
+                return c
+        return None
+
+    def segment_at(self, t):
+        """The replay / ad segment covering time t, or None."""
+        i = bisect.bisect_right(self._segment_starts, t) - 1
+        if i >= 0 and self._segments[i]["start"] <= t < self._segments[i]["end"]:
+            return self._segments[i]
+        return None
+
+    def score_for(self, frame_path):
+        """OCR entry of this frame, else the latest entry before it, else None."""
+        name = Path(frame_path).name
+        entry = self._scores.get(name)
+        if entry is not None:
+            return entry
+        num = frame_number(name)
+        if num is None:
+            return None
+        i = bisect.bisect_right(self._score_numbers, num) - 1
+        return self._scores.get(self._score_names[i]) if i >= 0 else None
+
+    def frame_at(self, t):
+        """The pending frame result at or just before time t, or None."""
+        i = bisect.bisect_right(self._frame_times, t) - 1
+        return self._frames[i] if i >= 0 else None
+
+    def frames_between(self, t0, t1):
+        """Pending frame results with t0 <= time_sec < t1."""
+        return self._frames[bisect.bisect_left(self._frame_times, t0):bisect.bisect_left(self._frame_times, t1)]
+
+    def __len__(self):
+        return len(self._frames)
+
+    # ---- output ----
+
+    def emit(self, until=float("inf")) -> list:
+        """
+        Finished events with time_sec < until, in time order. Call it once every
+        frame, clip and OCR entry before `until` has been added.
+        """
+        n = bisect.bisect_left(self._frame_times, until)
+        ready = self._frames[:n]
+        del self._frames[:n]
+        del self._frame_times[:n]
+        self.watermark = max(self.watermark, until)
+
+        events = []
+        for fr in ready:
+            seg = self.segment_at(fr["time_sec"])
+            events.append(make_event(fr, self.clip_at(fr["time_sec"]), self.score_for(fr["frame_path"]),
+                                     seg["kind"] if seg else "live"))
+        markers = [seg for seg in self._markers if seg["start"] < until]
+        if markers:
+            self._markers = [seg for seg in self._markers if seg["start"] >= until]
+            # Markers sort before a frame at the same time (stable sort)
+            events = sorted([segment_event(seg) for seg in markers] + events, key=lambda e: e["time_sec"])
+        self.emitted += len(events)
+
+        # OCR entries before the last emitted frame are only needed as its carry-over read
+        for fr in ready:
+            if frame_number(fr["frame_path"]) is None:
+                self._scores.pop(Path(fr["frame_path"]).name, None)
+        last = frame_number(ready[-1]["frame_path"]) if ready else None
+        if last is not None:
+            k = bisect.bisect_right(self._score_numbers, last) - 1
+            if k > 0:
+                for name in self._score_names[:k]:
+                    self._scores.pop(name, None)
+                del self._score_numbers[:k]
+                del self._score_names[:k]
+
+        # Clips that end before the watermark can no longer match a pending frame
+        k = 0
+        while k < len(self._clips) and self._clips[k][1] <= until:
+            k += 1
+        if k:
+            del self._clips[:k]
+            del self._clip_starts[:k]
+        keep = [i for i, seg in enumerate(self._segments) if seg["end"] > until]
+        self._segments = [self._segments[i] for i in keep]
+        self._segment_starts = [self._segment_starts[i] for i in keep]
+        return events
+
+    def finish(self) -> list:
+        return self.emit()
+
+
+def build_timeline(frame_results, clip_results, score_by_frame=None, segments=None):
+    """
+    Build a time-ordered list of events.
+    Each event carries SCOREBOARD OCR + YOLO + (optional) clip context; replay / ad
+    segments add a marker event each.
+    """
+    builder = TimelineBuilder()
+    builder.extend(frame_results, clip_results, score_by_frame, segments)
+    return builder.finish()
+
+
+# ================= COMPACTION =================
+
+def _score_key(parsed):
+    """(team, runs, wickets, balls) of the batting side, or None when the read has no score."""
+    if not parsed or parsed.get("team1_name") is None:
+        return None
+    s = parsed.get("team1_score") or {}
+    if s.get("runs") is None:
+        return None
+    return (parsed["team1_name"], s.get("runs"), s.get("wickets"), overs_to_balls(s.get("overs")))
+
+
+def _visuals(event):
+    dets = (event.get("models") or {}).get("yolo_detections") or []
+    return frozenset(d.get("class_name") for d in dets if d.get("conf", 0) > VISUAL_CONF_MIN)
+
+
+def _clip_label(event):
+    return ((event.get("clip_context") or {}).get("video_class") or {}).get("label")
+
+
+def _score_delta(prev_key, key):
+    if prev_key is None or key is None or prev_key[0] != key[0]:
+        return None
+    delta = {"runs": key[1] - prev_key[1]}
+    if key[2] is not None and prev_key[2] is not None:
+        delta["wickets"] = key[2] - prev_key[2]
+    if key[3] is not None and prev_key[3] is not None:
+        delta["balls"] = key[3] - prev_key[3]
+    return delta
+
+
+def compact_timeline(events, min_span_sec: float = COMPACT_MIN_SPAN_SEC):
+    """
+    Merge consecutive equivalent events into spans, so the prompt grows with what
+    happens in the match rather than with the video length.
+
+    A new span starts when the score, the clip label or the footage kind (live /
+    replay / ad) changes, or when the
+    high-confidence visuals change and the current span already lasts min_span_sec
+    (short visual flicker is folded into the span). Events without a score read
+    continue the current span. Each span:
+    {"start_sec", "end_sec", "duration", "frames", "score_parsed", "score_delta",
+     "score_confidence", "visuals", "clip_label", "clip_confidence", "footage"}
+    score_delta is {"runs", "wickets", "balls"} against the previous span's score
+    (None for the first score or a new batting team).
+    """
+    spans = []
+    cur = None
+    prev_key = None
+    for e in events:
+        t = e["time_sec"]
+        key = _score_key(e.get("score_parsed"))
+        visuals = _visuals(e)
+        label = _clip_label(e)
+        footage = e.get("footage", "live")
+
+        split = cur is None
+        if cur is not None:
+            score_changed = key is not None and key != cur["_key"]
+            visuals_changed = visuals != cur["_visuals"] and t - cur["start_sec"] >= min_span_sec
+            split = score_changed or label != cur["clip_label"] or visuals_changed or footage != cur["footage"]
+
+        if split:
+            if cur is not None:
+                prev_key = cur["_key"] if cur["_key"] is not None else prev_key
+                cur["end_sec"] = t
+                spans.append(cur)
+            cur = {
+                "start_sec": t, "end_sec": None, "frames": 0,
+                "score_parsed": e.get("score_parsed") if key is not None else None,
+                "score_delta": _score_delta(prev_key, key),
+                "score_confidence": e.get("score_confidence"),
+                "visuals": set(), "clip_label": label,
+                "clip_confidence": ((e.get("clip_context") or {}).get("video_class") or {}).get("confidence"),
+                "footage": footage,
+                "_key": key, "_visuals": visuals,
+            }
+        elif key is not None and cur["_key"] is None:
+            # First score read inside the span
+            cur.update(_key=key, score_parsed=e.get("score_parsed"),
+                       score_delta=_score_delta(prev_key, key), score_confidence=e.get("score_confidence"))
+        elif key is not None and e.get("score_confidence") is not None:
+            conf = cur["score_confidence"]
+            cur["score_confidence"] = e["score_confidence"] if conf is None else min(conf, e["score_confidence"])
+
+        cur["frames"] += 1 if e.get("frame_path") else 0
+        cur["visuals"] |= visuals
+        cur["_last"] = t
+
+    if cur is not None:
+        cur["end_sec"] = cur["_last"] + LAST_EVENT_SEC
+        spans.append(cur)
+
+    for sp in spans:
+        sp["duration"] = round(sp["end_sec"] - sp["start_sec"], 3)
+        sp["visuals"] = sorted(v for v in sp["visuals"] if v)
+        for k in ("_key", "_visuals", "_last"):
+            sp.pop(k, None)
+    return spans
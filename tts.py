@@ -1,9 +1,16 @@
 import asyncio
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import edge_tts
 import subprocess
-from config import ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID, ELEVENLABS_MODEL_ID
+from config import (
+    ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID, ELEVENLABS_MODEL_ID, TTS_STREAM_WORKERS, TTS_MAX_CHARS,
+    TTS_PART_RETRIES
+)
 
 # Default voice for Edge TTS: English (UK) - Ryan
 EDGE_VOICE = "en-GB-RyanNeural"
@@ -71,36 +78,17 @@ def _generate_audio_elevenlabs(text: str, output_path: str) -> bool:
         print(f"[TTS ERROR] ElevenLabs generation failed: {e}")
         return False
 
-def synthesize_commentary_audio(commentary_text: str, output_path: Path) -> bool:
+def _generate_audio_edge_cli(text: str, output_path: Path) -> bool:
     """
-    Generates audio from text. 
-    Prioritizes ElevenLabs if configured, otherwise falls back to Microsoft Edge TTS.
+    Generates audio with the edge-tts CLI (subprocess, for safety).
     """
-    if not commentary_text:
-        print("[TTS] No commentary text provided.")
-        return False
-
     output_str = str(output_path.resolve())
-
-    # 1. Try ElevenLabs
-    if HAS_ELEVENLABS and ELEVENLABS_API_KEY:
-        print("[TTS] Attempting ElevenLabs generation...")
-        if _generate_audio_elevenlabs(commentary_text, output_str):
-            if output_path.exists() and output_path.stat().st_size > 0:
-                print(f"[TTS] Success (ElevenLabs)! Saved to {output_path}")
-                return True
-            else:
-                print("[TTS] ElevenLabs file empty. Falling back...")
-
-    # 2. Fallback to Edge TTS (via Subprocess for Safety)
-    print(f"[TTS] Using Edge TTS fallback (Voice: {EDGE_VOICE})...")
-    
     try:
         # Write text to a temporary file to avoid command line length limits on Windows
         import tempfile
         
         with tempfile.NamedTemporaryFile(mode="w", delete=False, encoding="utf-8", suffix=".txt") as tmp:
-            tmp.write(commentary_text)
+            tmp.write(text)
             tmp_path = tmp.name
             
         # Use subprocess to call edge-tts CLI directly. 
@@ -127,7 +115,6 @@ def synthesize_commentary_audio(commentary_text: str, output_path: Path) -> bool
             return False
             
         if output_path.exists() and output_path.stat().st_size > 0:
-            print(f"[TTS] Success (Edge TTS)! Saved to {output_path}")
             return True
         else:
             print("[TTS] File not created or empty (Edge TTS).")
@@ -138,3 +125,176 @@ def synthesize_commentary_audio(commentary_text: str, output_path: Path) -> bool
         print(msg)
         _log_debug(msg)
         return False
+
+
+def tts_engine(prefer_elevenlabs: bool = True) -> str:
+    """Engine for a job: "elevenlabs" when preferred and configured, else "edge"."""
+    return "elevenlabs" if prefer_elevenlabs and HAS_ELEVENLABS and ELEVENLABS_API_KEY else "edge"
+
+
+def synthesize_with_engine(text: str, output_path: Path, engine: str) -> bool:
+    """Generates audio with one engine, no fallback (parts of one file must share a voice)."""
+    if engine == "elevenlabs":
+        ok = _generate_audio_elevenlabs(text, str(output_path.resolve()))
+    else:
+        ok = _generate_audio_edge_cli(text, output_path)
+    return ok and output_path.exists() and output_path.stat().st_size > 0
+
+
+def synthesize_commentary_audio(commentary_text: str, output_path: Path,
+                                prefer_elevenlabs: bool = True) -> bool:
+    """
+    Generates audio from text. 
+    Prioritizes ElevenLabs if configured, otherwise falls back to Microsoft Edge TTS.
+    prefer_elevenlabs=False goes straight to Edge TTS (fast preview audio).
+    """
+    if not commentary_text:
+        print("[TTS] No commentary text provided.")
+        return False
+
+    # 1. Try ElevenLabs
+    if tts_engine(prefer_elevenlabs) == "elevenlabs":
+        print("[TTS] Attempting ElevenLabs generation...")
+        if synthesize_with_engine(commentary_text, output_path, "elevenlabs"):
+            print(f"[TTS] Success (ElevenLabs)! Saved to {output_path}")
+            return True
+        print("[TTS] ElevenLabs failed or file empty. Falling back...")
+
+    # 2. Fallback to Edge TTS (via Subprocess for Safety)
+    print(f"[TTS] Using Edge TTS fallback (Voice: {EDGE_VOICE})...")
+    if synthesize_with_engine(commentary_text, output_path, "edge"):
+        print(f"[TTS] Success (Edge TTS)! Saved to {output_path}")
+        return True
+    return False
+
+
+def concat_audio(parts, output_path: Path) -> bool:
+    """
+    Joins audio files of the same engine into output_path with ffmpeg's concat demuxer
+    (stream copy), so the result has one proper header and duration.
+    """
+    output_path = Path(output_path)
+    list_path = output_path.parent / f"{output_path.stem}_concat.txt"
+    list_path.write_text("".join(f"file '{Path(p).resolve().as_posix()}'\n" for p in parts), encoding="utf-8")
+    cmd = ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", str(list_path),
+           "-c", "copy", str(output_path)]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        return output_path.exists() and output_path.stat().st_size > 0
+    except (OSError, subprocess.CalledProcessError) as e:
+        msg = f"[TTS ERROR] ffmpeg concat failed: {getattr(e, 'stderr', None) or e}"
+        print(msg)
+        _log_debug(msg)
+        return False
+    finally:
+        try:
+            list_path.unlink()
+        except OSError:
+            pass
+
+
+# ================= STREAMING =================
+
+class StreamingTTS:
+    """
+    Sentence-wise TTS that runs while the LLM is still generating.
+
+        tts = StreamingTTS(output_path, prefer_elevenlabs=...)
+        text = call_llm_streaming(prompt, on_sentence=tts.submit)
+        ok = tts.finish()      # joins the workers and writes output_path
+
+    The engine is chosen once per job (tts_engine), so every part has the same voice
+    and format. Each sentence is synthesised on one of `workers` threads into its own
+    part; a failed part is retried up to `retries` times with the same engine. finish()
+    joins the parts with ffmpeg's concat demuxer; if a part still failed, or the join
+    fails, the parts are dropped (never a gap in the commentary) and the whole text is
+    synthesised once more with Edge TTS, as synthesize_commentary_audio falls back.
+    Sentences past max_chars are not spoken, so the audio ends on a sentence boundary.
+    first_audio_sec is the time from construction to the first finished part.
+    """
+
+    def __init__(self, output_path: Path, prefer_elevenlabs: bool = True,
+                 workers: int = TTS_STREAM_WORKERS, max_chars: int = TTS_MAX_CHARS,
+                 retries: int = TTS_PART_RETRIES):
+        self.output_path = Path(output_path)
+        self.engine = tts_engine(prefer_elevenlabs)
+        self.max_chars = max_chars
+        self.retries = retries
+        self.parts_dir = self.output_path.parent / f"{self.output_path.stem}_parts"
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-stream")
+        self.sentences, self.futures = [], []
+        self.chars = 0
+        self.dropped = 0
+        self.failed = None     # index of the first sentence that could not be synthesised
+        self.started = time.time()
+        self.first_audio_sec = None
+        self._lock = threading.Lock()
+        print(f"[TTS] Streaming with {self.engine}.")
+
+    @property
+    def text(self) -> str:
+        """The commentary that is spoken (the accepted sentences)."""
+        return " ".join(self.sentences)
+
+    def submit(self, sentence: str) -> bool:
+        if not sentence or self.dropped or self.chars + len(sentence) > self.max_chars:
+            self.dropped += 1
+            return False
+        k = len(self.sentences)
+        part = self.parts_dir / f"part_{k:04d}.mp3"
+        self.sentences.append(sentence)
+        self.chars += len(sentence) + 1
+        self.futures.append(self.executor.submit(self._synthesize, k, sentence, part))
+        return True
+
+    def _synthesize(self, k: int, sentence: str, part: Path):
+        for attempt in range(1 + self.retries):
+            if self.failed is not None:
+                return None    # the stream has already failed; save the API calls
+            if synthesize_with_engine(sentence, part, self.engine):
+                with self._lock:
+                    if self.first_audio_sec is None:
+                        self.first_audio_sec = time.time() - self.started
+                        print(f"[TTS] First audio after {self.first_audio_sec:.1f}s.")
+                return part
+            if attempt < self.retries:
+                print(f"[TTS] Sentence {k + 1} failed ({self.engine}); retrying ({attempt + 1}/{self.retries}).")
+                time.sleep(1.0 + attempt)
+        with self._lock:
+            if self.failed is None or k < self.failed:
+                self.failed = k
+        return None
+
+    def finish(self) -> bool:
+        parts = [f.result() for f in self.futures]
+        self.executor.shutdown()
+        if self.dropped:
+            print(f"[TTS] {self.dropped} sentences past the {self.max_chars}-char limit were not spoken.")
+        if not parts:
+            print("[TTS] No sentence was synthesised.")
+            return False
+        if self.failed is not None:
+            print(f"[TTS] Sentence {self.failed + 1}/{len(parts)} failed on {self.engine} after "
+                  f"{1 + self.retries} attempts; dropping the streamed parts.")
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+            return self._fallback()
+        ok = concat_audio(parts, self.output_path)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        if not ok:
+            return self._fallback()
+        print(f"[TTS] Streamed {len(parts)} sentences to {self.output_path} ({self.engine}, "
+              f"{time.time() - self.started:.1f}s, first audio after {self.first_audio_sec:.1f}s).")
+        return True
+
+    def _fallback(self) -> bool:
+        """Whole-text Edge TTS, so a transient engine error does not fail the job."""
+        print("[TTS] Re-synthesising the full commentary with Edge TTS.")
+        return synthesize_commentary_audio(self.text, self.output_path, prefer_elevenlabs=False)
+
+    def cancel(self):
+        for f in self.futures:
+            f.cancel()
+        self.executor.shutdown()
+        shutil.rmtree(self.parts_dir, ignore_errors=True)